@@ -1,12 +1,16 @@
+import asyncio
+import importlib
 import os
 import pickle
-from typing import Any
+import queue
+import threading
+import time
 from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timezone
 
-from langchain_core.messages import AIMessageChunk
-from langchain.messages import AnyMessage, RemoveMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain.messages import AnyMessage
 from langchain.agents import create_agent, AgentState
 from langchain.agents.middleware import (
     dynamic_prompt,
@@ -15,15 +19,32 @@ from langchain.agents.middleware import (
     after_model,
     SummarizationMiddleware,
 )
-from langgraph.graph.message import REMOVE_ALL_MESSAGES
 from langgraph.runtime import Runtime
 from langgraph.checkpoint.mongodb import MongoDBSaver
 from langchain_ollama import ChatOllama
 from langchain_openai import ChatOpenAI
-from langchain.tools import tool
+from langchain.tools import tool, ToolRuntime
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from tools import data_collector_agent_tools, data_analyst_tools
+from tools import (
+    data_collector_agent_tools,
+    data_analyst_tools,
+    response_cache,
+    rate_limiter,
+    inflight,
+    historical_store,
+)
+from projection import projection_stats
+from utils import async_variant
+from charts import Chart, chart_owner, chart_store
+from router import fast_path
+from symbols import symbol_index
+from memo import SubAgentMemo, tracing
+from chat_store import ChatStore
+from write_behind import HistoryWriter
+from checkpoint_retention import CheckpointRetention, CompressedSerializer
+from context_budget import context_budget, enforce_token_budget
+from telemetry import AgentTelemetry, annotate, metrics, tracer
 from prompts import (
     data_collector_system_prompt,
     analyst_system_prompt,
@@ -32,12 +53,25 @@ from prompts import (
 
 load_dotenv()
 
-model = ChatOpenAI(
-    model="gpt-4.1-mini-2025-04-14",
-    temperature=0,
-    api_key=os.getenv("openai"),
-    streaming=True,
-)
+
+def load_model():
+    """
+    The chat model shared by all agents. AGENT_MODEL_FACTORY="module:function"
+    swaps in another model, e.g. benchmarks.fake_llm:from_env for offline runs.
+    """
+    factory = os.getenv("AGENT_MODEL_FACTORY")
+    if factory:
+        module, _, name = factory.partition(":")
+        return getattr(importlib.import_module(module), name)()
+    return ChatOpenAI(
+        model="gpt-4.1-mini-2025-04-14",
+        temperature=0,
+        api_key=os.getenv("openai"),
+        streaming=True,
+    )
+
+
+model = load_model()
 #
 # model = ChatOllama(
 #     model="llama3.2:latest",
@@ -49,11 +83,15 @@ model = ChatOpenAI(
 #     # other params ...
 # )
 Mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-database_name = "chat_db"
+database_name = os.getenv("MONGO_DB", "chat_db")
 
 mongo_client = MongoClient(Mongo_uri)
 db = mongo_client[database_name]
-chat_collection = db["chat_history"]
+chat_store = ChatStore(db)
+history_writer = HistoryWriter.from_env(chat_store)
+checkpoint_retention = CheckpointRetention.from_env(db)
+checkpoint_serde = CompressedSerializer.from_env()
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", "0")) or None
 
 
 @dataclass
@@ -81,25 +119,6 @@ def log_after_model(state: AgentState, runtime: Runtime[Context]) -> None:
     print(f"Completed request for user: {runtime.context.user_name}")
 
 
-@before_model
-def trim_messages(state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
-    """Keep only the last few messages to fit context window."""
-    messages = state["messages"]
-    if len(messages) <= 3:
-        return None  # No changes needed
-
-    first_msg = messages[0]
-    recent_messages = messages[-3:] if len(messages) % 2 == 0 else messages[-4:]
-    new_messages = [first_msg] + recent_messages
-
-    return {
-        "messages": [
-            RemoveMessage(id=REMOVE_ALL_MESSAGES),
-            *new_messages
-        ]
-    }
-
-
 # After model hook
 @after_model
 def log_after_model(state: AgentState, runtime: Runtime[Context]) -> dict | None:
@@ -107,50 +126,69 @@ def log_after_model(state: AgentState, runtime: Runtime[Context]) -> dict | None
     return None
 
 
-@after_model
-def delete_old_messages(state: AgentState, runtime: Runtime) -> dict | None:
-    """Remove old messages to keep conversation manageable."""
-    messages = state["messages"]
-    if len(messages) > 2:
-        # remove the earliest two messages
-        return {"messages": [RemoveMessage(id=m.id) for m in messages[:2]]}
-    return None
-
-
 # -------------------------------------------------------
 # Agents
 # -------------------------------------------------------
+# Sub-agents are one-shot per tool call: checkpointer=False stops them from
+# inheriting the supervisor's checkpointer and writing a nested checkpoint
+# (with every tool result) for each of their steps.
 data_collector_agent = create_agent(
     model=model,
     tools=data_collector_agent_tools,
-    middleware=[dynamic_system_prompt, log_before_model, log_after_model],
+    middleware=[
+        dynamic_system_prompt, log_before_model, enforce_token_budget, log_after_model,
+        AgentTelemetry("data_collector"),
+    ],
     context_schema=Context,
     system_prompt=data_collector_system_prompt,
+    checkpointer=False,
 )
 
 data_analytics_agent = create_agent(
     model=model,
     tools=data_analyst_tools,
-    middleware=[dynamic_system_prompt, log_before_model, log_after_model],
+    middleware=[
+        dynamic_system_prompt, log_before_model, enforce_token_budget, log_after_model,
+        AgentTelemetry("data_analyst"),
+    ],
     context_schema=Context,
     system_prompt=analyst_system_prompt,
+    checkpointer=False,
 )
 
 
 # -------------------------------------------------------
 # Tools used by supervisor
 # -------------------------------------------------------
+# Collector answers shared across sessions until the data behind them goes stale.
+# The analyst is not memoized: its runs render charts for the calling session.
+collector_memo = SubAgentMemo.from_env(expiry_of=response_cache.expires_at)
+
+
+def _user_of(runtime: ToolRuntime) -> str | None:
+    return getattr(runtime.context, "user_name", None)
+
+
 @tool
-def collect_market_data(request: str) -> str:
+def collect_market_data(request: str, runtime: ToolRuntime) -> str:
     """
     Collect stock/market related data.
     Use this when the user asks for stock prices, fundamentals, news, indicators, company info, or raw financial data.
     """
-    result = data_collector_agent.invoke({
-        "messages": [{"role": "user", "content": request}]
-    })
+    user_name = _user_of(runtime)
+    cached = collector_memo.get(request, user_name)
+    annotate(memo="hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
+
+    with tracing() as trace:
+        result = data_collector_agent.invoke({
+            "messages": [{"role": "user", "content": request}]
+        })
+    answer = result["messages"][-1].content
+    collector_memo.put(request, user_name, answer, trace)
     print("called this tool collect_market_data")
-    return result["messages"][-1].content
+    return answer
 
 
 @tool
@@ -166,6 +204,157 @@ def analyze_market_data(request: str) -> str:
     return result["messages"][-1].content
 
 
+@async_variant(collect_market_data, safe=False)
+async def acollect_market_data(request: str, runtime: ToolRuntime) -> str:
+    user_name = _user_of(runtime)
+    cached = collector_memo.get(request, user_name)
+    annotate(memo="hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
+
+    with tracing() as trace:
+        result = await data_collector_agent.ainvoke({
+            "messages": [{"role": "user", "content": request}]
+        })
+    answer = result["messages"][-1].content
+    collector_memo.put(request, user_name, answer, trace)
+    print("called this tool collect_market_data")
+    return answer
+
+
+@async_variant(analyze_market_data, safe=False)
+async def aanalyze_market_data(request: str) -> str:
+    result = await data_analytics_agent.ainvoke({
+        "messages": [{"role": "user", "content": request}]
+    })
+    print("called this tool analyze_market_data")
+    return result["messages"][-1].content
+
+
+# -------------------------------------------------------
+# Supervisor graph (built once per process)
+# -------------------------------------------------------
+_supervisor_agent = None
+_supervisor_lock = threading.Lock()
+_supervisor_setup = {"build_ms": 0.0, "builds": 0, "reuses": 0}
+
+
+def get_supervisor_agent():
+    """
+    Lazily compile the supervisor graph with a MongoDB checkpointer that shares
+    `mongo_client` (and its connection pool) with chat_store. Every message
+    reuses the same graph; only config/context differ per request.
+    """
+    global _supervisor_agent
+    if _supervisor_agent is not None:
+        _supervisor_setup["reuses"] += 1
+        return _supervisor_agent
+
+    with _supervisor_lock:
+        if _supervisor_agent is None:
+            started = time.perf_counter()
+            checkpoint_retention.sync_ttl(CHECKPOINT_TTL)
+            checkpointer = MongoDBSaver(
+                mongo_client,
+                db_name=database_name,
+                ttl=CHECKPOINT_TTL,
+                serde=checkpoint_serde,
+            )
+            _supervisor_agent = create_agent(
+                model=model,
+                tools=[collect_market_data, analyze_market_data],
+                middleware=[
+                    dynamic_system_prompt, log_before_model, enforce_token_budget, log_after_model,
+                    AgentTelemetry("supervisor"),
+                ],
+                context_schema=Context,
+                system_prompt=supervisor_system_prompt,
+                checkpointer=checkpointer,
+            )
+            _supervisor_setup["build_ms"] = (time.perf_counter() - started) * 1000
+            _supervisor_setup["builds"] += 1
+            print(f"Supervisor graph built in {_supervisor_setup['build_ms']:.1f} ms")
+        else:
+            _supervisor_setup["reuses"] += 1
+    return _supervisor_agent
+
+
+def supervisor_setup_stats() -> dict:
+    """Setup cost paid once vs. what rebuilding per message would have cost."""
+    return {
+        **_supervisor_setup,
+        "saved_ms": round(_supervisor_setup["build_ms"] * _supervisor_setup["reuses"], 1),
+    }
+
+
+# -------------------------------------------------------
+# Metrics: component stats exported as gauges
+# -------------------------------------------------------
+metrics.register("router", fast_path.stats)
+metrics.register("symbols", symbol_index.stats)
+metrics.register("subagent_memo", collector_memo.stats)
+metrics.register("response_cache", response_cache.stats)
+metrics.register("rate_limiter", rate_limiter.stats)
+metrics.register("singleflight", inflight.stats)
+metrics.register("historical_store", historical_store.stats)
+metrics.register("projection", projection_stats.snapshot)
+metrics.register("context_budget", context_budget.stats)
+metrics.register("history_writer", history_writer.stats)
+metrics.register("checkpoint_retention", checkpoint_retention.stats)
+metrics.register("checkpoint_serde", checkpoint_serde.stats)
+metrics.register("supervisor_setup", supervisor_setup_stats)
+
+
+# -------------------------------------------------------
+# Shared event loop for driving async streams from sync code
+# -------------------------------------------------------
+_agent_loop: asyncio.AbstractEventLoop | None = None
+_agent_loop_lock = threading.Lock()
+
+
+def get_agent_loop() -> asyncio.AbstractEventLoop:
+    """One long-lived loop per process, so pooled async clients survive across messages."""
+    global _agent_loop
+    with _agent_loop_lock:
+        if _agent_loop is None:
+            _agent_loop = asyncio.new_event_loop()
+            threading.Thread(target=_agent_loop.run_forever, name="agent-loop", daemon=True).start()
+        return _agent_loop
+
+
+def iter_async(agen):
+    """
+    Consume an async generator from synchronous code (e.g. st.write_stream)
+    by running it on the shared agent loop and handing items over a queue.
+    """
+    items: queue.Queue = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put(item)
+        except BaseException as e:
+            items.put(e)
+        finally:
+            # close on this task so the generator's cleanup runs in its own context
+            await agen.aclose()
+            items.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_agent_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # consumer stopped early: stop producing
+        future.cancel()
+
+
 # -------------------------------------------------------
 # Supervisor runner (streaming)
 # -------------------------------------------------------
@@ -175,6 +364,10 @@ class SupervisorRunner:
         self.user_name = user_name
         self.session_id = session_id
         self.final_text = ""
+        self.started_at = datetime.now(timezone.utc)
+        self.trace_id: str | None = None
+        self.ttft_ms: float | None = None
+        self._t0 = time.perf_counter()
 
     def _get_config(self):
         return {
@@ -184,20 +377,82 @@ class SupervisorRunner:
             }
         }
 
+    def trace_summary(self) -> list[dict]:
+        """Finished spans of this run: the run itself, tools, model and API calls."""
+        return [span.to_dict() for span in tracer.trace(self.trace_id)] if self.trace_id else []
+
+    def pop_charts(self) -> list[Chart]:
+        """Charts rendered by the analyst tools during this session's runs."""
+        return chart_store.pop_for_owner(self.session_id)
+
     def _run_graph_sync(self):
-        with MongoDBSaver.from_conn_string(
-            conn_string=Mongo_uri,
-            db_name=database_name,
-        ) as checkpointer:
+        owner_token = chart_owner.set(self.session_id)
+        try:
+            yield from self._stream_graph()
+        finally:
+            chart_owner.reset(owner_token)
 
-            supervisor_agent = create_agent(
-                model=model,
-                tools=[collect_market_data, analyze_market_data],
-                middleware=[dynamic_system_prompt, log_before_model, log_after_model],
-                context_schema=Context,
-                system_prompt=supervisor_system_prompt,
-                checkpointer=checkpointer,
+    # ---------------------------------------------------
+    # Fast path (simple lookups answered without the LLM)
+    # ---------------------------------------------------
+    def _state_config(self):
+        # stream() records root checkpoints under the empty namespace; the state
+        # API resolves a non-empty checkpoint_ns as a subgraph, so address the thread only
+        return {"configurable": {"thread_id": self.session_id}}
+
+    def _fast_path_update(self) -> dict:
+        """The templated exchange, written to the checkpoint so follow-ups keep context."""
+        return {"messages": [HumanMessage(self.input_text), AIMessage(self.final_text)]}
+
+    def _record_fast_path(self):
+        try:
+            get_supervisor_agent().update_state(
+                self._state_config(), self._fast_path_update(), as_node="model"
+            )
+        except Exception as e:
+            print(f"Error recording fast-path answer: {e}")
+        self._after_run()
+
+    async def _arecord_fast_path(self):
+        try:
+            await get_supervisor_agent().aupdate_state(
+                self._state_config(), self._fast_path_update(), as_node="model"
             )
+        except Exception as e:
+            print(f"Error recording fast-path answer: {e}")
+        await asyncio.to_thread(self._after_run)
+
+    # ---------------------------------------------------
+    # Telemetry
+    # ---------------------------------------------------
+    def _start_span(self, span):
+        self.trace_id = span.trace_id
+        self._t0 = time.perf_counter()
+
+    def _token(self, span, path: str):
+        if self.ttft_ms is not None:
+            return
+        self.ttft_ms = (time.perf_counter() - self._t0) * 1000
+        span.attrs.update(path=path, ttft_ms=round(self.ttft_ms, 1))
+        metrics.observe("ttft_seconds", self.ttft_ms / 1000, path=path)
+
+    def _end_span(self, span, path: str):
+        span.attrs.update(path=path, answer_chars=len(self.final_text))
+        metrics.inc("runs", path=path)
+
+    def _stream_graph(self):
+        with tracer.span("run", "supervisor", session_id=self.session_id) as span:
+            self._start_span(span)
+            answer = fast_path.answer(self.input_text)
+            if answer is not None:
+                self.final_text = answer
+                self._token(span, "fast_path")
+                yield answer
+                self._record_fast_path()
+                self._end_span(span, "fast_path")
+                return
+
+            supervisor_agent = get_supervisor_agent()
 
             for event in supervisor_agent.stream(
                 {"messages": [("human", self.input_text)]},
@@ -208,46 +463,73 @@ class SupervisorRunner:
                 msg, _ = event
 
                 if isinstance(msg, AIMessageChunk) and msg.content:
+                    self._token(span, "agent")
                     self.final_text += msg.content
                     yield msg.content
 
             # Save history once completed
-            self._save_chat_history(self.final_text)
+            self._after_run()
+            self._end_span(span, "agent")
+
+    # ---------------------------------------------------
+    # Async streaming
+    # ---------------------------------------------------
+    async def astream(self):
+        """
+        Async generator of answer tokens. Sub-agent tools run through their
+        coroutines, so parallel tool calls from the supervisor overlap.
+        """
+        owner_token = chart_owner.set(self.session_id)
+        try:
+            with tracer.span("run", "supervisor", session_id=self.session_id) as span:
+                self._start_span(span)
+                answer = await fast_path.aanswer(self.input_text)
+                if answer is not None:
+                    self.final_text = answer
+                    self._token(span, "fast_path")
+                    yield answer
+                    await self._arecord_fast_path()
+                    self._end_span(span, "fast_path")
+                    return
+
+                supervisor_agent = get_supervisor_agent()
+
+                async for msg, _ in supervisor_agent.astream(
+                    {"messages": [("human", self.input_text)]},
+                    context=Context(user_name=self.user_name),
+                    config=self._get_config(),
+                    stream_mode="messages",
+                ):
+                    if isinstance(msg, AIMessageChunk) and msg.content:
+                        self._token(span, "agent")
+                        self.final_text += msg.content
+                        yield msg.content
+
+                await asyncio.to_thread(self._after_run)
+                self._end_span(span, "agent")
+        finally:
+            chart_owner.reset(owner_token)
+
+    def stream(self):
+        """Sync view of astream() for callers such as st.write_stream."""
+        yield from iter_async(self.astream())
+
+    def _after_run(self):
+        self._save_chat_history(self.final_text)
+        checkpoint_retention.schedule(self.session_id)
 
     # ---------------------------------------------------
     # Save chat history (MongoDB)
     # ---------------------------------------------------
     def _save_chat_history(self, txt_only: str):
         try:
-            formatted_input_time = datetime.now(timezone.utc).strftime(
-                "%Y-%m-%dT%H:%M:%S"
-            )
-            formatted_answer_time = datetime.now(timezone.utc).strftime(
-                "%Y-%m-%dT%H:%M:%S"
+            history_writer.submit(
+                session_id=self.session_id,
+                user_name=self.user_name,
+                prompt=self.input_text,
+                answer=txt_only,
+                prompt_time=self.started_at,
+                answer_time=datetime.now(timezone.utc),
             )
-            chat_date = datetime.now().strftime("%Y-%m-%d")
-
-            message_entry = {
-                "prompt": self.input_text,
-                "prompt_timestamp": formatted_input_time,
-                "answer": txt_only,
-                "answer_timestamp": formatted_answer_time,
-            }
-
-            chat_collection.update_one(
-                {"session_id": self.session_id},
-                {
-                    "$push": {f"messages.{chat_date}": message_entry},
-                    "$setOnInsert": {
-                        "session_id": self.session_id,
-                        "user_name": self.user_name,
-                        "created_at": formatted_input_time,
-                    },
-                },
-                upsert=True,
-            )
-
-            print(f"Chat history saved for session {self.session_id}")
-
         except Exception as e:
             print(f"Error saving chat history: {e}")
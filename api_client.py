@@ -0,0 +1,223 @@
+import asyncio
+import os
+import random
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from telemetry import BYTES_BUCKETS, annotate, metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _record_response(endpoint: str, attempt: int, status_code: int, size: int):
+    annotate(http_status=status_code, attempts=attempt + 1, payload_bytes=size)
+    metrics.inc("api_requests", endpoint=endpoint, status=status_code)
+    metrics.inc("api_retries", attempt, endpoint=endpoint)
+    metrics.observe("api_payload_bytes", size, BYTES_BUCKETS, endpoint=endpoint)
+
+
+class _RetryPolicy:
+    """
+    Connection settings and backoff rules shared by the sync and async clients.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        pool_size: int = 20,
+        limiter=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.limiter = limiter
+        self.headers = {
+            "X-Api-Key": api_key or "",
+            "Accept": "application/json",
+        }
+
+    @classmethod
+    def from_env(cls, base_url: str, api_key: str | None, limiter=None):
+        return cls(
+            base_url=base_url,
+            api_key=api_key,
+            connect_timeout=float(os.getenv("INDIAN_API_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("INDIAN_API_READ_TIMEOUT", "10")),
+            max_retries=int(os.getenv("INDIAN_API_MAX_RETRIES", "3")),
+            backoff_base=float(os.getenv("INDIAN_API_BACKOFF_BASE", "0.5")),
+            backoff_max=float(os.getenv("INDIAN_API_BACKOFF_MAX", "8")),
+            pool_size=int(os.getenv("INDIAN_API_POOL_SIZE", "20")),
+            limiter=limiter,
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _retry_after(self, headers) -> float | None:
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+            seconds = (when - datetime.now(timezone.utc)).total_seconds()
+
+        # never let a misbehaving header park a tool call for minutes
+        return min(max(seconds, 0.0), self.backoff_max * 4)
+
+    def _retry_delay(self, status_code: int, headers, attempt: int) -> float | None:
+        """Seconds to wait before retrying, or None if the response is final."""
+        if status_code not in RETRY_STATUSES or attempt == self.max_retries:
+            return None
+        delay = self._retry_after(headers)
+        if status_code == 429 and self.limiter is not None:
+            # hold back every caller sharing this key, not just this one
+            self.limiter.penalize(delay if delay is not None else self.backoff_base)
+        return self._backoff(attempt) if delay is None else delay
+
+    @staticmethod
+    def _parse(status_code: int, text: str, data_fn):
+        if status_code != 200:
+            raise ValueError(f"API returned {status_code}: {text}")
+
+        data = data_fn()
+        if not data:
+            raise ValueError("Empty response received from API")
+
+        return data
+
+
+class IndianAPIClient(_RetryPolicy):
+    """
+    Shared HTTP client for stock.indianapi.in.
+
+    One requests.Session with a pooled HTTPAdapter is reused by every tool call,
+    so TCP+TLS connections are kept alive between requests. urllib3's pool is
+    thread-safe, so a single instance can be shared across Streamlit sessions.
+    Transient failures (connection errors, timeouts, 429 and 5xx) are retried
+    with jittered exponential backoff, honoring Retry-After when present.
+    Every attempt, retries included, takes a slot from the optional limiter.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+
+    # ---------------------------------------------------
+    # Requests
+    # ---------------------------------------------------
+    def get_json(self, endpoint: str, params: dict | None = None):
+        url = f"{self.base_url}{endpoint}"
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                resp = self.session.get(
+                    url,
+                    params=params,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            delay = self._retry_delay(resp.status_code, resp.headers, attempt)
+            if delay is None:
+                break
+            time.sleep(delay)
+
+        _record_response(endpoint, attempt, resp.status_code, len(resp.content))
+        return self._parse(resp.status_code, resp.text, resp.json)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncIndianAPIClient(_RetryPolicy):
+    """
+    asyncio counterpart of IndianAPIClient built on httpx.
+
+    httpx.AsyncClient is bound to the event loop it was first used on, so one
+    pooled client is kept per running loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def get_json(self, endpoint: str, params: dict | None = None):
+        client = self._client()
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if self.limiter is not None:
+                await self.limiter.aacquire()
+            try:
+                resp = await client.get(endpoint, params=params)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            delay = self._retry_delay(resp.status_code, resp.headers, attempt)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+        _record_response(endpoint, attempt, resp.status_code, len(resp.content))
+        return self._parse(resp.status_code, resp.text, resp.json)
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
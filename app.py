@@ -1,21 +1,40 @@
 import streamlit as st
 import uuid
 import os
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from pymongo import MongoClient
 from langchain_core.messages import AIMessageChunk
-from agent import SupervisorRunner, Context
+from agent import SupervisorRunner, Context, chat_store, history_writer
+from router import fast_path
+from prefetch import start_prefetcher
+from telemetry import metrics, start_metrics_server
 from dotenv import load_dotenv
 load_dotenv()
+
 # -------------------------------------------------------
-# MongoDB
+# Rerun timings (shown in the notes panel)
 # -------------------------------------------------------
-Mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-DB_NAME = "chat_db"
+rerun_started = time.perf_counter()
+timings: dict[str, float] = {}
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - started) * 1000
+
 
-mongo = MongoClient(Mongo_uri)
-db = mongo[DB_NAME]
-chat_collection = db["chat_history"]
+# -------------------------------------------------------
+# MongoDB (agent.py's client and chat store, one per process)
+# -------------------------------------------------------
+SESSIONS_PAGE_SIZE = 20
+HISTORY_PAGE_SIZE = 25
+# bounds staleness for writes made by other processes; own writes invalidate immediately
+HISTORY_CACHE_TTL = int(os.getenv("HISTORY_CACHE_TTL", "300"))
 
 # -------------------------------------------------------
 # Page Config
@@ -28,6 +47,43 @@ st.set_page_config(
 
 st.title("🤖 Stock Market Multi-Agent Assistant")
 
+
+# -------------------------------------------------------
+# Background prefetch (one scheduler per process)
+# -------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def init_prefetcher():
+    prefetcher = start_prefetcher()
+    metrics.register("prefetch", prefetcher.stats)
+    return prefetcher
+
+
+if os.getenv("PREFETCH_ENABLED", "1") == "1":
+    init_prefetcher()
+
+
+# -------------------------------------------------------
+# Metrics endpoint (/metrics, /metrics.json; one server per process)
+# -------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def init_metrics_server():
+    return start_metrics_server()
+
+
+init_metrics_server()
+
+
+# -------------------------------------------------------
+# Chat store (indexes + one-time migration per process)
+# -------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def init_chat_store():
+    chat_store.ensure_indexes()
+    return chat_store.migrate_legacy()
+
+
+init_chat_store()
+
 # -------------------------------------------------------
 # Session State
 # -------------------------------------------------------
@@ -40,38 +96,87 @@ if "active_session" not in st.session_state:
 if "sessions" not in st.session_state:
     st.session_state.sessions = []
 
+if "charts" not in st.session_state:
+    st.session_state.charts = {}
+
+if "session_pages" not in st.session_state:
+    st.session_state.session_pages = 1
+
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 1
+
+if "last_trace" not in st.session_state:
+    st.session_state.last_trace = []
+
 
 # -------------------------------------------------------
 # Helpers
 # -------------------------------------------------------
-def load_sessions():
-    sessions = chat_collection.find(
-        {}, {"session_id": 1, "created_at": 1}
-    ).sort("created_at", -1)
-    return list(sessions)
+# Mongo pages are cached per write version: history_writer bumps it when an
+# exchange reaches the store, so a rerun without new messages reads nothing.
+@st.cache_data(ttl=HISTORY_CACHE_TTL, max_entries=200, show_spinner=False)
+def fetch_sessions(pages, version):
+    sessions, cursor = [], None
+    for _ in range(pages):
+        page, cursor = chat_store.list_sessions(limit=SESSIONS_PAGE_SIZE, before=cursor)
+        sessions.extend(page)
+        if not cursor:
+            break
+    return sessions, cursor
+
+
+@st.cache_data(ttl=HISTORY_CACHE_TTL, max_entries=200, show_spinner=False)
+def fetch_messages(session_id, pages, version):
+    messages, cursor = [], None
+    for _ in range(pages):
+        page, cursor = chat_store.load_messages(session_id, limit=HISTORY_PAGE_SIZE, before=cursor)
+        messages = page + messages
+        if not cursor:
+            break
+    return messages, cursor
+
 
+def load_sessions(pages):
+    """Newest sessions, `pages` pages deep; returns (sessions, cursor for more)."""
+    # snapshot queued sessions before reading the version: once flushed they are in Mongo
+    pending = history_writer.pending_sessions()
+    sessions, cursor = fetch_sessions(pages, history_writer.version())
 
-def load_messages(session_id):
-    doc = chat_collection.find_one({"session_id": session_id})
-    if not doc:
-        return []
+    # new sessions whose first exchange is still in the write-behind queue
+    known = {s["session_id"] for s in sessions}
+    queued = [s for s in pending if s["session_id"] not in known]
+    return queued + sessions, cursor
 
-    messages = []
-    for day in sorted(doc.get("messages", {})):
-        for m in doc["messages"][day]:
-            messages.append({"role": "user", "content": m["prompt"]})
-            messages.append({"role": "assistant", "content": m["answer"]})
-    return messages
+
+def load_messages(session_id, pages):
+    """Latest exchanges, `pages` pages deep; returns (messages, cursor for more)."""
+    pending = history_writer.pending_messages(session_id)
+    messages, cursor = fetch_messages(session_id, pages, history_writer.version(session_id))
+
+    if pending and messages[-len(pending):] != pending:
+        messages = messages + pending
+    return messages, cursor
+
+
+def show_chart(chart):
+    if chart.format == "svg":
+        st.image(chart.data.decode("utf-8"), caption=chart.title)
+    else:
+        st.image(chart.data, caption=chart.title)
 
 
 def new_session():
     sid = str(uuid.uuid4())
     st.session_state.active_session = sid
+    st.session_state.history_pages = 1
     st.rerun()
 
 
+# imports, page config, cached resources and session state
+timings["setup"] = (time.perf_counter() - rerun_started) * 1000
+
 # -------------------------------------------------------
-# Sidebar — Sessions + User
+# Sidebar — User (the session list is filled in last)
 # -------------------------------------------------------
 with st.sidebar:
     st.header("🧑 User")
@@ -87,14 +192,6 @@ with st.sidebar:
     if st.button("➕ New Session"):
         new_session()
 
-    st.session_state.sessions = load_sessions()
-
-    for s in st.session_state.sessions:
-        label = f"Session • {s['created_at'][:10]}"
-        if st.button(label, key=s["session_id"]):
-            st.session_state.active_session = s["session_id"]
-            st.rerun()
-
 # -------------------------------------------------------
 # Main Layout
 # -------------------------------------------------------
@@ -107,12 +204,22 @@ with col_chat:
     if not st.session_state.active_session:
         st.info("Select a session or create a new one.")
     else:
-        history = load_messages(st.session_state.active_session)
+        with phase("history"):
+            history, more_history = load_messages(
+                st.session_state.active_session, st.session_state.history_pages
+            )
+
+        if more_history and st.button("Load earlier messages"):
+            st.session_state.history_pages += 1
+            st.rerun()
 
         for msg in history:
             with st.chat_message(msg["role"]):
                 st.markdown(msg["content"])
 
+        for chart in st.session_state.charts.get(st.session_state.active_session, []):
+            show_chart(chart)
+
 # -------------------------------------------------------
 # Chat Input
 # -------------------------------------------------------
@@ -130,10 +237,37 @@ if st.session_state.active_session:
             session_id=st.session_state.active_session,
         )
 
-        with col_chat:
+        with phase("answer"), col_chat:
             with st.chat_message("assistant"):
-                final_answer = st.write_stream(runner._run_graph_sync)
+                final_answer = st.write_stream(runner.stream)
 
+            # the streamed answer is already on screen; show new charts below it
+            # instead of rerunning the whole script
+            charts = runner.pop_charts()
+            for chart in charts:
+                show_chart(chart)
+
+        st.session_state.charts.setdefault(
+            st.session_state.active_session, []
+        ).extend(charts)
+        st.session_state.last_trace = runner.trace_summary()
+
+# -------------------------------------------------------
+# Sidebar — Sessions (after the answer, so a new session is listed)
+# -------------------------------------------------------
+with st.sidebar:
+    with phase("sessions"):
+        st.session_state.sessions, more_sessions = load_sessions(st.session_state.session_pages)
+
+    for s in st.session_state.sessions:
+        label = f"Session • {s['created_at']:%Y-%m-%d}"
+        if st.button(label, key=s["session_id"]):
+            st.session_state.active_session = s["session_id"]
+            st.session_state.history_pages = 1
+            st.rerun()
+
+    if more_sessions and st.button("Older sessions"):
+        st.session_state.session_pages += 1
         st.rerun()
 
 # -------------------------------------------------------
@@ -142,3 +276,25 @@ if st.session_state.active_session:
 with col_tools:
     st.markdown("### 🔧 Agent Notes")
     st.caption("Tool execution visible here in future builds.")
+
+    routing = fast_path.stats()
+    if routing["queries"]:
+        st.caption(
+            f"Fast path: {routing['fast_path']}/{routing['queries']} questions "
+            f"answered without the agents ({routing['fast_path_ratio']:.0%})"
+        )
+
+    with st.expander("⏱️ Rerun timings"):
+        for name, ms in timings.items():
+            st.caption(f"{name}: {ms:.1f} ms")
+        st.caption(f"total: {(time.perf_counter() - rerun_started) * 1000:.1f} ms")
+
+    if st.session_state.last_trace:
+        with st.expander("🧭 Last answer trace"):
+            for span in st.session_state.last_trace:
+                detail = ", ".join(
+                    f"{k}={span[k]}" for k in ("cache", "payload_bytes", "tokens_in", "tokens_out", "ttft_ms", "memo")
+                    if k in span
+                )
+                st.caption(f"{span['name']} {span['target']}: {span['duration_ms']:.0f} ms"
+                           + (f" ({detail})" if detail else ""))
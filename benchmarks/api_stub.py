@@ -0,0 +1,182 @@
+"""
+Local stand-in for stock.indianapi.in.
+
+Serves every endpoint used in tools.py from benchmarks.payloads with a
+configurable latency, so the agents can be exercised without an API key or
+quota. Point the app at it with INDIAN_API_BASE_URL:
+
+    python -m benchmarks.api_stub --port 8765 --latency-ms 120 --jitter-ms 40
+    INDIAN_API_BASE_URL=http://127.0.0.1:8765 INDIAN_API_KEY=stub streamlit run app.py
+
+Record live responses once (uses quota) to replay real payloads instead:
+
+    python -m benchmarks.api_stub --record benchmarks/recorded
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks.payloads import ENDPOINTS, payload_for, recorded_path
+
+
+class APIStub:
+    """Threaded HTTP server replaying payloads after `latency_ms` ± `jitter_ms`."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        recorded_dir: str | None = None,
+        seed: int = 7,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.recorded_dir = recorded_dir
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies: dict[str, bytes] = {}
+        self.requests: Counter = Counter()
+        self.bytes_sent = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay(self) -> float:
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def _body(self, endpoint: str, params: dict) -> bytes | None:
+        key = f"{endpoint}?{sorted(params.items())}"
+        with self._lock:
+            body = self._bodies.get(key)
+        if body is None:
+            payload = payload_for(endpoint, params, self.recorded_dir)
+            if payload is None:
+                return None
+            body = json.dumps(payload).encode("utf-8")
+            with self._lock:
+                self._bodies[key] = body
+        return body
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        url = urlsplit(handler.path)
+        endpoint = url.path
+        body = self._body(endpoint, dict(parse_qsl(url.query)))
+        time.sleep(self._delay())
+
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.bytes_sent += len(body or b"")
+        if body is None:
+            body = json.dumps({"error": f"unknown endpoint {endpoint}"}).encode("utf-8")
+            handler.send_response(404)
+        else:
+            handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self) -> "APIStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="api-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "by_endpoint": dict(self.requests),
+                "bytes_sent": self.bytes_sent,
+            }
+
+
+# Parameters used when recording one response per endpoint.
+RECORD_PARAMS = {
+    "/stock": {"name": "Reliance"},
+    "/industry_search": {"query": "bank"},
+    "/mutual_fund_search": {"query": "index"},
+    "/stock_target_price": {"stock_id": "RELIANCE"},
+    "/stock_forecasts": {
+        "stock_id": "RELIANCE",
+        "measure_code": "EPS",
+        "period_type": "Annual",
+        "data_type": "Actuals",
+        "age": "Current",
+    },
+    "/historical_data": {"stock_name": "Reliance", "period": "1yr", "filter": "default"},
+    "/historical_stats": {"stock_name": "Reliance", "stats": "quarter_results"},
+}
+
+
+def record(directory: str):
+    """Fetch one live response per endpoint and save it for replay."""
+    from tools import api_client
+
+    os.makedirs(directory, exist_ok=True)
+    for endpoint in ENDPOINTS:
+        try:
+            payload = api_client.get_json(endpoint, RECORD_PARAMS.get(endpoint))
+        except Exception as e:
+            print(f"  {endpoint:<32} failed: {e}")
+            continue
+        with open(recorded_path(directory, endpoint), "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        print(f"  {endpoint:<32} saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--recorded", default=None, help="directory of recorded payloads to replay")
+    parser.add_argument("--record", metavar="DIR", default=None, help="record live responses into DIR and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+        return
+
+    stub = APIStub(args.host, args.port, args.latency_ms, args.jitter_ms, args.recorded).start()
+    print(f"API stub on {stub.base_url} ({args.latency_ms:g} ± {args.jitter_ms:g} ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Candlestick rendering benchmark.
+
+Compares the previous per-row implementation (two Line2D artists per bar via
+df.iterrows()) against charts.render_candlestick (one collection per series)
+and against a repeat request served from the content-addressed chart cache.
+
+    python -m benchmarks.candlestick --bars 2500 --repeat 3
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+import charts
+
+
+def synthetic_ohlc(bars: int, seed: int = 7) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    close = 1000 + np.cumsum(rng.normal(0, 10, bars))
+    open_ = close + rng.normal(0, 5, bars)
+    high = np.maximum(open_, close) + rng.uniform(0, 8, bars)
+    low = np.minimum(open_, close) - rng.uniform(0, 8, bars)
+    dates = pd.bdate_range(end="2026-10-16", periods=bars).strftime("%Y-%m-%d")
+    return [
+        {"date": d, "open": o, "high": h, "low": lo, "close": c}
+        for d, o, h, lo, c in zip(dates, open_, high, low, close)
+    ]
+
+
+def legacy_render_candlestick(data: list, fmt: str = "png") -> bytes:
+    """The pre-vectorization implementation, on a per-call Figure."""
+    df = charts._frame(data)
+    fig, ax = charts._figure()
+    for _, row in df.iterrows():
+        ax.plot([row["date"], row["date"]], [row["low"], row["high"]])
+        ax.plot([row["date"], row["date"]], [row["open"], row["close"]], linewidth=4)
+
+    ax.set_title("OHLC (Candlestick Style)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price")
+    return charts._encode(fig, fmt)
+
+
+def _time(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=2500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fmt", default="png", choices=sorted(charts.FORMATS))
+    args = parser.parse_args()
+
+    data = synthetic_ohlc(args.bars)
+    charts.chart_cache.clear()
+
+    results = {
+        "legacy (iterrows)": _time(lambda: legacy_render_candlestick(data, args.fmt), args.repeat),
+        "vectorized": _time(lambda: charts.render_candlestick(data, args.fmt), args.repeat),
+    }
+    charts.render("bench", charts.render_candlestick, data, fmt=args.fmt)  # warm the cache
+    results["cached"] = _time(
+        lambda: charts.render("bench", charts.render_candlestick, data, fmt=args.fmt),
+        args.repeat,
+    )
+
+    baseline = statistics.median(results["legacy (iterrows)"])
+    print(f"{args.bars} bars, {args.fmt}, median of {args.repeat} runs")
+    for name, samples in results.items():
+        median = statistics.median(samples)
+        print(f"  {name:<20} {median * 1000:10.1f} ms   x{baseline / median:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Offline end-to-end benchmark of the agent system.
+
+Starts the local API stub (benchmarks.api_stub) and swaps in the scripted
+chat model (benchmarks.fake_llm). It then drives SupervisorRunner through
+the scenarios in benchmarks.scenarios and reports p50/p95 latency, time to
+first token, throughput and memory. No OpenAI or stock.indianapi.in calls
+are made.
+
+    python -m benchmarks.e2e --iterations 20 --api-latency-ms 80 --llm-latency-ms 300
+    python -m benchmarks.e2e --save-baseline benchmarks/baseline.json
+    python -m benchmarks.e2e --baseline benchmarks/baseline.json --tolerance 0.15
+
+Chat history and checkpoints are written to MongoDB (MONGO_URI), in the
+"chat_bench" database, so persistence is part of the measurement as in the
+app. The command exits with status 1 when a metric regresses past the
+tolerance against the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.api_stub import APIStub
+from benchmarks.scenarios import SCENARIOS
+
+# metric -> True when higher is better
+COMPARED = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "ttft_p50_ms": False,
+    "throughput_rps": True,
+}
+
+
+def configure(args, stub: APIStub):
+    """Point tools/agent at the stub and the fake model; must run before `import agent`."""
+    os.environ.update({
+        "INDIAN_API_BASE_URL": stub.base_url,
+        "INDIAN_API_KEY": "benchmark",
+        "INDIAN_API_RATE": "0",
+        "AGENT_MODEL_FACTORY": "benchmarks.fake_llm:from_env",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_CHUNK_MS": str(args.llm_chunk_ms),
+        "MONGO_DB": args.mongo_db,
+        "HISTORICAL_STORE_DIR": tempfile.mkdtemp(prefix="bench-historical-"),
+        # stub listings must not reach the app's learned index (data/symbols.json)
+        "SYMBOL_INDEX_PATH": "",
+    })
+    os.environ.pop("RESPONSE_CACHE_PATH", None)
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return round(float(np.percentile(samples, q)), 1) if samples else 0.0
+
+
+def rss_mb() -> float:
+    """Current resident set size (peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def reset_caches(agent):
+    """Drop in-process caches so every request pays for its API calls (--cold)."""
+    import charts
+    agent.response_cache.clear()
+    agent.collector_memo.clear()
+    charts.chart_cache.clear()
+
+
+def run_one(agent, prompt: str, session_id: str) -> tuple[float, float | None]:
+    runner = agent.SupervisorRunner(input_text=prompt, user_name="benchmark", session_id=session_id)
+    started = time.perf_counter()
+    for _ in runner.stream():
+        pass
+    elapsed = (time.perf_counter() - started) * 1000
+    runner.pop_charts()
+    return elapsed, runner.ttft_ms
+
+
+def run_scenario(agent, stub: APIStub, scenario, args) -> dict:
+    agent.fast_path.enabled = scenario.fast_path
+    run_id = uuid.uuid4().hex[:8]
+
+    for i in range(args.warmup):
+        run_one(agent, scenario.prompts[i % len(scenario.prompts)], f"bench-{run_id}-warmup-{i}")
+
+    api_before = stub.stats()["requests"]
+    llm_before = agent.model.calls
+    rss_before = rss_mb()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    latencies, ttfts = [], []
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        if args.cold:
+            reset_caches(agent)
+        elapsed, ttft = run_one(agent, scenario.prompts[i % len(scenario.prompts)], f"bench-{run_id}-{i}")
+        latencies.append(elapsed)
+        if ttft is not None:
+            ttfts.append(ttft)
+    wall = time.perf_counter() - started
+
+    result = {
+        "requests": args.iterations,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "mean_ms": round(float(np.mean(latencies)), 1),
+        "ttft_p50_ms": percentile(ttfts, 50),
+        "ttft_p95_ms": percentile(ttfts, 95),
+        "throughput_rps": round(args.iterations / wall, 2),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+        "api_calls_per_request": round((stub.stats()["requests"] - api_before) / args.iterations, 2),
+        "llm_calls_per_request": round((agent.model.calls - llm_before) / args.iterations, 2),
+    }
+    if tracemalloc.is_tracing():
+        result["py_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print the change per metric; return the regressions beyond `tolerance`."""
+    regressions = []
+    print(f"\nAgainst baseline ({baseline.get('meta', {}).get('created_at', 'unknown')}), tolerance {tolerance:.0%}")
+    for name, current in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"  {name:<12} no baseline")
+            continue
+        cells = []
+        for metric, higher_is_better in COMPARED.items():
+            if not base.get(metric):
+                continue
+            change = (current[metric] - base[metric]) / base[metric]
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > tolerance else ""
+            cells.append(f"{metric} {change:+.1%}{flag}")
+            if flag:
+                regressions.append(f"{name}.{metric}: {base[metric]} -> {current[metric]}")
+        print(f"  {name:<12} " + "   ".join(cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--cold", action="store_true", help="clear in-process caches before every request")
+    parser.add_argument("--api-latency-ms", type=float, default=80.0)
+    parser.add_argument("--api-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--recorded", default=None, help="directory of recorded API payloads to replay")
+    parser.add_argument("--llm-latency-ms", type=float, default=250.0, help="fake model time to first chunk")
+    parser.add_argument("--llm-chunk-ms", type=float, default=1.0, help="fake model delay between chunks")
+    parser.add_argument("--mongo-db", default="chat_bench")
+    parser.add_argument("--trace-memory", action="store_true", help="also report Python peak allocations (slower)")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--save-baseline", default=None, help="write results as the new baseline")
+    parser.add_argument("--baseline", default=None, help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    stub = APIStub(latency_ms=args.api_latency_ms, jitter_ms=args.api_jitter_ms, recorded_dir=args.recorded).start()
+    configure(args, stub)
+    import agent
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    results = {}
+    for name in args.scenarios.split(","):
+        scenario = SCENARIOS[name.strip()]
+        results[scenario.name] = run_scenario(agent, stub, scenario, args)
+        r = results[scenario.name]
+        print(f"{scenario.name:<12} p50 {r['p50_ms']:8.1f} ms   p95 {r['p95_ms']:8.1f} ms   "
+              f"ttft p50 {r['ttft_p50_ms']:8.1f} ms   {r['throughput_rps']:6.2f} req/s   "
+              f"rss {r['rss_mb']:7.1f} MB ({r['rss_growth_mb']:+.1f})   "
+              f"api {r['api_calls_per_request']:.1f}/req   llm {r['llm_calls_per_request']:.1f}/req")
+
+    agent.history_writer.flush(timeout=30)
+    stub.stop()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "save_baseline", "baseline")},
+        },
+        "scenarios": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Deterministic stand-in for the chat model.
+
+ScriptedChatModel plays the supervisor, data collector and analyst: the
+agent it is serving is told apart by the tools bound to it, and what it
+does follows a fixed script keyed on the request text, so every run issues
+the same tool calls in the same order. Final answers are streamed in word
+chunks after `latency_ms` (time to first token) with `chunk_ms` between
+chunks.
+
+Selected in agent.py with AGENT_MODEL_FACTORY=benchmarks.fake_llm:from_env.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from benchmarks.payloads import price_series
+from symbols import ALIASES
+
+_ALIASES = sorted(ALIASES, key=len, reverse=True)
+_WORD = re.compile(r"\S+\s*")
+ANSWER_CHARS = 1200
+
+
+def symbols_in(text: str, default: str = "Reliance") -> list[str]:
+    """Symbols mentioned in the text, in order of appearance."""
+    lowered = f" {text.lower()} "
+    found = []
+    for alias in _ALIASES:
+        match = re.search(rf"(?<![\w&]){re.escape(alias)}(?![\w&])", lowered)
+        if match and ALIASES[alias] not in (name for _, name in found):
+            found.append((match.start(), ALIASES[alias]))
+            lowered = lowered[:match.start()] + " " * len(alias) + lowered[match.end():]
+    return [name for _, name in sorted(found)] or [default]
+
+
+def _call(tool: str, /, **args) -> dict:
+    return {"name": tool, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}
+
+
+def _price_records(symbol: str, days: int = 250) -> list[dict]:
+    rng = random.Random(symbol)
+    return [
+        {"date": d, "close": p, "volume": rng.randint(10_000, 5_000_000)}
+        for d, p in price_series(rng, int(days * 1.45), rng.uniform(100, 5000))
+    ][-days:]
+
+
+# -------------------------------------------------------
+# Scripts per agent (round = tool-call turns since the last human message)
+# -------------------------------------------------------
+def supervisor_script(request: str, round_: int, results: list[str]) -> list[dict] | None:
+    text = request.lower()
+    symbols = symbols_in(request)
+    if any(word in text for word in ("chart", "plot", "graph")):
+        if round_ == 0:
+            return [_call("collect_market_data", request=f"historical data for {symbols[0]} over 1yr")]
+        if round_ == 1:
+            return [_call("analyze_market_data", request=f"plot the price trend of {symbols[0]}")]
+        return None
+    if any(word in text for word in ("compare", "versus", " vs ", "analy")):
+        if round_ == 0:
+            data = "current quotes and valuation" if "valuation" in text else "current quotes"
+            return [_call("collect_market_data", request=f"{data} for {', '.join(symbols)}")]
+        if round_ == 1:
+            return [_call("analyze_market_data", request=f"compare {', '.join(symbols)} using indicators")]
+        return None
+    if round_ == 0:
+        return [_call("collect_market_data", request=request)]
+    return None
+
+
+COLLECTOR_KEYWORDS = [
+    (("historical", "history"), lambda s: _call("historical_data", stock_name=s, period="1yr")),
+    (("news",), lambda s: _call("get_market_news")),
+    (("ipo",), lambda s: _call("get_ipo_data")),
+    (("trending", "gainers", "losers"), lambda s: _call("get_trending_stocks")),
+    (("most active",), lambda s: _call("nse_most_active")),
+    (("52",), lambda s: _call("fetch_52_week_high_low")),
+    (("shocker",), lambda s: _call("price_shockers")),
+    (("commodit",), lambda s: _call("get_commodities")),
+    (("mutual fund",), lambda s: _call("get_mutual_funds")),
+    (("target",), lambda s: _call("stock_target_price", stock_id=s)),
+    (("quarter", "results"), lambda s: _call("historical_stats", stock_name=s, stats="quarter_results")),
+]
+
+
+# several symbols in one request -> one bulk call
+BULK_KEYWORDS = [
+    (("target",), lambda s: _call("stock_target_price_bulk", stock_ids=s)),
+    (("quarter", "results"), lambda s: _call("historical_stats_bulk", stock_names=s, stats="quarter_results")),
+]
+
+
+def collector_script(request: str, round_: int, results: list[str]) -> list[dict] | None:
+    if round_ > 0:
+        return None
+    text = request.lower()
+    symbols = symbols_in(request)
+    if len(symbols) > 1:
+        for keywords, make in BULK_KEYWORDS:
+            if any(word in text for word in keywords):
+                return [make(symbols)]
+        if "valuation" in text:
+            return [_call("get_stock_by_name_bulk", names=symbols, fields=["currentPrice", "keyMetrics.valuation"])]
+        return [_call("get_stock_by_name_bulk", names=symbols)]
+    symbol = symbols[0]
+    for keywords, make in COLLECTOR_KEYWORDS:
+        if any(word in text for word in keywords):
+            return [make(symbol)]
+    return [_call("get_stock_by_name", name=symbol)]
+
+
+def analyst_script(request: str, round_: int, results: list[str]) -> list[dict] | None:
+    if round_ > 0:
+        return None
+    symbols = symbols_in(request)
+    if any(word in request.lower() for word in ("plot", "chart")):
+        return [_call("plot_stock_price_trend", data=_price_records(symbols[0]))]
+    return [_call("compute_indicators", data={symbol: _price_records(symbol) for symbol in symbols})]
+
+
+SCRIPTS = [
+    ("collect_market_data", supervisor_script),
+    ("get_stock_by_name", collector_script),
+    ("plot_stock_price_trend", analyst_script),
+]
+
+
+# -------------------------------------------------------
+# Chat model
+# -------------------------------------------------------
+class ScriptedChatModel(BaseChatModel):
+    latency_ms: float = 0.0
+    chunk_ms: float = 0.0
+    tool_names: list[str] = []
+    _calls: dict = PrivateAttr(default_factory=lambda: {"count": 0, "lock": threading.Lock()})
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def calls(self) -> int:
+        return self._calls["count"]
+
+    def bind_tools(self, tools, **kwargs: Any):
+        names = [t["name"] if isinstance(t, dict) else t.name for t in tools]
+        bound = self.model_copy(update={"tool_names": names})
+        bound._calls = self._calls  # count calls across the bound copies
+        return bound
+
+    def _reply(self, messages) -> AIMessage:
+        with self._calls["lock"]:
+            self._calls["count"] += 1
+
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        turn = messages[last_human:]
+        request = str(turn[0].content) if turn else ""
+        round_ = sum(1 for m in turn if isinstance(m, AIMessage) and m.tool_calls)
+        results = [str(m.content) for m in turn if isinstance(m, ToolMessage)]
+
+        script = next((fn for tool, fn in SCRIPTS if tool in self.tool_names), None)
+        calls = script(request, round_, results) if script else None
+        if calls:
+            return AIMessage(content="", tool_calls=calls)
+
+        summary = " ".join(results)[:ANSWER_CHARS] if results else "No data was needed."
+        return AIMessage(content=f"Here is what I found for: {request}\n\n{summary}")
+
+    @staticmethod
+    def _chunks(message: AIMessage):
+        if message.tool_calls:
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ])
+            return
+        for word in _WORD.findall(message.content):
+            yield AIMessageChunk(content=word)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        for i, chunk in enumerate(self._chunks(self._reply(messages))):
+            if i and self.chunk_ms:
+                time.sleep(self.chunk_ms / 1000)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency_ms / 1000)
+        for i, chunk in enumerate(self._chunks(self._reply(messages))):
+            if i and self.chunk_ms:
+                await asyncio.sleep(self.chunk_ms / 1000)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+def from_env() -> ScriptedChatModel:
+    """Model factory for AGENT_MODEL_FACTORY; timings from FAKE_LLM_LATENCY_MS / FAKE_LLM_CHUNK_MS."""
+    return ScriptedChatModel(
+        latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+        chunk_ms=float(os.getenv("FAKE_LLM_CHUNK_MS", "0")),
+    )
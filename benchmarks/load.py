@@ -0,0 +1,367 @@
+"""
+Concurrent-session load test of SupervisorRunner.
+
+Many users against one process, as in the deployed container: every user
+has its own session_id and streams answers from its own thread, which is how
+Streamlit runs scripts. The API is served by the local stub
+(benchmarks.api_stub) and the model is the scripted one
+(benchmarks.fake_llm); MongoDB is real (MONGO_URI, "chat_load" database).
+
+Two ways to apply load, stepped through increasing levels:
+
+    # closed loop: N users, each asking again after an exponential think time
+    python -m benchmarks.load --users 1,2,4,8,16,32 --duration 30 --think-ms 2000
+
+    # open loop: Poisson arrivals at R requests/second, one new session each
+    python -m benchmarks.load --rates 1,2,4,8 --duration 60 --mix lookup=6,fast_path=3,chart=1
+
+Each level reports time to first token and completion latency (p50/p95/p99),
+error rate, throughput, MongoDB commands and server time per request, the
+shared event loop's scheduling lag and the history writer backlog. The
+saturation point is the first level where throughput stops growing or the
+latency/error limits are crossed. Its likely bottleneck is the span (model,
+tool, api) whose time per request grew the most since the first level.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import monitoring
+
+from benchmarks.api_stub import APIStub
+from benchmarks.e2e import configure, percentile, rss_mb
+from benchmarks.scenarios import SCENARIOS
+
+DEFAULT_MIX = "lookup=5,fast_path=3,multi_tool=1,chart=1"
+
+
+# -------------------------------------------------------
+# Probes
+# -------------------------------------------------------
+class MongoOps(monitoring.CommandListener):
+    """Counts the MongoDB commands this process sends and their server time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commands: Counter = Counter()
+        self.failures = 0
+        self.micros = 0
+
+    def started(self, event):
+        with self._lock:
+            self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        with self._lock:
+            self.micros += event.duration_micros
+
+    def failed(self, event):
+        with self._lock:
+            self.failures += 1
+            self.micros += event.duration_micros
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"commands": Counter(self.commands), "failures": self.failures, "micros": self.micros}
+
+
+class LoopLag:
+    """Samples how late the shared agent event loop gets to a scheduled no-op."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = 0.05):
+        self.loop = loop
+        self.interval = interval
+        self._samples: list[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loop-lag", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            try:
+                asyncio.run_coroutine_threadsafe(asyncio.sleep(0), self.loop).result(timeout=5)
+            except Exception:
+                pass
+            self._samples.append((time.perf_counter() - started) * 1000)
+
+    def start(self) -> "LoopLag":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def take(self) -> list[float]:
+        samples, self._samples = self._samples, []
+        return samples
+
+
+def span_times() -> dict[str, tuple[int, float]]:
+    """(calls, seconds) per span name:target from the telemetry histograms."""
+    from telemetry import metrics
+    series = metrics.snapshot()["histograms"].get("span_duration_seconds", [])
+    return {
+        f"{s['labels'].get('span')}:{s['labels'].get('target')}": (s["count"], s["sum"])
+        for s in series
+    }
+
+
+def span_errors() -> float:
+    from telemetry import metrics
+    return sum(s["value"] for s in metrics.snapshot()["counters"].get("span_errors", []))
+
+
+# -------------------------------------------------------
+# Load
+# -------------------------------------------------------
+def parse_mix(text: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def pick(mix: list[tuple[str, float]], rng: random.Random) -> tuple[str, str]:
+    name = rng.choices([n for n, _ in mix], weights=[w for _, w in mix])[0]
+    return name, rng.choice(SCENARIOS[name].prompts)
+
+
+def run_request(agent, scenario: str, prompt: str, session_id: str, arrived: float) -> dict:
+    """One answer; latency counts from `arrived`, so open-loop queueing is included."""
+    runner = agent.SupervisorRunner(input_text=prompt, user_name="load", session_id=session_id)
+    sample = {"scenario": scenario, "error": None, "ttft_ms": None}
+    try:
+        for _ in runner.stream():
+            if sample["ttft_ms"] is None:
+                sample["ttft_ms"] = (time.perf_counter() - arrived) * 1000
+        if not runner.final_text:
+            sample["error"] = "EmptyAnswer"
+    except Exception as e:
+        sample["error"] = type(e).__name__
+    sample["latency_ms"] = (time.perf_counter() - arrived) * 1000
+    runner.pop_charts()
+    return sample
+
+
+def closed_loop(agent, users: int, args, mix, prefix: str) -> list[dict]:
+    samples: list[dict] = []
+    deadline = time.perf_counter() + args.duration
+
+    def user(n: int):
+        rng = random.Random(f"{args.seed}-{prefix}-{n}")
+        session_id = f"{prefix}-u{n}"
+        while time.perf_counter() < deadline:
+            scenario, prompt = pick(mix, rng)
+            samples.append(run_request(agent, scenario, prompt, session_id, time.perf_counter()))
+            if args.think_ms:
+                time.sleep(min(rng.expovariate(1000 / args.think_ms), max(0.0, deadline - time.perf_counter())))
+
+    threads = [threading.Thread(target=user, args=(n,), name=f"user-{n}") for n in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+def open_loop(agent, rate: float, args, mix, prefix: str) -> list[dict]:
+    rng = random.Random(f"{args.seed}-{prefix}")
+    futures = []
+    started = time.perf_counter()
+    arrival = started
+    with ThreadPoolExecutor(max_workers=args.max_inflight, thread_name_prefix="arrival") as pool:
+        n = 0
+        while arrival < started + args.duration:
+            time.sleep(max(0.0, arrival - time.perf_counter()))
+            scenario, prompt = pick(mix, rng)
+            futures.append(pool.submit(run_request, agent, scenario, prompt, f"{prefix}-s{n}", arrival))
+            arrival += rng.expovariate(rate)
+            n += 1
+    return [f.result() for f in futures]
+
+
+# -------------------------------------------------------
+# Report
+# -------------------------------------------------------
+def summarize(samples, wall, mongo_before, mongo_after, spans_before, spans_after, errors, lag, writer) -> dict:
+    ok = [s for s in samples if not s["error"]]
+    latencies = [s["latency_ms"] for s in ok]
+    ttfts = [s["ttft_ms"] for s in ok if s["ttft_ms"] is not None]
+    n = max(len(samples), 1)
+
+    commands = mongo_after["commands"] - mongo_before["commands"]
+    spans = {}
+    for key, (calls, seconds) in spans_after.items():
+        calls_before, seconds_before = spans_before.get(key, (0, 0.0))
+        if calls > calls_before and not key.startswith("run:"):
+            spans[key] = {
+                "calls": calls - calls_before,
+                "avg_ms": round((seconds - seconds_before) * 1000 / (calls - calls_before), 1),
+                "per_request_ms": round((seconds - seconds_before) * 1000 / n, 1),
+            }
+
+    return {
+        "requests": len(samples),
+        "errors": dict(Counter(s["error"] for s in samples if s["error"])),
+        "error_rate": round((len(samples) - len(ok)) / n, 4),
+        "span_errors_per_request": round(errors / n, 3),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "ttft_p50_ms": percentile(ttfts, 50),
+        "ttft_p95_ms": percentile(ttfts, 95),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mongo_ops_per_request": round(sum(commands.values()) / n, 2),
+        "mongo_ops": dict(commands.most_common()),
+        "mongo_failures": mongo_after["failures"] - mongo_before["failures"],
+        "mongo_ms_per_request": round((mongo_after["micros"] - mongo_before["micros"]) / 1000 / n, 2),
+        "loop_lag_p95_ms": percentile(lag, 95),
+        "loop_lag_max_ms": round(max(lag), 1) if lag else 0.0,
+        "writer_queue_depth": writer["queue_depth"],
+        "writer_max_depth": writer["max_depth"],
+        "rss_mb": round(rss_mb(), 1),
+        "by_scenario": {
+            name: {
+                "requests": sum(1 for s in samples if s["scenario"] == name),
+                "p50_ms": percentile([s["latency_ms"] for s in ok if s["scenario"] == name], 50),
+            }
+            for name in sorted({s["scenario"] for s in samples})
+        },
+        "spans": dict(sorted(spans.items(), key=lambda item: -item[1]["per_request_ms"])),
+    }
+
+
+def saturation(levels: list[dict], args) -> dict | None:
+    """First level past the knee, with the reason and the spans that grew most."""
+    for prev, level in zip(levels, levels[1:]):
+        r, p = level["result"], prev["result"]
+        reasons = []
+        if r["throughput_rps"] < p["throughput_rps"] * (1 + args.min_gain):
+            reasons.append(f"throughput {p['throughput_rps']} -> {r['throughput_rps']} req/s")
+        if args.slo_ms and r["p95_ms"] > args.slo_ms:
+            reasons.append(f"p95 {r['p95_ms']} ms > {args.slo_ms:g} ms")
+        if r["error_rate"] > args.max_error_rate:
+            reasons.append(f"error rate {r['error_rate']:.1%}")
+        if reasons:
+            base = levels[0]["result"]["spans"]
+            growth = sorted(
+                (
+                    (stats["per_request_ms"] - base.get(key, {}).get("per_request_ms", 0.0), key)
+                    for key, stats in r["spans"].items()
+                ),
+                reverse=True,
+            )
+            return {
+                "level": level["level"],
+                "reasons": reasons,
+                "grew_most": [f"{key} +{ms:.0f} ms/request" for ms, key in growth[:3] if ms > 0],
+                "loop_lag_p95_ms": r["loop_lag_p95_ms"],
+                "mongo_ms_per_request": r["mongo_ms_per_request"],
+            }
+    return None
+
+
+def print_level(label: str, r: dict):
+    errors = ", ".join(f"{k} {v}" for k, v in r["errors"].items())
+    print(f"{label:<10} {r['requests']:5d} req  {r['throughput_rps']:6.2f} req/s  "
+          f"err {r['error_rate']:6.1%}  ttft p50/p95 {r['ttft_p50_ms']:7.0f}/{r['ttft_p95_ms']:7.0f} ms  "
+          f"p50/p95/p99 {r['p50_ms']:7.0f}/{r['p95_ms']:7.0f}/{r['p99_ms']:7.0f} ms  "
+          f"mongo {r['mongo_ops_per_request']:5.1f} ops {r['mongo_ms_per_request']:6.1f} ms/req  "
+          f"loop lag p95 {r['loop_lag_p95_ms']:6.1f} ms  writer q {r['writer_queue_depth']}"
+          + (f"  [{errors}]" if errors else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--users", default=None, help="closed loop: comma-separated concurrent users per level")
+    load.add_argument("--rates", default=None, help="open loop: comma-separated arrivals/second per level")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per level")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="closed loop: mean pause between a user's questions")
+    parser.add_argument("--max-inflight", type=int, default=256, help="open loop: concurrent requests before arrivals queue")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,... from benchmarks.scenarios")
+    parser.add_argument("--no-fast-path", action="store_true", help="send every question through the agents")
+    parser.add_argument("--api-latency-ms", type=float, default=80.0)
+    parser.add_argument("--api-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--recorded", default=None, help="directory of recorded API payloads to replay")
+    parser.add_argument("--llm-latency-ms", type=float, default=250.0, help="fake model time to first chunk")
+    parser.add_argument("--llm-chunk-ms", type=float, default=1.0, help="fake model delay between chunks")
+    parser.add_argument("--mongo-db", default="chat_load")
+    parser.add_argument("--slo-ms", type=float, default=0.0, help="p95 latency that counts as saturated (0 = off)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-gain", type=float, default=0.10, help="throughput growth below this marks the knee")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+    if not args.users and not args.rates:
+        args.users = "1,2,4,8,16"
+
+    mix = parse_mix(args.mix)
+    mode = "users" if args.users else "rate"
+    levels_arg = [float(x) for x in (args.users or args.rates).split(",")]
+
+    mongo_ops = MongoOps()
+    monitoring.register(mongo_ops)  # before agent creates its MongoClient
+    stub = APIStub(latency_ms=args.api_latency_ms, jitter_ms=args.api_jitter_ms, recorded_dir=args.recorded).start()
+    configure(args, stub)
+    import agent
+
+    agent.fast_path.enabled = not args.no_fast_path
+    lag_probe = LoopLag(agent.get_agent_loop()).start()
+    run_id = uuid.uuid4().hex[:8]
+    run_request(agent, "warmup", SCENARIOS["lookup"].prompts[0], f"load-{run_id}-warmup", time.perf_counter())
+    agent.history_writer.flush(timeout=30)
+    lag_probe.take()
+
+    print(f"{mode} levels {levels_arg}, {args.duration:g}s each, mix {args.mix}")
+    levels = []
+    for value in levels_arg:
+        label = f"{mode}={value:g}"
+        prefix = f"load-{run_id}-{mode}{value:g}"
+        mongo_before, spans_before, errors_before = mongo_ops.snapshot(), span_times(), span_errors()
+
+        started = time.perf_counter()
+        if mode == "users":
+            samples = closed_loop(agent, int(value), args, mix, prefix)
+        else:
+            samples = open_loop(agent, value, args, mix, prefix)
+        wall = time.perf_counter() - started
+        writer = agent.history_writer.stats()
+        lag = lag_probe.take()
+        agent.history_writer.flush(timeout=60)  # attribute this level's writes to it
+
+        result = summarize(
+            samples, wall, mongo_before, mongo_ops.snapshot(), spans_before, span_times(),
+            span_errors() - errors_before, lag, writer,
+        )
+        levels.append({"level": label, "result": result})
+        print_level(label, result)
+
+    lag_probe.stop()
+    stub.stop()
+
+    knee = saturation(levels, args)
+    if knee:
+        print(f"\nSaturation at {knee['level']}: {'; '.join(knee['reasons'])}")
+        print(f"  grew most since {levels[0]['level']}: {', '.join(knee['grew_most']) or 'nothing measured'}")
+        print(f"  event loop lag p95 {knee['loop_lag_p95_ms']} ms, MongoDB {knee['mongo_ms_per_request']} ms/request")
+    else:
+        print("\nNo saturation within the tested levels")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "levels": levels, "saturation": knee}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
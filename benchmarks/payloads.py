@@ -0,0 +1,365 @@
+"""
+Payloads served by the local API stub.
+
+Every endpoint used in tools.py has a deterministic generator that mirrors
+the shape (and roughly the size) of stock.indianapi.in responses, seeded by
+endpoint and query parameters. Responses recorded from the live API with
+
+    python -m benchmarks.api_stub --record benchmarks/recorded
+
+are replayed instead when present.
+"""
+import json
+import os
+import random
+import zlib
+from datetime import date, timedelta
+
+COMPANIES = [
+    ("RELIANCE", "Reliance Industries", "Oil & Gas"),
+    ("TCS", "Tata Consultancy Services", "IT Services"),
+    ("INFY", "Infosys", "IT Services"),
+    ("HDFCBANK", "HDFC Bank", "Banks"),
+    ("ICICIBANK", "ICICI Bank", "Banks"),
+    ("SBIN", "State Bank of India", "Banks"),
+    ("BHARTIARTL", "Bharti Airtel", "Telecom"),
+    ("ITC", "ITC", "FMCG"),
+    ("HINDUNILVR", "Hindustan Unilever", "FMCG"),
+    ("LT", "Larsen & Toubro", "Construction"),
+    ("WIPRO", "Wipro", "IT Services"),
+    ("MARUTI", "Maruti Suzuki", "Automobiles"),
+    ("TATASTEEL", "Tata Steel", "Metals"),
+    ("SUNPHARMA", "Sun Pharmaceutical", "Pharma"),
+    ("TITAN", "Titan", "Consumer Durables"),
+    ("NTPC", "NTPC", "Power"),
+    ("ONGC", "ONGC", "Oil & Gas"),
+    ("ASIANPAINT", "Asian Paints", "Paints"),
+    ("BAJFINANCE", "Bajaj Finance", "Finance"),
+    ("ADANIPORTS", "Adani Ports", "Infrastructure"),
+]
+
+PERIOD_DAYS = {"1m": 30, "6m": 182, "1yr": 365, "3yr": 3 * 365, "5yr": 5 * 365, "10yr": 10 * 365, "max": 15 * 365}
+END_DATE = date(2026, 10, 16)
+
+ENDPOINTS = [
+    "/news",
+    "/ipo",
+    "/stock",
+    "/industry_search",
+    "/mutual_fund_search",
+    "/trending",
+    "/fetch_52_week_high_low_data",
+    "/NSE_most_active",
+    "/BSE_most_active",
+    "/mutual_funds",
+    "/price_shockers",
+    "/commodities",
+    "/stock_target_price",
+    "/stock_forecasts",
+    "/historical_data",
+    "/historical_stats",
+]
+
+
+def _rng(endpoint: str, params: dict) -> random.Random:
+    return random.Random(zlib.crc32(f"{endpoint}?{sorted(params.items())}".encode("utf-8")))
+
+
+def _price(rng: random.Random) -> float:
+    return round(rng.uniform(100, 5000), 2)
+
+
+def _row(rng: random.Random, ticker: str, name: str) -> dict:
+    price = _price(rng)
+    change = round(rng.uniform(-6, 6), 2)
+    return {
+        "ticker_id": ticker,
+        "company_name": name,
+        "price": f"{price:.2f}",
+        "percent_change": f"{change:.2f}",
+        "net_change": f"{price * change / 100:.2f}",
+        "bid": f"{price - 0.05:.2f}",
+        "ask": f"{price + 0.05:.2f}",
+        "high": f"{price * 1.02:.2f}",
+        "low": f"{price * 0.98:.2f}",
+        "open": f"{price * 0.995:.2f}",
+        "volume": str(rng.randint(10_000, 5_000_000)),
+        "year_high": f"{price * 1.3:.2f}",
+        "year_low": f"{price * 0.7:.2f}",
+        "exchange_type": rng.choice(["NSI", "BOM"]),
+        "ric": f"{ticker}.NS",
+    }
+
+
+def _rows(rng: random.Random, count: int) -> list[dict]:
+    picks = rng.sample(COMPANIES, min(count, len(COMPANIES)))
+    return [_row(rng, ticker, name) for ticker, name, _ in picks]
+
+
+def price_series(rng: random.Random, days: int, start: float) -> list[tuple[str, float]]:
+    values, price = [], start
+    day = END_DATE - timedelta(days=days)
+    while day <= END_DATE:
+        if day.weekday() < 5:
+            price = max(1.0, price * (1 + rng.gauss(0, 0.015)))
+            values.append((day.isoformat(), round(price, 2)))
+        day += timedelta(days=1)
+    return values
+
+
+def _company(name: str) -> tuple[str, str, str]:
+    lowered = (name or "").lower()
+    for company in COMPANIES:
+        if lowered in (company[0].lower(), company[1].lower()) or lowered in company[1].lower():
+            return company
+    return (name.upper().replace(" ", "")[:10] or "UNKNOWN", name or "Unknown", "Diversified")
+
+
+# -------------------------------------------------------
+# Endpoint generators
+# -------------------------------------------------------
+def news(rng, params):
+    return [
+        {
+            "title": f"{name} shares move {rng.choice(['higher', 'lower'])} on {rng.choice(['results', 'order win', 'guidance', 'block deal'])}",
+            "summary": " ".join(rng.choice(["market", "stock", "index", "earnings", "growth", "outlook"]) for _ in range(60)),
+            "url": f"https://news.example.com/{ticker.lower()}/{i}",
+            "image_url": f"https://img.example.com/{i}.jpg",
+            "pub_date": (END_DATE - timedelta(hours=i)).isoformat(),
+            "source": rng.choice(["Mint", "ET Markets", "Moneycontrol"]),
+            "topics": ["markets", sector.lower()],
+        }
+        for i, (ticker, name, sector) in enumerate(COMPANIES * 2)
+    ]
+
+
+def ipo(rng, params):
+    def issue(status):
+        price = rng.randint(100, 900)
+        return {
+            "symbol": f"IPO{rng.randint(100, 999)}",
+            "name": f"{rng.choice(['Alpha', 'Bharat', 'Nova', 'Shree'])} {rng.choice(['Tech', 'Infra', 'Foods', 'Finance'])} Ltd",
+            "status": status,
+            "is_sme": rng.random() < 0.4,
+            "min_price": price,
+            "max_price": price + rng.randint(5, 40),
+            "lot_size": rng.choice([15, 25, 50, 100]),
+            "bidding_start_date": (END_DATE + timedelta(days=rng.randint(-20, 20))).isoformat(),
+            "document_url": "https://example.com/drhp.pdf",
+            "additional_text": "Retail quota 35%, QIB 50%, NII 15%.",
+        }
+    return {status: [issue(status) for _ in range(12)] for status in ("upcoming", "active", "listed", "closed")}
+
+
+def stock(rng, params):
+    ticker, name, sector = _company(params.get("name", ""))
+    price = _price(rng)
+    years = [f"{year}" for year in range(2015, 2026)]
+    return {
+        "tickerId": ticker,
+        "companyName": name,
+        "industry": sector,
+        "companyProfile": {
+            "companyDescription": " ".join(["A leading Indian company in", sector] * 40),
+            "mgIndustry": sector,
+            "isInId": f"INE{rng.randint(100000, 999999)}",
+            "officers": {"officer": [{"firstName": f"Officer{i}", "title": "Director"} for i in range(15)]},
+            "peerCompanyList": [_row(rng, t, n) for t, n, _ in rng.sample(COMPANIES, 8)],
+        },
+        "currentPrice": {"BSE": f"{price:.2f}", "NSE": f"{price + 0.35:.2f}"},
+        "stockTechnicalData": [
+            {"days": days, "bsePrice": f"{price * rng.uniform(0.8, 1.2):.2f}", "nsePrice": f"{price * rng.uniform(0.8, 1.2):.2f}"}
+            for days in (5, 10, 20, 50, 100, 300)
+        ],
+        "percentChange": f"{rng.uniform(-4, 4):.2f}",
+        "yearHigh": f"{price * 1.3:.2f}",
+        "yearLow": f"{price * 0.7:.2f}",
+        "financials": [
+            {
+                "FiscalYear": year,
+                "Type": "Annual",
+                "stockFinancialMap": {
+                    statement: [{"key": f"{statement}{i}", "value": f"{rng.uniform(1e3, 1e6):.4f}"} for i in range(40)]
+                    for statement in ("CAS", "BAL", "INC")
+                },
+            }
+            for year in years
+        ],
+        "keyMetrics": {
+            group: [{"key": f"{group}{i}", "value": f"{rng.uniform(0, 100):.6f}"} for i in range(20)]
+            for group in ("valuation", "growth", "margins", "financialstrength", "persharedata")
+        },
+        "analystView": [{"ratingName": r, "numberOfAnalystsLatest": str(rng.randint(0, 20))} for r in ("Strong Buy", "Buy", "Hold", "Sell")],
+        "recosBar": {"meanValue": round(rng.uniform(1, 5), 2), "noOfRecommendations": rng.randint(5, 40)},
+        "riskMeter": {"categoryName": rng.choice(["Low", "Moderate", "High"]), "stdDev": round(rng.uniform(10, 40), 2)},
+        "shareholding": [
+            {"categoryName": c, "categories": [{"holdingDate": f"{y}-03-31", "percentage": f"{rng.uniform(0, 60):.2f}"} for y in years[-8:]]}
+            for c in ("Promoter", "FII", "MF", "Other")
+        ],
+        "recentNews": news(rng, {})[:15],
+        "listingDate": "1995-11-29",
+    }
+
+
+def industry_search(rng, params):
+    query = params.get("query", "")
+    return [
+        {"id": f"S{rng.randint(1000, 9999)}", "commonName": f"{query.title()} {name}", "mgIndustry": sector,
+         "mgSector": sector, "exchangeCodeBse": str(rng.randint(500000, 599999)), "exchangeCodeNsi": ticker}
+        for ticker, name, sector in rng.sample(COMPANIES, 15)
+    ]
+
+
+def _fund(rng, name):
+    return {
+        "fund_name": name,
+        "latest_nav": round(rng.uniform(10, 900), 4),
+        "percentage_change": round(rng.uniform(-2, 2), 4),
+        "asset_size": round(rng.uniform(100, 50000), 2),
+        "1_month_return": round(rng.uniform(-5, 5), 4),
+        "1_year_return": round(rng.uniform(-10, 40), 4),
+        "3_year_return": round(rng.uniform(0, 25), 4),
+        "5_year_return": round(rng.uniform(0, 20), 4),
+        "star_rating": rng.randint(1, 5),
+    }
+
+
+def mutual_fund_search(rng, params):
+    query = params.get("query", "")
+    return [{"id": f"MF{i}", "schemeName": f"{query.title()} Fund {i} Direct Growth", "isin": f"INF{rng.randint(10**8, 10**9)}"} for i in range(12)]
+
+
+def mutual_funds(rng, params):
+    return {
+        category: {
+            sub: [_fund(rng, f"{rng.choice(['SBI', 'HDFC', 'ICICI', 'Axis', 'Nippon'])} {sub} Fund {i}") for i in range(25)]
+            for sub in subs
+        }
+        for category, subs in {
+            "Equity": ("Large Cap", "Mid Cap", "Small Cap", "Flexi Cap"),
+            "Debt": ("Liquid", "Gilt", "Corporate Bond"),
+            "Hybrid": ("Aggressive", "Balanced Advantage"),
+        }.items()
+    }
+
+
+def trending(rng, params):
+    return {"trending_stocks": {"top_gainers": _rows(rng, 15), "top_losers": _rows(rng, 15)}}
+
+
+def week_52(rng, params):
+    return {
+        f"{exchange}_52WeekHighLow": {"high52Week": _rows(rng, 15), "low52Week": _rows(rng, 15)}
+        for exchange in ("BSE", "NSE")
+    }
+
+
+def most_active(rng, params):
+    return _rows(rng, 20)
+
+
+def price_shockers(rng, params):
+    return {"BSE_PriceShocker": _rows(rng, 15), "NSE_PriceShocker": _rows(rng, 15)}
+
+
+def commodities(rng, params):
+    return [
+        {"contractId": f"C{i}", "commoditySymbol": symbol, "lastTradedPrice": _price(rng),
+         "percentageChange": round(rng.uniform(-3, 3), 2), "expiryDate": "2026-11-30", "openInterest": rng.randint(100, 90000)}
+        for i, symbol in enumerate(["GOLD", "SILVER", "CRUDEOIL", "NATURALGAS", "COPPER", "ZINC", "ALUMINIUM", "LEAD"])
+    ]
+
+
+def stock_target_price(rng, params):
+    price = _price(rng)
+    return {
+        "priceTarget": {"Mean": round(price * 1.12, 2), "High": round(price * 1.4, 2), "Low": round(price * 0.85, 2),
+                        "NumberOfEstimates": rng.randint(5, 40), "CurrencyCode": "INR"},
+        "recommendation": {"Mean": round(rng.uniform(1, 5), 2), "Statistics": [{"Recommendation": i, "NumberOfAnalysts": rng.randint(0, 15)} for i in range(1, 6)]},
+    }
+
+
+def stock_forecasts(rng, params):
+    return [
+        {"Year": 2022 + i, "Mean": round(rng.uniform(1e3, 1e5), 2), "High": round(rng.uniform(1e3, 1e5), 2),
+         "Low": round(rng.uniform(1e3, 1e5), 2), "NumberOfEstimates": rng.randint(3, 30), "Actual": i < 4}
+        for i in range(8)
+    ]
+
+
+def historical_data(rng, params):
+    days = PERIOD_DAYS.get(params.get("period", "1yr"), 365)
+    series = price_series(rng, days, _price(rng))
+    return {
+        "datasets": [
+            {"metric": "Price", "label": "Price on NSE", "values": [[d, f"{p:.2f}"] for d, p in series]},
+            {"metric": "DMA50", "label": "50 DMA", "values": [[d, round(p * 0.98, 2)] for d, p in series]},
+            {"metric": "DMA200", "label": "200 DMA", "values": [[d, round(p * 0.95, 2)] for d, p in series]},
+            {"metric": "Volume", "label": "Volume", "values": [[d, rng.randint(10_000, 5_000_000), {"delivery": rng.randint(10, 90)}] for d, _ in series]},
+        ]
+    }
+
+
+# statement lines per /historical_stats `stats` (as many as the real statements carry)
+STATEMENT_LINES = {
+    "quarter_results": (
+        "Sales", "Expenses", "Operating Profit", "OPM %", "Other Income", "Interest",
+        "Depreciation", "Profit before tax", "Tax %", "Net Profit", "EPS in Rs",
+    ),
+    "balancesheet": (
+        "Equity Capital", "Reserves", "Borrowings", "Other Liabilities", "Total Liabilities",
+        "Fixed Assets", "CWIP", "Investments", "Other Assets", "Total Assets",
+    ),
+    "cashflow": (
+        "Cash from Operating Activity", "Cash from Investing Activity",
+        "Cash from Financing Activity", "Net Cash Flow",
+    ),
+}
+
+
+def historical_stats(rng, params):
+    stats = params.get("stats", "quarter_results")
+    if stats == "quarter_results":
+        periods = [f"{month} {year}" for year in range(2015, 2026) for month in ("Mar", "Jun", "Sep", "Dec")]
+    else:
+        periods = [f"Mar {year}" for year in range(2014, 2026)]
+    lines = STATEMENT_LINES.get(stats, STATEMENT_LINES["quarter_results"])
+    return {line: {period: round(rng.uniform(1e3, 1e5), 2) for period in periods} for line in lines}
+
+
+GENERATORS = {
+    "/news": news,
+    "/ipo": ipo,
+    "/stock": stock,
+    "/industry_search": industry_search,
+    "/mutual_fund_search": mutual_fund_search,
+    "/trending": trending,
+    "/fetch_52_week_high_low_data": week_52,
+    "/NSE_most_active": most_active,
+    "/BSE_most_active": most_active,
+    "/mutual_funds": mutual_funds,
+    "/price_shockers": price_shockers,
+    "/commodities": commodities,
+    "/stock_target_price": stock_target_price,
+    "/stock_forecasts": stock_forecasts,
+    "/historical_data": historical_data,
+    "/historical_stats": historical_stats,
+}
+
+
+# -------------------------------------------------------
+# Recorded payloads
+# -------------------------------------------------------
+def recorded_path(directory: str, endpoint: str) -> str:
+    return os.path.join(directory, endpoint.strip("/") + ".json")
+
+
+def payload_for(endpoint: str, params: dict, recorded_dir: str | None = None):
+    """Recorded response for the endpoint if one exists, else the synthetic one (None if unknown)."""
+    if recorded_dir:
+        path = recorded_path(recorded_dir, endpoint)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    generator = GENERATORS.get(endpoint)
+    return generator(_rng(endpoint, params), params) if generator else None
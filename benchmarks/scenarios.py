@@ -0,0 +1,64 @@
+"""
+Benchmark scenarios: the questions sent through SupervisorRunner.
+
+Each scenario cycles through its prompts. The fake model's scripts
+(benchmarks.fake_llm) turn them into the same tool calls on every run.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str
+    prompts: tuple[str, ...]
+    fast_path: bool = False  # let router.fast_path answer lookups it recognizes
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario(
+            "lookup",
+            "one data-collector call per question (supervisor -> collector -> one API call)",
+            (
+                "What is the current price of TCS and how has it been doing?",
+                "Give me the latest quote and key metrics for Infosys",
+                "Which stocks are trending today and why?",
+                "What are the upcoming IPOs I should look at?",
+                "Show the quarter results for HDFC Bank",
+            ),
+        ),
+        Scenario(
+            "fast_path",
+            "simple lookups answered by the router's templates without the agents",
+            (
+                "price of tcs",
+                "top gainers",
+                "upcoming ipos",
+                "nse most active",
+                "52 week highs",
+            ),
+            fast_path=True,
+        ),
+        Scenario(
+            "multi_tool",
+            "one bulk collector call for all symbols followed by an analyst call with indicators",
+            (
+                "Compare TCS and Infosys",
+                "Compare HDFC Bank vs ICICI Bank vs Axis Bank",
+                "Analyze Reliance and ONGC for me",
+                "Compare the valuation of TCS and Wipro",
+            ),
+        ),
+        Scenario(
+            "chart",
+            "historical data collection followed by chart rendering in the analyst",
+            (
+                "Plot a chart of Reliance's price over the last year",
+                "Show me a price chart for Tata Steel",
+                "Plot the trend of Titan",
+            ),
+        ),
+    )
+}
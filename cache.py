@@ -0,0 +1,282 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any
+
+# -------------------------------------------------------
+# Freshness rules (seconds) per Indian API endpoint
+# -------------------------------------------------------
+DEFAULT_TTL = 300
+
+ENDPOINT_TTLS = {
+    # intraday, changes every tick
+    "/trending": 30,
+    "/price_shockers": 30,
+    "/NSE_most_active": 60,
+    "/BSE_most_active": 60,
+    "/commodities": 60,
+    "/stock": 60,
+    # slower moving market data
+    "/news": 300,
+    "/fetch_52_week_high_low_data": 300,
+    "/industry_search": 3600,
+    "/mutual_fund_search": 3600,
+    "/mutual_funds": 3600,
+    "/historical_data": 3600,
+    # fundamentals / calendars
+    "/stock_target_price": 6 * 3600,
+    "/stock_forecasts": 6 * 3600,
+    "/ipo": 6 * 3600,
+    "/historical_stats": 12 * 3600,
+}
+
+
+def ttl_for(endpoint: str) -> int:
+    return ENDPOINT_TTLS.get(endpoint, DEFAULT_TTL)
+
+
+def make_key(endpoint: str, params: dict | None = None) -> str:
+    """
+    Build a stable cache key from endpoint + normalized params.
+    None values are dropped, keys are sorted and string values are stripped.
+    """
+    normalized = {}
+    for k, v in (params or {}).items():
+        if v is None:
+            continue
+        normalized[k] = v.strip() if isinstance(v, str) else v
+    return f"{endpoint}?{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+# -------------------------------------------------------
+# In-memory LRU with per-entry expiry
+# -------------------------------------------------------
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache where every entry carries its own expiry.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: str) -> tuple[float, Any] | None:
+        """(expires_at, value) of a live entry without touching LRU order or stats."""
+        with self._lock:
+            item = self._data.get(key)
+        if item is None or item[0] <= time.time():
+            return None
+        return item
+
+    def set(self, key: str, value: Any, ttl: float, expires_at: float | None = None):
+        with self._lock:
+            self._data[key] = (expires_at or time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# -------------------------------------------------------
+# Optional on-disk tier (SQLite)
+# -------------------------------------------------------
+class DiskCache:
+    """
+    SQLite-backed tier so cached responses survive Streamlit restarts
+    and can be shared between processes on the same volume.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, value BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> tuple[float, Any] | None:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT expires_at, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[0] <= now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return row[0], pickle.loads(row[1])
+
+    def set(self, key: str, value: Any, expires_at: float):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, expires_at, accessed_at, value) "
+                "VALUES (?, ?, ?, ?)",
+                (key, expires_at, time.time(), blob),
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+# -------------------------------------------------------
+# Response cache used by tools._get
+# -------------------------------------------------------
+class ResponseCache:
+    """
+    Two-tier cache for Indian API responses: in-memory LRU in front of an
+    optional SQLite file. TTLs come from ENDPOINT_TTLS.
+    """
+
+    def __init__(self, max_entries: int = 1024, disk_path: str | None = None):
+        self.memory = TTLCache(max_entries=max_entries)
+        self.disk = DiskCache(disk_path) if disk_path else None
+        self.disk_hits = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+            disk_path=os.getenv("RESPONSE_CACHE_PATH") or None,
+        )
+
+    def get(self, endpoint: str, params: dict | None = None) -> Any | None:
+        key = make_key(endpoint, params)
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+
+        try:
+            item = self.disk.get(key)
+        except sqlite3.Error as e:
+            print(f"Response cache disk read failed: {e}")
+            return None
+        if item is None:
+            return None
+
+        expires_at, value = item
+        self.disk_hits += 1
+        self.memory.set(key, value, ttl=0, expires_at=expires_at)
+        return value
+
+    def set(self, endpoint: str, params: dict | None, value: Any, ttl: float | None = None):
+        key = make_key(endpoint, params)
+        ttl = ttl_for(endpoint) if ttl is None else ttl
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, ttl=ttl, expires_at=expires_at)
+
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at)
+            except sqlite3.Error as e:
+                print(f"Response cache disk write failed: {e}")
+
+    def expires_at(self, endpoint: str, params: dict | None = None) -> float | None:
+        """When the in-memory copy of this response goes stale (None if not cached)."""
+        item = self.memory.peek(make_key(endpoint, params))
+        return item[0] if item else None
+
+    def invalidate(self, endpoint: str, params: dict | None = None):
+        key = make_key(endpoint, params)
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        stats = self.memory.stats()
+        stats["disk_enabled"] = self.disk is not None
+        stats["disk_hits"] = self.disk_hits
+        # memory misses that were served from disk are hits overall
+        stats["misses"] -= self.disk_hits
+        stats["hits"] += self.disk_hits
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 3) if total else 0.0
+        return stats
@@ -0,0 +1,244 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from matplotlib import dates as mdates
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+from cache import TTLCache
+
+# -------------------------------------------------------
+# Headless rendering
+#
+# Each render_* function builds its own Figure (no pyplot state machine) and
+# returns encoded image bytes, so renders are independent and can run in the
+# worker pool concurrently.
+# -------------------------------------------------------
+FORMATS = {"png", "svg"}
+
+
+def _figure(figsize=(10, 5)):
+    fig = Figure(figsize=figsize)
+    return fig, fig.add_subplot()
+
+
+def _encode(fig: Figure, fmt: str) -> bytes:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported chart format '{fmt}', expected one of {sorted(FORMATS)}")
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def _frame(data: list) -> pd.DataFrame:
+    # projected record lists carry an "... N more rows omitted" note
+    df = pd.DataFrame([row for row in data if isinstance(row, dict)])
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def render_price_trend(data: list, fmt: str = "png") -> bytes:
+    df = _frame(data)
+    fig, ax = _figure()
+    ax.plot(df["date"], df["close"])
+    ax.set_title("Stock Price Trend")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Closing Price")
+    return _encode(fig, fmt)
+
+
+def render_volume(data: list, fmt: str = "png") -> bytes:
+    df = _frame(data)
+    fig, ax = _figure()
+    ax.bar(df["date"], df["volume"])
+    ax.set_title("Trading Volume")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Volume")
+    return _encode(fig, fmt)
+
+
+def render_moving_averages(data: list, short_window: int = 20, long_window: int = 50, fmt: str = "png") -> bytes:
+    df = _frame(data)
+    df["SMA_short"] = df["close"].rolling(window=short_window).mean()
+    df["SMA_long"] = df["close"].rolling(window=long_window).mean()
+
+    fig, ax = _figure()
+    ax.plot(df["date"], df["close"], label="Close Price")
+    ax.plot(df["date"], df["SMA_short"], label=f"SMA {short_window}")
+    ax.plot(df["date"], df["SMA_long"], label=f"SMA {long_window}")
+    ax.set_title("Moving Averages")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price")
+    ax.legend()
+    return _encode(fig, fmt)
+
+
+def render_candlestick(data: list, fmt: str = "png") -> bytes:
+    """
+    OHLC chart drawn with one LineCollection for the wicks and one PolyCollection
+    for the bodies, instead of two Line2D artists per bar.
+    """
+    df = _frame(data).sort_values("date")
+    x = mdates.date2num(df["date"])
+    opens, highs, lows, closes = (
+        df[k].to_numpy(dtype=float) for k in ("open", "high", "low", "close")
+    )
+
+    step = np.min(np.diff(x)) if len(x) > 1 else 1.0
+    half = 0.35 * step
+    colors = np.where(closes >= opens, "tab:green", "tab:red")
+
+    wicks = np.stack([np.column_stack([x, lows]), np.column_stack([x, highs])], axis=1)
+    bodies = np.stack([
+        np.column_stack([x - half, opens]),
+        np.column_stack([x + half, opens]),
+        np.column_stack([x + half, closes]),
+        np.column_stack([x - half, closes]),
+    ], axis=1)
+
+    fig, ax = _figure()
+    ax.add_collection(LineCollection(wicks, colors=colors, linewidths=0.8))
+    ax.add_collection(PolyCollection(bodies, facecolors=colors, edgecolors=colors, linewidths=0.5))
+    ax.autoscale_view()
+    ax.xaxis_date()
+
+    ax.set_title("OHLC (Candlestick Style)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price")
+    return _encode(fig, fmt)
+
+
+def render_sector_allocation(data: dict, fmt: str = "png") -> bytes:
+    fig, ax = _figure(figsize=(6, 6))
+    ax.pie(list(data.values()), labels=list(data.keys()), autopct="%1.1f%%")
+    ax.set_title("Sector Allocation")
+    return _encode(fig, fmt)
+
+
+# -------------------------------------------------------
+# Chart handles
+# -------------------------------------------------------
+# Set by the caller (e.g. SupervisorRunner) so charts rendered by tools deep in
+# the agent graph can be handed back to the right Streamlit session.
+chart_owner: ContextVar[str | None] = ContextVar("chart_owner", default=None)
+
+
+@dataclass
+class Chart:
+    chart_id: str
+    title: str
+    format: str
+    data: bytes
+    owner: str | None = None
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def mime_type(self) -> str:
+        return "image/svg+xml" if self.format == "svg" else "image/png"
+
+    def handle(self) -> dict:
+        """What the tool returns to the LLM: a reference, never the bytes."""
+        return {
+            "chart_id": self.chart_id,
+            "title": self.title,
+            "format": self.format,
+            "size_bytes": len(self.data),
+        }
+
+
+class ChartStore:
+    """Size-bounded, thread-safe registry of rendered charts."""
+
+    def __init__(self, max_charts: int = 256):
+        self.max_charts = max_charts
+        self._charts: OrderedDict[str, Chart] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, chart: Chart):
+        with self._lock:
+            self._charts[chart.chart_id] = chart
+            while len(self._charts) > self.max_charts:
+                self._charts.popitem(last=False)
+
+    def get(self, chart_id: str) -> Chart | None:
+        with self._lock:
+            return self._charts.get(chart_id)
+
+    def pop_for_owner(self, owner: str) -> list[Chart]:
+        with self._lock:
+            charts = [c for c in self._charts.values() if c.owner == owner]
+            for c in charts:
+                del self._charts[c.chart_id]
+        return charts
+
+
+chart_store = ChartStore(int(os.getenv("CHART_STORE_MAX", "256")))
+chart_cache = TTLCache(max_entries=int(os.getenv("CHART_CACHE_MAX_ENTRIES", "128")))
+CHART_CACHE_TTL = float(os.getenv("CHART_CACHE_TTL", "3600"))
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR") or None
+render_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CHART_RENDER_WORKERS", "4")),
+    thread_name_prefix="chart-render",
+)
+
+
+def chart_digest(render_fn, args: tuple, kwargs: dict, fmt: str) -> str:
+    """Content address of a chart: hash of the renderer, its input data and parameters."""
+    payload = json.dumps(
+        [render_fn.__name__, fmt, args, kwargs],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cached_render(render_fn, args: tuple, kwargs: dict, fmt: str) -> bytes:
+    digest = chart_digest(render_fn, args, kwargs, fmt)
+    data = chart_cache.get(digest)
+    if data is not None:
+        return data
+
+    path = os.path.join(CHART_CACHE_DIR, f"{digest}.{fmt}") if CHART_CACHE_DIR else None
+    if path and os.path.exists(path) and time.time() - os.path.getmtime(path) < CHART_CACHE_TTL:
+        with open(path, "rb") as f:
+            data = f.read()
+    else:
+        data = render_pool.submit(render_fn, *args, fmt=fmt, **kwargs).result()
+        if path:
+            os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    chart_cache.set(digest, data, ttl=CHART_CACHE_TTL)
+    return data
+
+
+def render(title: str, render_fn, *args, fmt: str = "png", **kwargs) -> Chart:
+    """
+    Render on the worker pool (or reuse an identical cached render), register
+    the result for the current owner and return its Chart handle.
+    """
+    data = _cached_render(render_fn, args, kwargs, fmt)
+    chart = Chart(
+        chart_id=uuid.uuid4().hex[:12],
+        title=title,
+        format=fmt,
+        data=data,
+        owner=chart_owner.get(),
+    )
+    chart_store.add(chart)
+    return chart
@@ -0,0 +1,267 @@
+import os
+import threading
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+
+# -------------------------------------------------------
+# Chat history storage
+#
+# chat_sessions: one small document per session (sidebar)
+# chat_messages: one document per prompt/answer exchange
+#
+# Both are read newest-first through compound indexes that end in _id, so
+# every page is an index range scan and the cursor (timestamp, _id) is stable
+# even when two documents share a timestamp.
+# -------------------------------------------------------
+SESSION_FIELDS = {"_id": 1, "session_id": 1, "user_name": 1, "created_at": 1, "updated_at": 1}
+MESSAGE_FIELDS = {"_id": 1, "timestamp": 1, "prompt": 1, "answer": 1}
+
+LEGACY_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def encode_cursor(doc: dict, field: str) -> str:
+    return f"{doc[field].isoformat()}|{doc['_id']}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    timestamp, _id = cursor.split("|", 1)
+    return datetime.fromisoformat(timestamp), ObjectId(_id)
+
+
+def _before(field: str, cursor: str | None) -> dict:
+    if not cursor:
+        return {}
+    timestamp, _id = decode_cursor(cursor)
+    return {"$or": [
+        {field: {"$lt": timestamp}},
+        {field: timestamp, "_id": {"$lt": _id}},
+    ]}
+
+
+def _parse_legacy_time(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(value, LEGACY_TIME_FORMAT).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc)
+
+
+class ChatStore:
+    """
+    Paginated chat history on top of two indexed collections.
+    Indexes are created on first use; pages are fetched with projections only.
+    """
+
+    def __init__(
+        self,
+        db,
+        messages: str = "chat_messages",
+        sessions: str = "chat_sessions",
+        legacy: str = "chat_history",
+    ):
+        self.messages = db[messages]
+        self.sessions = db[sessions]
+        self.legacy = db[legacy]
+        self._indexed = False
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        if self._indexed:
+            return
+        with self._lock:
+            if self._indexed:
+                return
+            self.messages.create_index(
+                [("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+                name="session_timestamp",
+            )
+            self.sessions.create_index("session_id", unique=True, name="session_id")
+            self.sessions.create_index(
+                [("user_name", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="user_created",
+            )
+            self.sessions.create_index(
+                [("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="created",
+            )
+            self._indexed = True
+
+    # ---------------------------------------------------
+    # Writes
+    # ---------------------------------------------------
+    @staticmethod
+    def exchange_ops(
+        session_id: str,
+        user_name: str,
+        prompt: str,
+        answer: str,
+        prompt_time: datetime,
+        answer_time: datetime,
+    ) -> dict[str, list]:
+        """Write operations for one exchange, per collection, ready for bulk_write."""
+        return {
+            "messages": [InsertOne({
+                "session_id": session_id,
+                "user_name": user_name,
+                "timestamp": prompt_time,
+                "prompt": prompt,
+                "answer": answer,
+                "answer_timestamp": answer_time,
+            })],
+            "sessions": [UpdateOne(
+                {"session_id": session_id},
+                {
+                    "$setOnInsert": {
+                        "session_id": session_id,
+                        "user_name": user_name,
+                        "created_at": prompt_time,
+                    },
+                    "$set": {"updated_at": answer_time},
+                    "$inc": {"message_count": 1},
+                },
+                upsert=True,
+            )],
+        }
+
+    def bulk_write(self, collection: str, ops: list):
+        """Unordered bulk write to "messages" or "sessions"."""
+        self.ensure_indexes()
+        return getattr(self, collection).bulk_write(ops, ordered=False)
+
+    def write(self, ops: dict[str, list]):
+        for collection in ("messages", "sessions"):
+            if ops.get(collection):
+                self.bulk_write(collection, ops[collection])
+
+    def add_exchange(self, session_id: str, user_name: str, prompt: str, answer: str,
+                     prompt_time: datetime | None = None, answer_time: datetime | None = None):
+        now = datetime.now(timezone.utc)
+        self.write(self.exchange_ops(
+            session_id, user_name, prompt, answer, prompt_time or now, answer_time or now
+        ))
+
+    # ---------------------------------------------------
+    # Reads
+    # ---------------------------------------------------
+    def list_sessions(
+        self,
+        user_name: str | None = None,
+        limit: int = 20,
+        before: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Newest sessions first; returns (page, cursor for the next page or None)."""
+        self.ensure_indexes()
+        query = {"user_name": user_name} if user_name else {}
+        query.update(_before("created_at", before))
+        docs = list(
+            self.sessions.find(query, SESSION_FIELDS)
+            .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit + 1)
+        )
+        cursor = encode_cursor(docs[limit - 1], "created_at") if len(docs) > limit else None
+        return docs[:limit], cursor
+
+    def load_messages(
+        self,
+        session_id: str,
+        limit: int = 50,
+        before: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """
+        The latest `limit` exchanges before the cursor, as chronological
+        user/assistant chat messages, plus the cursor for older ones.
+        """
+        self.ensure_indexes()
+        query = {"session_id": session_id, **_before("timestamp", before)}
+        docs = list(
+            self.messages.find(query, MESSAGE_FIELDS)
+            .sort([("timestamp", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit + 1)
+        )
+        cursor = encode_cursor(docs[limit - 1], "timestamp") if len(docs) > limit else None
+
+        messages = []
+        for doc in reversed(docs[:limit]):
+            messages.append({"role": "user", "content": doc["prompt"]})
+            messages.append({"role": "assistant", "content": doc["answer"]})
+        return messages, cursor
+
+    # ---------------------------------------------------
+    # Migration from the single-document-per-session layout
+    # ---------------------------------------------------
+    def migrate_legacy(self, batch_size: int = 100) -> dict:
+        """
+        Copy chat_history documents ({session_id, messages: {date: [...]}}) into
+        the per-message collections. Idempotent: exchanges are upserted on
+        (session_id, timestamp, prompt) and migrated documents are marked.
+        """
+        self.ensure_indexes()
+        counts = {"sessions": 0, "messages": 0}
+        pending = {"migrated_at": {"$exists": False}, "messages": {"$exists": True}}
+
+        while True:
+            docs = list(self.legacy.find(pending).limit(batch_size))
+            if not docs:
+                break
+
+            for doc in docs:
+                message_ops, created_at, updated_at = [], None, None
+                for day in sorted(doc.get("messages") or {}):
+                    for entry in doc["messages"][day]:
+                        timestamp = _parse_legacy_time(entry.get("prompt_timestamp"))
+                        created_at = created_at or timestamp
+                        updated_at = timestamp
+                        message_ops.append(UpdateOne(
+                            {"session_id": doc["session_id"], "timestamp": timestamp, "prompt": entry.get("prompt", "")},
+                            {"$setOnInsert": {
+                                "user_name": doc.get("user_name"),
+                                "answer": entry.get("answer", ""),
+                                "answer_timestamp": _parse_legacy_time(entry.get("answer_timestamp")),
+                            }},
+                            upsert=True,
+                        ))
+
+                if message_ops:
+                    self.messages.bulk_write(message_ops, ordered=False)
+                if doc.get("created_at"):
+                    created_at = _parse_legacy_time(doc["created_at"])
+                created_at = created_at or datetime.now(timezone.utc)
+                self.sessions.update_one(
+                    {"session_id": doc["session_id"]},
+                    {
+                        "$setOnInsert": {
+                            "session_id": doc["session_id"],
+                            "user_name": doc.get("user_name"),
+                            "created_at": created_at,
+                        },
+                        # $max keeps re-runs after a partial migration idempotent
+                        "$max": {
+                            "updated_at": updated_at or created_at,
+                            "message_count": len(message_ops),
+                        },
+                    },
+                    upsert=True,
+                )
+                self.legacy.update_one(
+                    {"_id": doc["_id"]},
+                    {"$set": {"migrated_at": datetime.now(timezone.utc)}},
+                )
+                counts["sessions"] += 1
+                counts["messages"] += len(message_ops)
+
+        if counts["sessions"]:
+            print(f"Migrated {counts['messages']} messages from {counts['sessions']} legacy sessions")
+        return counts
+
+
+if __name__ == "__main__":
+    # python chat_store.py  -> migrate chat_history into chat_sessions/chat_messages
+    from pymongo import MongoClient
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    print(ChatStore(client[os.getenv("MONGO_DB", "chat_db")]).migrate_legacy())
@@ -0,0 +1,200 @@
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from pymongo import DESCENDING
+from pymongo.errors import PyMongoError
+
+ROOT_NS = ""
+
+# -------------------------------------------------------
+# Compact checkpoint serialization
+# -------------------------------------------------------
+class CompressedSerializer:
+    """
+    JsonPlusSerializer with zlib on large values (checkpoints carrying the
+    whole message list, tool results). Compressed values are stored with a
+    "+zlib" type suffix; anything else is read as before, so existing
+    checkpoints stay loadable.
+    """
+
+    SUFFIX = "+zlib"
+
+    def __init__(self, serde=None, min_size: int = 1024, level: int = 6):
+        self.serde = serde or JsonPlusSerializer()
+        self.min_size = min_size
+        self.level = level
+        self._lock = threading.Lock()
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    @classmethod
+    def from_env(cls) -> "CompressedSerializer":
+        return cls(
+            min_size=int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "1024")),
+            level=int(os.getenv("CHECKPOINT_COMPRESS_LEVEL", "6")),
+        )
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        stored = data
+        if len(data) >= self.min_size:
+            packed = zlib.compress(data, self.level)
+            if len(packed) < len(data):
+                type_, stored = type_ + self.SUFFIX, packed
+        with self._lock:
+            self.raw_bytes += len(data)
+            self.stored_bytes += len(stored)
+        return type_, stored
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(self.SUFFIX):
+            return self.serde.loads_typed((type_[:-len(self.SUFFIX)], zlib.decompress(payload)))
+        return self.serde.loads_typed(data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "raw_bytes": self.raw_bytes,
+                "stored_bytes": self.stored_bytes,
+                "saved_ratio": round(1 - self.stored_bytes / self.raw_bytes, 3) if self.raw_bytes else 0.0,
+            }
+
+
+# -------------------------------------------------------
+# Retention
+# -------------------------------------------------------
+class CheckpointRetention:
+    """
+    Keeps the MongoDBSaver collections bounded.
+
+    - prune_thread: keep the latest `keep_last` root checkpoints of a thread
+      (resuming only needs the latest) and drop their orphaned writes, plus
+      any nested-graph namespaces ("tools:<task>"), which are never resumed
+      once the run has finished.
+    - schedule: prune a thread on a background worker after a run.
+    - compact: prune every thread that is over the limit (periodic job).
+    - sync_ttl: keep the saver's created_at TTL index in step with
+      CHECKPOINT_TTL, so idle threads expire without a job.
+    """
+
+    def __init__(
+        self,
+        db,
+        keep_last: int = 10,
+        checkpoints: str = "checkpoints",
+        writes: str = "checkpoint_writes",
+    ):
+        self.db = db
+        self.keep_last = keep_last
+        self.checkpoints = db[checkpoints]
+        self.writes = db[writes]
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-prune")
+        self._scheduled: set[str] = set()
+        self._lock = threading.Lock()
+        self.pruned_threads = 0
+        self.deleted_checkpoints = 0
+        self.deleted_writes = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, db) -> "CheckpointRetention":
+        return cls(db, keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "10")))
+
+    def prune_thread(self, thread_id: str) -> dict:
+        stale = [
+            doc["checkpoint_id"]
+            for doc in self.checkpoints.find(
+                {"thread_id": thread_id, "checkpoint_ns": ROOT_NS},
+                {"_id": 0, "checkpoint_id": 1},
+            ).sort("checkpoint_id", DESCENDING).skip(self.keep_last)
+        ]
+
+        root = {"thread_id": thread_id, "checkpoint_ns": ROOT_NS, "checkpoint_id": {"$in": stale}}
+        nested = {"thread_id": thread_id, "checkpoint_ns": {"$ne": ROOT_NS}}
+        deleted = {"checkpoints": 0, "writes": 0}
+        for query in ([root] if stale else []) + [nested]:
+            deleted["checkpoints"] += self.checkpoints.delete_many(query).deleted_count
+            deleted["writes"] += self.writes.delete_many(query).deleted_count
+
+        with self._lock:
+            self.pruned_threads += 1
+            self.deleted_checkpoints += deleted["checkpoints"]
+            self.deleted_writes += deleted["writes"]
+        return deleted
+
+    def _prune_scheduled(self, thread_id: str):
+        with self._lock:
+            self._scheduled.discard(thread_id)
+        try:
+            self.prune_thread(thread_id)
+        except PyMongoError as e:
+            with self._lock:
+                self.errors += 1
+            print(f"Checkpoint pruning failed for thread {thread_id}: {e}")
+
+    def schedule(self, thread_id: str):
+        """Prune a thread in the background; repeated requests collapse into one."""
+        with self._lock:
+            if thread_id in self._scheduled:
+                return
+            self._scheduled.add(thread_id)
+        self._executor.submit(self._prune_scheduled, thread_id)
+
+    def compact(self) -> dict:
+        over_limit = self.checkpoints.aggregate([
+            {"$match": {"checkpoint_ns": ROOT_NS}},
+            {"$group": {"_id": "$thread_id", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": self.keep_last}}},
+        ])
+        threads = {doc["_id"] for doc in over_limit}
+        threads.update(self.checkpoints.distinct("thread_id", {"checkpoint_ns": {"$ne": ROOT_NS}}))
+
+        totals = {"threads": len(threads), "checkpoints": 0, "writes": 0}
+        for thread_id in threads:
+            deleted = self.prune_thread(thread_id)
+            totals["checkpoints"] += deleted["checkpoints"]
+            totals["writes"] += deleted["writes"]
+        print(f"Checkpoint compaction: {totals}")
+        return totals
+
+    def sync_ttl(self, ttl: int | None):
+        """
+        MongoDBSaver only creates its TTL index; changing CHECKPOINT_TTL later
+        would conflict with the existing one, so update it in place.
+        """
+        if ttl is None:
+            return
+        for collection in (self.checkpoints, self.writes):
+            for index in collection.list_indexes():
+                if dict(index["key"]) == {"created_at": 1} and index.get("expireAfterSeconds") != ttl:
+                    self.db.command(
+                        "collMod",
+                        collection.name,
+                        index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": ttl},
+                    )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "keep_last": self.keep_last,
+                "pruned_threads": self.pruned_threads,
+                "deleted_checkpoints": self.deleted_checkpoints,
+                "deleted_writes": self.deleted_writes,
+                "errors": self.errors,
+            }
+
+
+if __name__ == "__main__":
+    # python checkpoint_retention.py  -> one compaction pass (e.g. from cron)
+    from pymongo import MongoClient
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    CheckpointRetention.from_env(client[os.getenv("MONGO_DB", "chat_db")]).compact()
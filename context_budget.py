@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from langchain.agents import AgentState
+from langchain.agents.middleware import before_model
+from langchain.messages import AIMessage, AnyMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.runtime import Runtime
+
+from telemetry import annotate
+
+MESSAGE_OVERHEAD = 4  # role/separator tokens per chat message
+ELIDED_MARK = "\n[tool output truncated"
+NOTE_CHARS = 160  # room for the truncation note itself
+
+
+# -------------------------------------------------------
+# Token accounting
+# -------------------------------------------------------
+class TokenCounter:
+    """
+    Per-message token counts, computed once per message version and cached.
+
+    Uses tiktoken's o200k_base (the GPT-4.1 family) when it is installed and its
+    encoding can be loaded; otherwise falls back to ~4 characters per token.
+    """
+
+    def __init__(self, max_entries: int = 20000, encoding: str = "o200k_base"):
+        self.max_entries = max_entries
+        self.encoding_name = encoding
+        self._encoding = None
+        self._encoding_loaded = False
+        self._cache: OrderedDict[tuple, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _encode_len(self, text: str) -> int:
+        if not self._encoding_loaded:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                print(f"Token counting falls back to a character estimate: {e}")
+            self._encoding_loaded = True
+        if self._encoding is None:
+            return len(text) // 4
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    @staticmethod
+    def text_of(message: AnyMessage) -> str:
+        content = message.content
+        text = content if isinstance(content, str) else json.dumps(content, default=str)
+        if isinstance(message, AIMessage) and message.tool_calls:
+            text += json.dumps(message.tool_calls, default=str)
+        return text
+
+    def count(self, message: AnyMessage) -> int:
+        text = self.text_of(message)
+        # a message replaced in state keeps its id, so the length is part of the key
+        key = (message.id, len(text)) if message.id else None
+        if key is not None:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return cached
+
+        tokens = self._encode_len(text) + MESSAGE_OVERHEAD
+        if key is not None:
+            with self._lock:
+                self.misses += 1
+                self._cache[key] = tokens
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return tokens
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "tokenizer": self.encoding_name if self._encoding is not None else "estimate",
+        }
+
+
+# -------------------------------------------------------
+# Budget policy
+# -------------------------------------------------------
+def _body(message: ToolMessage) -> str:
+    """Tool output without a previous truncation note."""
+    return message.content.split(ELIDED_MARK, 1)[0]
+
+
+def _truncate(message: ToolMessage, keep_chars: int) -> ToolMessage:
+    text = _body(message)
+    note = (
+        f"{ELIDED_MARK}: {len(text) - keep_chars} more characters dropped to fit "
+        "the context window; call the tool again if the details are needed]"
+    )
+    return message.model_copy(update={"content": text[:keep_chars] + note})
+
+
+def _elidable(message: AnyMessage, keep_chars: int) -> bool:
+    return (
+        isinstance(message, ToolMessage)
+        and isinstance(message.content, str)
+        and len(_body(message)) > keep_chars
+    )
+
+
+class ContextBudget:
+    """
+    Keeps the messages sent to the model under `max_tokens`:
+
+    1. tool outputs from earlier turns are cut to a short preview, oldest first;
+    2. if that is not enough, whole earlier turns (human message up to the next
+       one) are removed, oldest first, so tool calls and results stay paired;
+    3. as a last resort, tool outputs of the current turn are cut just enough,
+       oldest first.
+
+    The edits are returned as state updates (replace by id / RemoveMessage), so
+    they also shrink the checkpoint and are not recomputed on the next call.
+    """
+
+    def __init__(self, max_tokens: int = 24000, preview_chars: int = 400, counter: TokenCounter | None = None):
+        self.max_tokens = max_tokens
+        self.preview_chars = preview_chars
+        self.counter = counter or TokenCounter()
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.trimmed_calls = 0
+        self.truncated_messages = 0
+        self.removed_messages = 0
+        self.tokens_saved = 0
+
+    @classmethod
+    def from_env(cls) -> "ContextBudget":
+        return cls(
+            max_tokens=int(os.getenv("CONTEXT_TOKEN_BUDGET", "24000")),
+            preview_chars=int(os.getenv("CONTEXT_TOOL_PREVIEW_CHARS", "400")),
+        )
+
+    def plan(self, messages: list[AnyMessage]) -> list[AnyMessage]:
+        """State updates that bring `messages` under budget (empty if already under)."""
+        counts = [self.counter.count(m) for m in messages]
+        total = sum(counts)
+        with self._lock:
+            self.checks += 1
+        if total <= self.max_tokens:
+            return []
+
+        before = total
+        humans = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        current = humans[-1] if humans else 0
+        replaced: dict[int, ToolMessage] = {}
+
+        # 1. previews for earlier turns' tool outputs
+        for i in range(current):
+            if total <= self.max_tokens:
+                break
+            if _elidable(messages[i], self.preview_chars):
+                replaced[i] = _truncate(messages[i], self.preview_chars)
+                new_count = self.counter.count(replaced[i])
+                total -= counts[i] - new_count
+                counts[i] = new_count
+
+        # 2. drop earlier turns
+        removed: list[int] = []
+        for start, end in zip(humans, humans[1:]):
+            if total <= self.max_tokens:
+                break
+            removed.extend(range(start, end))
+            total -= sum(counts[start:end])
+        if humans and humans[0] > 0 and removed:
+            # anything before the first human message belongs to the oldest turn
+            removed.extend(range(0, humans[0]))
+            total -= sum(counts[:humans[0]])
+
+        # 3. cut the current turn's tool outputs just enough
+        for i in range(current, len(messages)):
+            if total <= self.max_tokens:
+                break
+            if _elidable(messages[i], self.preview_chars):
+                excess_chars = (total - self.max_tokens) * 4 + NOTE_CHARS
+                keep = max(self.preview_chars, len(_body(messages[i])) - excess_chars)
+                if keep < len(_body(messages[i])):
+                    replaced[i] = _truncate(messages[i], keep)
+                    new_count = self.counter.count(replaced[i])
+                    total -= counts[i] - new_count
+                    counts[i] = new_count
+
+        removed_set = set(removed)
+        updates: list[AnyMessage] = [RemoveMessage(id=messages[i].id) for i in sorted(removed_set)]
+        updates += [m for i, m in sorted(replaced.items()) if i not in removed_set]
+
+        with self._lock:
+            self.trimmed_calls += 1
+            self.truncated_messages += len(updates) - len(removed_set)
+            self.removed_messages += len(removed_set)
+            self.tokens_saved += before - total
+        annotate(
+            context_tokens=f"{before} -> {total}",
+            context_outputs_cut=len(replaced),
+            context_messages_removed=len(removed_set),
+        )
+        return updates
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_tokens": self.max_tokens,
+                "checks": self.checks,
+                "trimmed_calls": self.trimmed_calls,
+                "truncated_messages": self.truncated_messages,
+                "removed_messages": self.removed_messages,
+                "tokens_saved": self.tokens_saved,
+                "counter": self.counter.stats(),
+            }
+
+
+context_budget = ContextBudget.from_env()
+
+
+@before_model
+def enforce_token_budget(state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+    """Trim the conversation to CONTEXT_TOKEN_BUDGET before every model call."""
+    updates = context_budget.plan(state["messages"])
+    return {"messages": updates} if updates else None
@@ -0,0 +1,242 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Callable
+
+import numpy as np
+
+COLUMNS = ("open", "high", "low", "close", "volume", "dma50", "dma200")
+
+# calendar days covered by each /historical_data period (None = full history)
+PERIOD_DAYS = {
+    "1m": 31,
+    "6m": 183,
+    "1yr": 366,
+    "3yr": 3 * 366,
+    "5yr": 5 * 366,
+    "10yr": 10 * 366,
+    "max": None,
+}
+
+# /historical_data "datasets" metric name -> column
+METRIC_COLUMNS = {
+    "price": "close",
+    "close": "close",
+    "open": "open",
+    "high": "high",
+    "low": "low",
+    "volume": "volume",
+    "dma50": "dma50",
+    "dma200": "dma200",
+}
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def parse_payload(payload) -> dict[str, np.ndarray]:
+    """
+    Parse a /historical_data payload into typed, date-sorted columns.
+
+    Handles the API's {"datasets": [{"metric": "Price", "values": [[date, value], ...]}]}
+    shape as well as plain row lists [{"date": ..., "close": ...}, ...].
+    Columns the payload does not carry are filled with NaN.
+    """
+    rows: dict[str, dict[str, float]] = defaultdict(dict)
+
+    if isinstance(payload, dict) and "datasets" in payload:
+        for dataset in payload["datasets"]:
+            column = METRIC_COLUMNS.get(str(dataset.get("metric", "")).lower())
+            if column is None:
+                continue
+            for entry in dataset.get("values", []):
+                if len(entry) >= 2:
+                    rows[str(entry[0])[:10]][column] = _to_float(entry[1])
+    else:
+        records = payload.get("data", []) if isinstance(payload, dict) else payload
+        for record in records or []:
+            if "date" not in record:
+                continue
+            day = rows[str(record["date"])[:10]]
+            for column in COLUMNS:
+                if column in record:
+                    day[column] = _to_float(record[column])
+
+    dates = sorted(rows)
+    columns = {"date": np.array(dates, dtype="datetime64[D]")}
+    for column in COLUMNS:
+        columns[column] = np.array(
+            [rows[d].get(column, np.nan) for d in dates], dtype=np.float64
+        )
+    return columns
+
+
+def merge_columns(old: dict[str, np.ndarray], new: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Union of two column sets by date; rows from `new` win on overlap."""
+    merged = {k: np.concatenate([old[k], new[k]]) for k in ("date",) + COLUMNS}
+    # np.unique keeps the first occurrence, so search the reversed arrays to keep the latest
+    _, idx = np.unique(merged["date"][::-1], return_index=True)
+    keep = len(merged["date"]) - 1 - idx
+    return {k: v[keep] for k, v in merged.items()}
+
+
+def to_records(columns: dict[str, np.ndarray]) -> list[dict]:
+    """Row dicts (date, open, high, low, close, volume, dma50, dma200) with missing values omitted."""
+    records = []
+    dates = columns["date"].astype(str).tolist()
+    for i, day in enumerate(dates):
+        row = {"date": day}
+        for column in COLUMNS:
+            value = columns[column][i]
+            if not np.isnan(value):
+                row[column] = round(float(value), 2)
+        records.append(row)
+    return records
+
+
+class HistoricalStore:
+    """
+    Local columnar store for /historical_data, one directory per symbol holding
+    a .npy file per column (memory-mapped on read) and a small meta.json.
+
+    The first request for a symbol downloads the requested period; later requests
+    only fetch the missing tail once the stored data is older than
+    `refresh_after` seconds, and any period is served by slicing.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        fetch: Callable[[str, str], object],
+        refresh_after: float = 3600,
+    ):
+        self.root = root
+        self.fetch = fetch
+        self.refresh_after = refresh_after
+        self._locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+        self.tail_fetches = 0
+        self.full_fetches = 0
+        self.served_from_store = 0
+
+    # ---------------------------------------------------
+    # Files
+    # ---------------------------------------------------
+    def _dir(self, symbol: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Z0-9_.-]", "_", symbol.strip().upper()))
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks[self._dir(symbol)]
+
+    def _read_meta(self, symbol: str) -> dict | None:
+        try:
+            with open(os.path.join(self._dir(symbol), "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, symbol: str) -> dict[str, np.ndarray] | None:
+        directory = self._dir(symbol)
+        try:
+            return {
+                k: np.load(os.path.join(directory, f"{k}.npy"), mmap_mode="r")
+                for k in ("date",) + COLUMNS
+            }
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, symbol: str, columns: dict[str, np.ndarray], meta: dict):
+        directory = self._dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        for k, values in columns.items():
+            tmp = os.path.join(directory, f".{k}.npy.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, np.asarray(values))
+            os.replace(tmp, os.path.join(directory, f"{k}.npy"))
+
+        tmp = os.path.join(directory, ".meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+
+    # ---------------------------------------------------
+    # Sync with the API
+    # ---------------------------------------------------
+    @staticmethod
+    def _covers(meta: dict, period: str) -> bool:
+        covered = meta.get("covered_days", 0)
+        needed = PERIOD_DAYS[period]
+        if covered is None:
+            return True
+        return needed is not None and covered >= needed
+
+    @staticmethod
+    def _tail_period(last_date: date) -> str:
+        gap = (date.today() - last_date).days + 1
+        for period, days in PERIOD_DAYS.items():
+            if days is None or days >= gap:
+                return period
+        return "max"
+
+    def _update(self, symbol: str, columns, meta: dict, period: str):
+        new = parse_payload(self.fetch(symbol, period))
+        merged = merge_columns(columns, new) if columns is not None else new
+
+        days = PERIOD_DAYS[period]
+        covered = meta.get("covered_days", 0)
+        if days is None or covered is None:
+            covered = None
+        elif columns is None or days > covered:
+            covered = days
+        meta.update({
+            "symbol": symbol,
+            "covered_days": covered,
+            "fetched_at": time.time(),
+            "rows": int(len(merged["date"])),
+        })
+        self._save(symbol, merged, meta)
+        return merged
+
+    def get(self, symbol: str, period: str = "5yr") -> dict[str, np.ndarray]:
+        if period not in PERIOD_DAYS:
+            raise ValueError(f"Unsupported period '{period}', expected one of {list(PERIOD_DAYS)}")
+
+        with self._lock(symbol):
+            meta = self._read_meta(symbol) or {}
+            columns = self.load(symbol) if meta else None
+            if columns is None:
+                meta = {}
+
+            if columns is None or not self._covers(meta, period):
+                columns = self._update(symbol, columns, meta, period)
+                self.full_fetches += 1
+            elif time.time() - meta.get("fetched_at", 0) > self.refresh_after and len(columns["date"]):
+                last = columns["date"][-1].astype(object)
+                columns = self._update(symbol, columns, meta, self._tail_period(last))
+                self.tail_fetches += 1
+            else:
+                self.served_from_store += 1
+
+        days = PERIOD_DAYS[period]
+        if days is None or not len(columns["date"]):
+            return {k: np.asarray(v) for k, v in columns.items()}
+
+        cutoff = columns["date"][-1] - np.timedelta64(days, "D")
+        start = int(np.searchsorted(columns["date"], cutoff, side="left"))
+        return {k: np.asarray(v[start:]) for k, v in columns.items()}
+
+    def stats(self) -> dict:
+        return {
+            "full_fetches": self.full_fetches,
+            "tail_fetches": self.tail_fetches,
+            "served_from_store": self.served_from_store,
+        }
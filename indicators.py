@@ -0,0 +1,219 @@
+import numpy as np
+
+# -------------------------------------------------------
+# Vectorized technical indicators
+#
+# Every function takes 2-D float arrays shaped (n_symbols, n_days), oldest day
+# first, with NaN where a symbol has no data, and returns arrays of the same
+# shape. Windows that are not fully populated yield NaN.
+# -------------------------------------------------------
+FIELDS = ("open", "high", "low", "close", "volume")
+
+INDICATORS = ("sma", "ema", "rsi", "macd", "bollinger", "atr", "vwap")
+
+
+def align(series: dict[str, list[dict]]) -> tuple[list[str], np.ndarray, dict[str, np.ndarray]]:
+    """
+    Align per-symbol record lists ({"date", "close", ...}) on the union of their dates.
+    Returns (symbols, dates, {field: 2-D array}).
+    """
+    # projected record lists carry an "... N more rows omitted" note
+    series = {s: [r for r in records if isinstance(r, dict)] for s, records in series.items()}
+    symbols = list(series)
+    dates = np.array(
+        sorted({str(r["date"])[:10] for records in series.values() for r in records}),
+        dtype="datetime64[D]",
+    )
+    fields = {f: np.full((len(symbols), len(dates)), np.nan) for f in FIELDS}
+
+    for i, symbol in enumerate(symbols):
+        records = series[symbol]
+        if not records:
+            continue
+        cols = np.searchsorted(dates, np.array([str(r["date"])[:10] for r in records], dtype="datetime64[D]"))
+        for f in FIELDS:
+            fields[f][i, cols] = [
+                float(r[f]) if r.get(f) is not None else np.nan for r in records
+            ]
+    return symbols, dates, fields
+
+
+def _rolling_sum(x: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rolling sum and count of non-NaN values along the last axis."""
+    valid = ~np.isnan(x)
+    pad = np.zeros(x.shape[:-1] + (1,))
+    cs = np.concatenate([pad, np.cumsum(np.where(valid, x, 0.0), axis=-1)], axis=-1)
+    cn = np.concatenate([pad, np.cumsum(valid, axis=-1)], axis=-1)
+
+    total = np.full(x.shape, np.nan)
+    count = np.zeros(x.shape)
+    if window <= x.shape[-1]:
+        total[..., window - 1:] = cs[..., window:] - cs[..., :-window]
+        count[..., window - 1:] = cn[..., window:] - cn[..., :-window]
+    return total, count
+
+
+def sma(x: np.ndarray, window: int) -> np.ndarray:
+    total, count = _rolling_sum(x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count == window, total / window, np.nan)
+
+
+def _smooth(x: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Exponential smoothing seeded with each row's first valid value.
+    Recursive in time, vectorized across symbols; gaps carry the last value.
+    """
+    out = np.full(x.shape, np.nan)
+    prev = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        xt = x[:, t]
+        prev = np.where(
+            np.isnan(prev),
+            xt,
+            np.where(np.isnan(xt), prev, alpha * xt + (1 - alpha) * prev),
+        )
+        out[:, t] = prev
+    return out
+
+
+def _warm(out: np.ndarray, x: np.ndarray, window: int) -> np.ndarray:
+    """NaN until each row of x has `window` valid values (recursive windows are not full before)."""
+    seen = np.cumsum(~np.isnan(x), axis=-1)
+    return np.where(seen >= window, out, np.nan)
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    return _warm(_smooth(x, 2.0 / (span + 1)), x, span)
+
+
+def wilder(x: np.ndarray, period: int) -> np.ndarray:
+    return _smooth(x, 1.0 / period)
+
+
+def _prev(x: np.ndarray) -> np.ndarray:
+    return np.concatenate([np.full((x.shape[0], 1), np.nan), x[:, :-1]], axis=1)
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    change = close - _prev(close)
+    gain = np.where(np.isnan(change), np.nan, np.clip(change, 0, None))
+    loss = np.where(np.isnan(change), np.nan, np.clip(-change, 0, None))
+    avg_gain, avg_loss = wilder(gain, period), wilder(loss, period)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = 100 - 100 / (1 + avg_gain / avg_loss)
+    # no losses: 100, unless there were no gains either (flat series)
+    out = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), out)
+    # the first `period` changes only seed the averages
+    return _warm(out, change, period)
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9):
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close: np.ndarray, window: int = 20, k: float = 2.0):
+    total, count = _rolling_sum(close, window)
+    total_sq, _ = _rolling_sum(close ** 2, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mid = total / window
+        std = np.sqrt(np.clip(total_sq / window - mid ** 2, 0, None))
+    full = count == window
+    mid = np.where(full, mid, np.nan)
+    std = np.where(full, std, np.nan)
+    return mid + k * std, mid, mid - k * std
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = _prev(close)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    tr = true_range(high, low, close)
+    return _warm(wilder(tr, period), tr, period)
+
+
+def vwap(high, low, close, volume, window: int = 20) -> np.ndarray:
+    """Rolling VWAP over `window` days; typical price falls back to close when high/low are missing."""
+    typical = np.where(np.isnan(high) | np.isnan(low), close, (high + low + close) / 3)
+    pv, count = _rolling_sum(typical * volume, window)
+    vol, _ = _rolling_sum(np.where(np.isnan(typical), np.nan, volume), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((count == window) & (vol > 0), pv / vol, np.nan)
+
+
+# -------------------------------------------------------
+# Screening helper used by the analyst tool
+# -------------------------------------------------------
+def compute(
+    fields: dict[str, np.ndarray],
+    indicators: list[str] | None = None,
+    short_window: int = 20,
+    long_window: int = 50,
+    period: int = 14,
+) -> dict[str, np.ndarray]:
+    """Compute the requested indicators for every symbol at once. Returns name -> 2-D array."""
+    indicators = indicators or list(INDICATORS)
+    unknown = set(indicators) - set(INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicators {sorted(unknown)}, expected any of {list(INDICATORS)}")
+
+    close, high, low, volume = fields["close"], fields["high"], fields["low"], fields["volume"]
+    out = {}
+    if "sma" in indicators:
+        out[f"sma_{short_window}"] = sma(close, short_window)
+        out[f"sma_{long_window}"] = sma(close, long_window)
+    if "ema" in indicators:
+        out[f"ema_{short_window}"] = ema(close, short_window)
+        out[f"ema_{long_window}"] = ema(close, long_window)
+    if "rsi" in indicators:
+        out[f"rsi_{period}"] = rsi(close, period)
+    if "macd" in indicators:
+        out["macd"], out["macd_signal"], out["macd_hist"] = macd(close)
+    if "bollinger" in indicators:
+        out["bb_upper"], out["bb_mid"], out["bb_lower"] = bollinger(close, short_window)
+    if "atr" in indicators:
+        out[f"atr_{period}"] = atr(high, low, close, period)
+    if "vwap" in indicators:
+        out[f"vwap_{short_window}"] = vwap(high, low, close, volume, short_window)
+    return out
+
+
+def _last_valid(x: np.ndarray, lookback: int) -> float | list | None:
+    values = x[~np.isnan(x)][-lookback:]
+    rounded = [round(float(v), 2) for v in values]
+    if lookback == 1:
+        return rounded[0] if rounded else None
+    return rounded
+
+
+def summarize(
+    series: dict[str, list[dict]],
+    indicators: list[str] | None = None,
+    lookback: int = 1,
+    **params,
+) -> dict[str, dict]:
+    """
+    Latest indicator values per symbol as a compact, JSON-friendly dict.
+    With lookback > 1 each indicator is a list of its last `lookback` values.
+    """
+    if lookback < 1:
+        raise ValueError(f"lookback must be at least 1, got {lookback}")
+    symbols, dates, fields = align(series)
+    results = compute(fields, indicators, **params)
+
+    summary = {}
+    for i, symbol in enumerate(symbols):
+        close = fields["close"][i]
+        valid = np.flatnonzero(~np.isnan(close))
+        row = {
+            "date": str(dates[valid[-1]]) if len(valid) else None,
+            "close": round(float(close[valid[-1]]), 2) if len(valid) else None,
+        }
+        for name, values in results.items():
+            row[name] = _last_valid(values[i], lookback)
+        summary[symbol] = row
+    return summary
@@ -0,0 +1,207 @@
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+import numpy as np
+
+from cache import TTLCache, make_key, ttl_for
+
+# -------------------------------------------------------
+# Data lineage of a sub-agent run
+# -------------------------------------------------------
+class DataTrace:
+    """API responses a sub-agent run read, and whether any read failed."""
+
+    def __init__(self):
+        self.sources: dict[str, tuple[str, dict | None]] = {}
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, params: dict | None = None):
+        with self._lock:
+            self.sources[make_key(endpoint, params)] = (endpoint, params)
+
+    def fail(self):
+        with self._lock:
+            self.failures += 1
+
+
+# Set around a sub-agent run; tool threads and tasks inherit it through contextvars.
+data_trace: ContextVar[DataTrace | None] = ContextVar("data_trace", default=None)
+
+
+def record_source(endpoint: str, params: dict | None = None):
+    trace = data_trace.get()
+    if trace is not None:
+        trace.add(endpoint, params)
+
+
+def record_failure():
+    trace = data_trace.get()
+    if trace is not None:
+        trace.fail()
+
+
+@contextmanager
+def tracing():
+    trace = DataTrace()
+    token = data_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        data_trace.reset(token)
+
+
+# -------------------------------------------------------
+# Request normalization and local similarity
+# -------------------------------------------------------
+_SPACES = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d+")
+VECTOR_DIM = 2048
+
+
+def normalize_request(text: str) -> str:
+    return _SPACES.sub(" ", text.lower()).strip(" .?!")
+
+
+def embed(text: str) -> np.ndarray:
+    """Hashed character-trigram vector (unit length); no model, runs in-process."""
+    padded = f" {text} "
+    vec = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for i in range(len(padded) - 2):
+        vec[zlib.crc32(padded[i:i + 3].encode("utf-8")) % VECTOR_DIM] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+# -------------------------------------------------------
+# Sub-agent memo
+# -------------------------------------------------------
+class SubAgentMemo:
+    """
+    Memoizes sub-agent answers per (user, normalized request).
+
+    An entry lives only as long as the freshest-expiring API response it was
+    built from, so a memoized answer is never staler than the data the agent
+    would have fetched. Runs that read no data or hit a failed call are not
+    stored. With similarity > 0, a miss falls back to the closest stored
+    request of the same user whose trigram cosine reaches the threshold and
+    whose numbers (periods, counts) match exactly.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        similarity: float = 0.0,
+        expiry_of: Callable[[str, dict | None], float | None] | None = None,
+        enabled: bool = True,
+    ):
+        self.cache = TTLCache(max_entries=max_entries)
+        self.similarity = similarity
+        self.expiry_of = expiry_of
+        self.enabled = enabled
+
+        self._vectors: dict[str, tuple[str, frozenset, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.similar_hits = 0
+        self.stored = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_env(cls, expiry_of=None) -> "SubAgentMemo":
+        return cls(
+            max_entries=int(os.getenv("SUBAGENT_MEMO_MAX_ENTRIES", "256")),
+            similarity=float(os.getenv("SUBAGENT_MEMO_SIMILARITY", "0")),
+            expiry_of=expiry_of,
+            enabled=os.getenv("SUBAGENT_MEMO_ENABLED", "1") == "1",
+        )
+
+    @staticmethod
+    def key(request: str, user: str | None) -> str:
+        return f"{user or ''}\x00{normalize_request(request)}"
+
+    def get(self, request: str, user: str | None = None) -> str | None:
+        if not self.enabled:
+            return None
+        answer = self.cache.get(self.key(request, user))
+        if answer is not None or not self.similarity:
+            return answer
+        return self._get_similar(normalize_request(request), user)
+
+    def _get_similar(self, text: str, user: str | None) -> str | None:
+        digits = frozenset(_DIGITS.findall(text))
+        with self._lock:
+            candidates = [
+                (key, vec) for key, (owner, nums, vec) in self._vectors.items()
+                if owner == user and nums == digits
+            ]
+        if not candidates:
+            return None
+
+        scores = np.stack([vec for _, vec in candidates]) @ embed(text)
+        for i in np.argsort(scores)[::-1]:
+            if scores[i] < self.similarity:
+                break
+            key = candidates[i][0]
+            item = self.cache.peek(key)
+            if item is None:
+                with self._lock:
+                    self._vectors.pop(key, None)
+                continue
+            with self._lock:
+                self.similar_hits += 1
+            return item[1]
+        return None
+
+    def _expires_at(self, endpoint: str, params: dict | None) -> float:
+        expires_at = self.expiry_of(endpoint, params) if self.expiry_of else None
+        return expires_at or time.time() + ttl_for(endpoint)
+
+    def put(self, request: str, user: str | None, answer: str, trace: DataTrace):
+        if not self.enabled:
+            return
+        if not answer or trace.failures or not trace.sources:
+            with self._lock:
+                self.skipped += 1
+            return
+
+        expires_at = min(self._expires_at(e, p) for e, p in trace.sources.values())
+        if expires_at <= time.time():
+            with self._lock:
+                self.skipped += 1
+            return
+
+        key = self.key(request, user)
+        self.cache.set(key, answer, ttl=0, expires_at=expires_at)
+        with self._lock:
+            self.stored += 1
+            if self.similarity:
+                text = normalize_request(request)
+                self._vectors[key] = (user, frozenset(_DIGITS.findall(text)), embed(text))
+                if len(self._vectors) > self.cache.max_entries:
+                    # drop vectors whose answers were evicted or expired
+                    for stale in [k for k in self._vectors if self.cache.peek(k) is None]:
+                        del self._vectors[stale]
+
+    def clear(self):
+        self.cache.clear()
+        with self._lock:
+            self._vectors.clear()
+
+    def stats(self) -> dict:
+        stats = self.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hits = stats["hits"] + self.similar_hits
+        stats.update({
+            "enabled": self.enabled,
+            "similar_hits": self.similar_hits,
+            "stored": self.stored,
+            "skipped": self.skipped,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        })
+        return stats
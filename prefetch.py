@@ -0,0 +1,158 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, time as dtime, timedelta, timezone
+
+import tools
+from cache import ttl_for
+from ratelimit import BACKGROUND, priority
+from dotenv import load_dotenv
+load_dotenv()
+
+# -------------------------------------------------------
+# Market-wide endpoints (tools that take no arguments)
+# -------------------------------------------------------
+MARKET_WIDE_ENDPOINTS = [
+    "/trending",
+    "/NSE_most_active",
+    "/BSE_most_active",
+    "/price_shockers",
+    "/fetch_52_week_high_low_data",
+    "/commodities",
+    "/news",
+]
+
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+
+
+def is_market_open(now: datetime | None = None) -> bool:
+    """NSE/BSE regular session, Mon-Fri 09:15-15:30 IST (exchange holidays not modelled)."""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+
+class PrefetchScheduler:
+    """
+    Background thread that keeps market-wide endpoints warm in tools.response_cache.
+
+    Refreshes every `market_interval` seconds while the market is open and every
+    `off_hours_interval` seconds otherwise. Entries are written with a TTL that
+    outlives the next refresh, so user-facing tool calls are served from cache.
+    Calls go through the background lane of the rate limiter.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[str] | None = None,
+        market_interval: float = 60.0,
+        off_hours_interval: float = 900.0,
+    ):
+        self.endpoints = endpoints or MARKET_WIDE_ENDPOINTS
+        self.market_interval = market_interval
+        self.off_hours_interval = off_hours_interval
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.runs = 0
+        self.errors = 0
+        self.last_run_at: float | None = None
+        self.last_run_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "PrefetchScheduler":
+        return cls(
+            market_interval=float(os.getenv("PREFETCH_MARKET_INTERVAL", "60")),
+            off_hours_interval=float(os.getenv("PREFETCH_OFF_HOURS_INTERVAL", "900")),
+        )
+
+    def interval(self) -> float:
+        return self.market_interval if is_market_open() else self.off_hours_interval
+
+    def run_once(self):
+        interval = self.interval()
+        started = time.perf_counter()
+
+        with priority(BACKGROUND):
+            for endpoint in self.endpoints:
+                # keep the entry alive until shortly after the next refresh
+                ttl = max(ttl_for(endpoint), interval * 1.5)
+                try:
+                    tools.refresh(endpoint, ttl=ttl)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Prefetch of {endpoint} failed: {e}")
+
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_run_seconds = time.perf_counter() - started
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval())
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if not tools.API_KEY:
+            print("INDIAN_API_KEY not set; prefetch scheduler not started")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="prefetch", daemon=True)
+        self._thread.start()
+        print(f"Prefetch scheduler started for {len(self.endpoints)} endpoints")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "market_open": is_market_open(),
+            "interval_s": self.interval(),
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": round(self.last_run_seconds, 3),
+        }
+
+
+# -------------------------------------------------------
+# Process-wide hooks (used by app.py)
+# -------------------------------------------------------
+_scheduler: PrefetchScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def start_prefetcher() -> PrefetchScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PrefetchScheduler.from_env()
+            atexit.register(stop_prefetcher)
+        _scheduler.start()
+        return _scheduler
+
+
+def stop_prefetcher():
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop()
+
+
+if __name__ == "__main__":
+    # Standalone mode: share results with the app through the on-disk cache tier.
+    if not os.getenv("RESPONSE_CACHE_PATH"):
+        print("RESPONSE_CACHE_PATH is not set; prefetched data will not be visible to other processes")
+
+    scheduler = PrefetchScheduler.from_env()
+    try:
+        scheduler._loop()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,199 @@
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+from telemetry import metrics
+
+# -------------------------------------------------------
+# Per-endpoint projection schemas
+# -------------------------------------------------------
+@dataclass(frozen=True)
+class Schema:
+    """
+    How to shrink one endpoint's payload before it reaches the LLM.
+
+    fields:    dotted top-level paths to keep (None keeps everything)
+    drop:      keys removed at any depth
+    max_rows:  cap on every list, keeping the first or last rows (see keep)
+    max_keys:  cap on period-keyed dicts ("Mar 2024", "2024-03-31", "FY24"), e.g. the
+               periods of each statement line; other dicts are never trimmed
+    keep:      "first" for ranked lists, "last" for time series
+    decimals:  rounding for floats and numeric strings
+    max_chars: cap on long strings such as descriptions and news bodies
+    """
+    fields: tuple[str, ...] | None = None
+    drop: tuple[str, ...] = ()
+    max_rows: int | None = 20
+    max_keys: int | None = None
+    keep: str = "first"
+    decimals: int = 2
+    max_chars: int = 500
+
+
+DEFAULT_SCHEMA = Schema()
+
+SCHEMAS = {
+    "/stock": Schema(
+        fields=(
+            "companyName",
+            "industry",
+            "currentPrice",
+            "percentChange",
+            "yearHigh",
+            "yearLow",
+            "stockTechnicalData",
+            "keyMetrics",
+            "analystView",
+            "recosBar",
+            "riskMeter",
+            "shareholding",
+            "recentNews",
+            "companyProfile",
+        ),
+        drop=("officers", "peerCompanyList", "url", "thumbnailImage", "listingDate"),
+        max_rows=8,
+        max_chars=300,
+    ),
+    "/mutual_funds": Schema(max_rows=5, max_chars=200),
+    "/historical_stats": Schema(max_keys=8, keep="last"),
+    "/historical_data": Schema(max_rows=60, keep="last"),
+    "/news": Schema(
+        drop=("image_url", "thumbnail", "topics"),
+        max_rows=10,
+        max_chars=300,
+    ),
+    "/trending": Schema(max_rows=10),
+    "/NSE_most_active": Schema(max_rows=10),
+    "/BSE_most_active": Schema(max_rows=10),
+    "/price_shockers": Schema(max_rows=10),
+    "/fetch_52_week_high_low_data": Schema(max_rows=10),
+    "/ipo": Schema(max_rows=10, max_chars=200),
+    "/industry_search": Schema(max_rows=10, max_chars=200),
+    "/mutual_fund_search": Schema(max_rows=10, max_chars=200),
+}
+
+PROJECTION_ENABLED = os.getenv("PAYLOAD_PROJECTION", "1") == "1"
+
+_NUMERIC = re.compile(r"^-?\d+\.\d+$")
+_PERIOD_KEY = re.compile(r"(?:19|20)\d{2}|\b(?:fy|q[1-4])\s*'?\d{2}\b", re.IGNORECASE)
+
+
+def estimate_tokens(payload) -> int:
+    """Rough token count (~4 characters per token of compact JSON)."""
+    return len(json.dumps(payload, separators=(",", ":"), default=str)) // 4
+
+
+# -------------------------------------------------------
+# Projection
+# -------------------------------------------------------
+def round_value(value, decimals: int = 2):
+    """Round floats and numeric strings ("12.345678" -> "12.35")."""
+    if isinstance(value, float):
+        return round(value, decimals)
+    if isinstance(value, str) and _NUMERIC.match(value):
+        return f"{float(value):.{decimals}f}"
+    return value
+
+
+def _periodic(keys) -> bool:
+    """True when every key names a period, so trimming drops periods, not statement lines."""
+    return all(_PERIOD_KEY.search(str(k)) for k in keys)
+
+
+def _shrink(value, schema: Schema):
+    if isinstance(value, dict):
+        items = [
+            (k, _shrink(v, schema)) for k, v in value.items() if k not in schema.drop
+        ]
+        items = [(k, v) for k, v in items if v not in (None, "", [], {})]
+        if schema.max_keys and len(items) > schema.max_keys and _periodic(k for k, _ in items):
+            more = len(items) - schema.max_keys
+            note = ("...", f"{more} more periods omitted")
+            if schema.keep == "last":
+                items = [note] + items[-schema.max_keys:]
+            else:
+                items = items[:schema.max_keys] + [note]
+        return dict(items)
+
+    if isinstance(value, list):
+        rows = value
+        more = 0
+        if schema.max_rows is not None and len(rows) > schema.max_rows:
+            more = len(rows) - schema.max_rows
+            rows = rows[-schema.max_rows:] if schema.keep == "last" else rows[:schema.max_rows]
+        rows = [_shrink(v, schema) for v in rows]
+        if more:
+            note = f"... {more} more rows omitted"
+            rows = [note] + rows if schema.keep == "last" else rows + [note]
+        return rows
+
+    if isinstance(value, str) and len(value) > schema.max_chars:
+        return value[:schema.max_chars] + "…"
+
+    return round_value(value, schema.decimals)
+
+
+def _select(payload, fields: tuple[str, ...]):
+    if not isinstance(payload, dict):
+        return payload
+
+    selected: dict = {}
+    for path in fields:
+        node, target = payload, selected
+        parts = path.split(".")
+        for i, part in enumerate(parts):
+            if not isinstance(node, dict) or part not in node:
+                break
+            node = node[part]
+            if i == len(parts) - 1:
+                target[part] = node
+            else:
+                target = target.setdefault(part, {})
+    return selected
+
+
+class ProjectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def record(self, before: int, after: int):
+        with self._lock:
+            self.calls += 1
+            self.tokens_before += before
+            self.tokens_after += after
+
+    def snapshot(self) -> dict:
+        saved = self.tokens_before - self.tokens_after
+        return {
+            "calls": self.calls,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / self.tokens_before, 3) if self.tokens_before else 0.0,
+        }
+
+
+projection_stats = ProjectionStats()
+
+
+def project(endpoint: str, payload, full: bool = False):
+    """
+    Compact representation of an API payload for the LLM.
+    full=True (or PAYLOAD_PROJECTION=0) returns the payload untouched.
+    """
+    if full or not PROJECTION_ENABLED:
+        return payload
+
+    schema = SCHEMAS.get(endpoint, DEFAULT_SCHEMA)
+    projected = _select(payload, schema.fields) if schema.fields else payload
+    projected = _shrink(projected, schema)
+
+    before, after = estimate_tokens(payload), estimate_tokens(projected)
+    projection_stats.record(before, after)
+    metrics.inc("projection_tokens_saved", before - after, endpoint=endpoint)
+    return projected
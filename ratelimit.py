@@ -0,0 +1,235 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from requests.exceptions import RequestException
+
+# -------------------------------------------------------
+# Priority lanes (lower value is served first)
+# -------------------------------------------------------
+INTERACTIVE = 0
+BACKGROUND = 1
+
+LANE_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+request_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(lane: int):
+    """Run API calls made inside this block in the given lane."""
+    token = request_priority.set(lane)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class QuotaWaitTimeout(RequestException):
+    """Raised when a caller waited longer than max_wait for a request slot."""
+
+
+class _Ticket:
+    __slots__ = ("lane", "enqueued_at", "cancelled")
+
+    def __init__(self, lane: int):
+        self.lane = lane
+        self.enqueued_at = time.monotonic()
+        self.cancelled = False
+
+
+class QuotaManager:
+    """
+    Client-side token bucket for the Indian API key.
+
+    Tokens refill at `rate` per second up to `burst`. Callers that would exceed
+    the bucket queue up and are served strictly by lane, then FIFO, so
+    interactive tool calls overtake background refreshes. Works for both
+    threads (acquire) and coroutines (aacquire). Usage against an optional
+    `quota_limit` per `quota_window` seconds is tracked for reporting.
+    """
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: int = 10,
+        max_wait: float = 30.0,
+        quota_limit: int | None = None,
+        quota_window: float = 86400.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.quota_limit = quota_limit
+        self.quota_window = quota_window
+
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._queue: list[tuple[int, int, _Ticket]] = []
+        self._seq = itertools.count()
+
+        self._window_started = time.time()
+        self._window_used = 0
+        self._granted = {lane: 0 for lane in LANE_NAMES}
+        self._wait_total = {lane: 0.0 for lane in LANE_NAMES}
+        self._wait_max = {lane: 0.0 for lane in LANE_NAMES}
+        self._timeouts = 0
+
+    @classmethod
+    def from_env(cls) -> "QuotaManager":
+        quota = os.getenv("INDIAN_API_QUOTA")
+        return cls(
+            rate=float(os.getenv("INDIAN_API_RATE", "5")),
+            burst=int(os.getenv("INDIAN_API_BURST", "10")),
+            max_wait=float(os.getenv("INDIAN_API_MAX_QUEUE_WAIT", "30")),
+            quota_limit=int(quota) if quota else None,
+            quota_window=float(os.getenv("INDIAN_API_QUOTA_WINDOW", "86400")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    # ---------------------------------------------------
+    # Bucket internals (caller holds self._cond)
+    # ---------------------------------------------------
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _enqueue(self, lane: int) -> _Ticket:
+        ticket = _Ticket(lane)
+        heapq.heappush(self._queue, (lane, next(self._seq), ticket))
+        return ticket
+
+    def _poll(self, ticket: _Ticket) -> float:
+        """Grant the ticket (returns 0) or return seconds until it may be granted."""
+        while self._queue and self._queue[0][2].cancelled:
+            heapq.heappop(self._queue)
+
+        self._refill()
+        next_token = max(0.0, (1 - self._tokens) / self.rate)
+        if self._queue[0][2] is not ticket:
+            # someone ahead of us takes the next token; re-check shortly after
+            return next_token + 0.005
+
+        if self._tokens >= 1:
+            heapq.heappop(self._queue)
+            self._tokens -= 1
+            self._record(ticket)
+            return 0.0
+        return next_token
+
+    def _record(self, ticket: _Ticket):
+        waited = time.monotonic() - ticket.enqueued_at
+        self._granted[ticket.lane] += 1
+        self._wait_total[ticket.lane] += waited
+        self._wait_max[ticket.lane] = max(self._wait_max[ticket.lane], waited)
+
+        now = time.time()
+        if now - self._window_started >= self.quota_window:
+            self._window_started = now
+            self._window_used = 0
+        self._window_used += 1
+
+    def _give_up(self, ticket: _Ticket):
+        ticket.cancelled = True
+        self._timeouts += 1
+        self._cond.notify_all()
+
+    # ---------------------------------------------------
+    # Public API
+    # ---------------------------------------------------
+    def acquire(self, lane: int | None = None, timeout: float | None = None):
+        if not self.enabled:
+            return
+        lane = request_priority.get() if lane is None else lane
+        timeout = self.max_wait if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            ticket = self._enqueue(lane)
+            while True:
+                delay = self._poll(ticket)
+                if delay == 0:
+                    self._cond.notify_all()
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._give_up(ticket)
+                    raise QuotaWaitTimeout(
+                        f"Timed out after {timeout:g}s waiting for an Indian API request slot"
+                    )
+                self._cond.wait(min(delay, remaining))
+
+    async def aacquire(self, lane: int | None = None, timeout: float | None = None):
+        if not self.enabled:
+            return
+        lane = request_priority.get() if lane is None else lane
+        timeout = self.max_wait if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            ticket = self._enqueue(lane)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._poll(ticket)
+                    if delay == 0:
+                        self._cond.notify_all()
+                        return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise QuotaWaitTimeout(
+                        f"Timed out after {timeout:g}s waiting for an Indian API request slot"
+                    )
+                await asyncio.sleep(min(delay, remaining))
+        except BaseException:
+            with self._cond:
+                if not ticket.cancelled:
+                    self._give_up(ticket)
+            raise
+
+    def penalize(self, seconds: float):
+        """
+        Upstream answered 429: drain the bucket so nobody sends for `seconds`.
+        """
+        if not self.enabled or seconds <= 0:
+            return
+        with self._cond:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill()
+            lanes = {}
+            for lane, name in LANE_NAMES.items():
+                granted = self._granted[lane]
+                lanes[name] = {
+                    "granted": granted,
+                    "avg_wait_s": round(self._wait_total[lane] / granted, 4) if granted else 0.0,
+                    "max_wait_s": round(self._wait_max[lane], 4),
+                }
+            return {
+                "enabled": self.enabled,
+                "rate_per_s": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+                "queued": sum(1 for _, _, t in self._queue if not t.cancelled),
+                "timeouts": self._timeouts,
+                "quota_used": self._window_used,
+                "quota_limit": self.quota_limit,
+                "quota_remaining": (
+                    max(self.quota_limit - self._window_used, 0)
+                    if self.quota_limit is not None else None
+                ),
+                "lanes": lanes,
+            }
@@ -0,0 +1,282 @@
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import tools
+from symbols import symbol_index
+
+# -------------------------------------------------------
+# Query normalization (company names resolve through symbols.symbol_index)
+# -------------------------------------------------------
+# words that carry no intent ("what is the latest price of tcs today please")
+FILLERS = {
+    "a", "an", "the", "is", "are", "what", "whats", "show", "me", "tell", "give",
+    "get", "fetch", "list", "please", "pls", "current", "currently", "latest",
+    "today", "todays", "now", "right", "live", "on", "in", "for", "of", "s",
+    "stock", "stocks", "share", "shares", "ltd", "limited", "market", "markets",
+}
+
+_PUNCT = re.compile(r"[^\w&\s]")
+
+
+def normalize(text: str) -> list[str]:
+    """Lowercase word tokens with punctuation and filler words removed."""
+    words = _PUNCT.sub(" ", text.lower()).split()
+    return [w for w in words if w not in FILLERS]
+
+
+# -------------------------------------------------------
+# Intents
+# -------------------------------------------------------
+@dataclass(frozen=True)
+class Route:
+    intent: str
+    endpoint: str
+    params: dict | None = None
+
+
+# Patterns are full matches over the normalized text, so anything beyond a plain
+# lookup ("compare", "why", "should i buy ...") misses and goes to the agent graph.
+MARKET_INTENTS = [
+    ("trending", "/trending", r"(top )?(gainers|losers|gainers and losers|losers and gainers|movers|top movers|trending)"),
+    ("ipo", "/ipo", r"(upcoming |recent |new |ongoing )?ipos?( list| data| calendar| details)?"),
+    ("news", "/news", r"(business |financial )?(news|headlines)"),
+    ("nse_most_active", "/NSE_most_active", r"(nse most active|most active nse)( by volume)?"),
+    ("bse_most_active", "/BSE_most_active", r"(bse most active|most active bse)( by volume)?"),
+    ("52_week", "/fetch_52_week_high_low_data", r"52 ?(week|wk) (high|low|highs|lows|high low|high and low|highs and lows)"),
+    ("price_shockers", "/price_shockers", r"price (shockers|shocks|movers)"),
+    ("commodities", "/commodities", r"commodit(y|ies)( prices| futures| data)?"),
+]
+MARKET_PATTERNS = [
+    (intent, endpoint, re.compile(pattern)) for intent, endpoint, pattern in MARKET_INTENTS
+]
+
+PRICE_PATTERNS = [
+    re.compile(r"(price|quote|ltp|trading at)( for)? (?P<symbol>.+)"),
+    re.compile(r"(?P<symbol>.+?) (price|quote|ltp|trading at)"),
+    re.compile(r"how much (is )?(?P<symbol>.+?)( worth| trading at)?"),
+]
+
+
+def resolve_symbol(text: str) -> str | None:
+    """Name for /stock on an exact match only; the fast path must not guess."""
+    listing = symbol_index.exact(text)
+    return listing.name if listing else None
+
+
+# -------------------------------------------------------
+# Templates (raw payload -> markdown); raising falls back to the graph
+# -------------------------------------------------------
+NAME_KEYS = ("company_name", "companyName", "name", "company", "commodity_name", "commodity", "title", "ticker_id", "symbol")
+PRICE_KEYS = ("price", "last_price", "ltp", "current_price", "close", "lastPrice")
+CHANGE_KEYS = ("percent_change", "percentChange", "change_percent", "net_change", "change")
+MAX_ROWS = 5
+
+
+def _first(row: dict, keys: tuple[str, ...]):
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _sections(payload, title: str = "") -> list[tuple[str, list[dict]]]:
+    """Every list of records in the payload, labelled by the key it sits under."""
+    if isinstance(payload, list):
+        rows = [r for r in payload if isinstance(r, dict)]
+        return [(title, rows)] if rows else []
+    if isinstance(payload, dict):
+        found = []
+        for key, value in payload.items():
+            found.extend(_sections(value, key))
+        return found
+    return []
+
+
+def _label(key: str) -> str:
+    return key.replace("_", " ").strip().title()
+
+
+def _row_line(row: dict) -> str:
+    name = _first(row, NAME_KEYS)
+    if name is None:
+        raise ValueError("row without a name")
+    parts = [f"**{name}**"]
+    price = _first(row, PRICE_KEYS)
+    if price is not None:
+        parts.append(f"₹{price}")
+    change = _first(row, CHANGE_KEYS)
+    if change is not None:
+        parts.append(f"({change}%)")
+    return " ".join(parts)
+
+
+def format_table(heading: str, payload) -> str:
+    sections = _sections(payload)
+    if not sections:
+        raise ValueError("no records in payload")
+
+    lines = [f"### {heading}"]
+    for key, rows in sections:
+        if key and len(sections) > 1:
+            lines.append(f"\n**{_label(key)}**")
+        lines.extend(f"- {_row_line(row)}" for row in rows[:MAX_ROWS])
+    return "\n".join(lines)
+
+
+def format_news(heading: str, payload) -> str:
+    rows = [row for _, section in _sections(payload) for row in section]
+    items = []
+    for row in rows[:MAX_ROWS]:
+        title = row.get("title") or row.get("headline")
+        if not title:
+            raise ValueError("news item without a title")
+        url = row.get("url") or row.get("link")
+        items.append(f"- [{title}]({url})" if url else f"- {title}")
+    if not items:
+        raise ValueError("no news items")
+    return "\n".join([f"### {heading}", *items])
+
+
+def _price_value(value):
+    if isinstance(value, dict):
+        return ", ".join(f"{k} ₹{v}" for k, v in value.items() if v not in (None, ""))
+    return f"₹{value}"
+
+
+def format_quote(payload) -> str:
+    if not isinstance(payload, dict) or not payload.get("currentPrice"):
+        raise ValueError("quote without currentPrice")
+
+    lines = [f"### {payload.get('companyName', 'Quote')}"]
+    lines.append(f"- Price: {_price_value(payload['currentPrice'])}")
+    if payload.get("percentChange") not in (None, ""):
+        lines.append(f"- Change: {payload['percentChange']}%")
+    if payload.get("yearHigh") and payload.get("yearLow"):
+        lines.append(f"- 52-week range: ₹{payload['yearLow']} – ₹{payload['yearHigh']}")
+    if payload.get("industry"):
+        lines.append(f"- Industry: {payload['industry']}")
+    return "\n".join(lines)
+
+
+HEADINGS = {
+    "trending": "Top gainers and losers",
+    "ipo": "IPOs",
+    "news": "Market news",
+    "nse_most_active": "NSE most active",
+    "bse_most_active": "BSE most active",
+    "52_week": "52-week highs and lows",
+    "price_shockers": "Price shockers",
+    "commodities": "Commodities",
+}
+
+
+def render(route: Route, payload) -> str:
+    if route.intent == "quote":
+        return format_quote(payload)
+    if route.intent == "news":
+        return format_news(HEADINGS["news"], payload)
+    return format_table(HEADINGS[route.intent], payload)
+
+
+# -------------------------------------------------------
+# Router
+# -------------------------------------------------------
+class FastPathRouter:
+    """
+    Answers simple single-endpoint lookups (quotes, gainers/losers, IPOs, news ...)
+    straight from the tools cache/API with a template, skipping the supervisor,
+    the data-collector sub-agent and its tool-choice turn. Anything it is not
+    certain about, or any failure, returns None so the caller runs the graph.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.fast_path = 0
+        self.errors = 0
+        self.fast_path_ms = 0.0
+        self.by_intent: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> "FastPathRouter":
+        return cls(enabled=os.getenv("FAST_PATH_ENABLED", "1") == "1")
+
+    def match(self, text: str) -> Route | None:
+        words = normalize(text)
+        if not words or len(words) > 8:
+            return None
+        query = " ".join(words)
+
+        for intent, endpoint, pattern in MARKET_PATTERNS:
+            if pattern.fullmatch(query):
+                return Route(intent, endpoint)
+
+        for pattern in PRICE_PATTERNS:
+            m = pattern.fullmatch(query)
+            name = resolve_symbol(m.group("symbol")) if m else None
+            if name:
+                return Route("quote", "/stock", {"name": name})
+
+        name = resolve_symbol(query)  # bare "tcs" / "reliance"
+        if name:
+            return Route("quote", "/stock", {"name": name})
+        return None
+
+    def _record(self, route: Route | None, started: float, ok: bool):
+        with self._lock:
+            self.queries += 1
+            if route and ok:
+                self.fast_path += 1
+                self.fast_path_ms += (time.perf_counter() - started) * 1000
+                self.by_intent[route.intent] += 1
+            elif route:
+                self.errors += 1
+
+    def answer(self, text: str) -> str | None:
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        route = self.match(text)
+        answer = None
+        if route:
+            try:
+                answer = render(route, tools._load(route.endpoint, route.params))
+            except Exception as e:
+                print(f"Fast path {route.intent} fell back to the agent: {e}")
+        self._record(route, started, answer is not None)
+        return answer
+
+    async def aanswer(self, text: str) -> str | None:
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        route = self.match(text)
+        answer = None
+        if route:
+            try:
+                answer = render(route, await tools._aload(route.endpoint, route.params))
+            except Exception as e:
+                print(f"Fast path {route.intent} fell back to the agent: {e}")
+        self._record(route, started, answer is not None)
+        return answer
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "fast_path": self.fast_path,
+                "fallbacks": self.queries - self.fast_path,
+                "errors": self.errors,
+                "fast_path_ratio": round(self.fast_path / self.queries, 3) if self.queries else 0.0,
+                "avg_fast_path_ms": round(self.fast_path_ms / self.fast_path, 1) if self.fast_path else 0.0,
+                "by_intent": dict(self.by_intent),
+            }
+
+
+fast_path = FastPathRouter.from_env()
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable
+
+
+class _Call:
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self.future: Future = Future()
+        self.loop = loop                      # set when an async caller leads
+        self.task: asyncio.Task | None = None
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight calls.
+
+    The first caller for a key runs the function; concurrent callers with the
+    same key wait for it and share its result or exception. do() and ado()
+    share one key space, so a sync call on a worker thread and a coroutine on
+    an event loop asking for the same key make a single request: threads block
+    on the leader's future, coroutines await it (asyncio.wrap_future).
+    Nothing is remembered once the call finishes - caching is a separate layer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call.loop is not None and call.loop is _running_loop():
+                # blocking this thread would stall the loop the leader runs on
+                call = None
+                leader = False
+                self.executed += 1
+            elif call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.executed += 1
+            else:
+                leader = False
+                self.shared += 1
+
+        if call is None:
+            return fn(*args, **kwargs)
+        if not leader:
+            return call.future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._forget(key, call)
+            call.future.set_exception(e)
+            raise
+        self._forget(key, call)
+        call.future.set_result(result)
+        return result
+
+    async def ado(self, key: str, fn: Callable[..., Awaitable], *args, **kwargs):
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call(loop)
+                call.task = loop.create_task(fn(*args, **kwargs))
+                call.task.add_done_callback(lambda t: self._settle(key, call, t))
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        # one waiter being cancelled must not cancel the shared request
+        if call.loop is loop:
+            return await asyncio.shield(call.task)
+        return await asyncio.shield(asyncio.wrap_future(call.future))
+
+    def _settle(self, key: str, call: _Call, task: asyncio.Task):
+        """Hand an async leader's outcome to waiters on other threads and loops."""
+        self._forget(key, call)
+        if task.cancelled():
+            call.future.cancel()
+        elif task.exception() is not None:
+            call.future.set_exception(task.exception())
+        else:
+            call.future.set_result(task.result())
+
+    def _forget(self, key: str, call: _Call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def stats(self) -> dict:
+        total = self.executed + self.shared
+        return {
+            "executed": self.executed,
+            "shared": self.shared,
+            "in_flight": len(self._calls),
+            "coalesced_rate": round(self.shared / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,398 @@
+import atexit
+import csv
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+from telemetry import annotate, metrics
+
+# -------------------------------------------------------
+# Listings
+# -------------------------------------------------------
+@dataclass
+class Listing:
+    """
+    One listed company.
+
+    name:     the name /stock and /historical_* accept (the query that worked, when learned)
+    stock_id: the NSE ticker /stock_target_price and /stock_forecasts accept
+    aliases:  other names, tickers and exchange codes it is known by
+    """
+    name: str
+    stock_id: str = ""
+    aliases: set[str] = field(default_factory=set)
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "stock_id": self.stock_id, "aliases": sorted(self.aliases)}
+
+
+# Curated seed: common names and short forms the API does not return.
+SEED = [
+    Listing("Reliance", "RELIANCE", {"reliance industries", "ril"}),
+    Listing("TCS", "TCS", {"tata consultancy", "tata consultancy services"}),
+    Listing("Infosys", "INFY", {"infy"}),
+    Listing("HDFC Bank", "HDFCBANK", {"hdfcbank"}),
+    Listing("ICICI Bank", "ICICIBANK", {"icicibank"}),
+    Listing("State Bank of India", "SBIN", {"sbi"}),
+    Listing("Axis Bank", "AXISBANK"),
+    Listing("Kotak Mahindra Bank", "KOTAKBANK", {"kotak", "kotak bank"}),
+    Listing("Bharti Airtel", "BHARTIARTL", {"airtel"}),
+    Listing("ITC", "ITC"),
+    Listing("Hindustan Unilever", "HINDUNILVR", {"hul"}),
+    Listing("Larsen & Toubro", "LT", {"larsen", "l&t"}),
+    Listing("Wipro", "WIPRO"),
+    Listing("HCL Technologies", "HCLTECH", {"hcl tech"}),
+    Listing("Tech Mahindra", "TECHM"),
+    Listing("Bajaj Finance", "BAJFINANCE"),
+    Listing("Maruti Suzuki", "MARUTI", {"maruti"}),
+    Listing("Tata Motors", "TATAMOTORS"),
+    Listing("Tata Steel", "TATASTEEL"),
+    Listing("Sun Pharmaceutical", "SUNPHARMA", {"sun pharma"}),
+    Listing("Asian Paints", "ASIANPAINT"),
+    Listing("Titan", "TITAN"),
+    Listing("Adani Enterprises", "ADANIENT"),
+    Listing("Adani Ports", "ADANIPORTS"),
+    Listing("ONGC", "ONGC"),
+    Listing("NTPC", "NTPC"),
+    Listing("Power Grid", "POWERGRID"),
+    Listing("Coal India", "COALINDIA"),
+    Listing("UltraTech Cement", "ULTRACEMCO"),
+    Listing("Nestle India", "NESTLEIND"),
+    Listing("Zomato", "ZOMATO"),
+]
+
+# alias -> name, for matching company mentions inside free text
+ALIASES = {
+    alias.lower(): listing.name
+    for listing in SEED
+    for alias in (listing.name, *listing.aliases)
+}
+
+# listing-file columns, matched case-insensitively (NSE EQUITY_L.csv, BSE scrip lists, ...)
+SYMBOL_COLUMNS = ("symbol", "security id", "ticker", "nse code", "stock_id")
+NAME_COLUMNS = ("name of company", "security name", "company name", "issuer name", "name")
+
+_EXCHANGE_SUFFIX = re.compile(r"\.(ns|bo|nse|bse)$")
+_PUNCT = re.compile(r"[^\w&\s]")
+_LEGAL_SUFFIXES = {"ltd", "limited"}
+
+
+def normalize(text: str) -> str:
+    """Lowercase words without punctuation, exchange suffixes, a leading "The" or a trailing "Ltd"."""
+    words = _PUNCT.sub(" ", _EXCHANGE_SUFFIX.sub("", str(text).strip().lower())).split()
+    words = ["and" if w == "&" else w for w in words]
+    if len(words) > 1 and words[0] == "the":
+        words.pop(0)
+    while words and words[-1] in _LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def _keys(text: str) -> set[str]:
+    key = normalize(text)
+    return {key, key.replace(" ", "")} - {""}
+
+
+def _nse_code(row: dict) -> str:
+    # /stock's companyProfile spells it exchangeCodeNse, /industry_search rows exchangeCodeNsi
+    return str(row.get("exchangeCodeNsi") or row.get("exchangeCodeNse") or "").upper()
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Node:
+    __slots__ = ("children", "names")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.names: set[str] = set()
+
+
+# -------------------------------------------------------
+# Index
+# -------------------------------------------------------
+class SymbolIndex:
+    """
+    Resolves the company names and stock ids the LLM passes to tools against
+    known listings before any API call. Only an exact match on a normalized
+    name, ticker or alias rewrites an argument. A unique whole-word prefix in
+    the trie or a fuzzy match over trigram candidates is only a suggestion,
+    recorded on the current span, since the index holds a partial listing
+    ("HDFC" may mean HDFC Bank or HDFC Life); those arguments pass through
+    unchanged.
+
+    Seeded with SEED and an optional listing file (SYMBOL_LISTING_FILE);
+    /stock and /industry_search responses add listings as they are fetched,
+    and those are kept in SYMBOL_INDEX_PATH across restarts.
+    """
+
+    def __init__(self, path: str | None = None, fuzzy_cutoff: float = 0.82, save_interval: float = 30.0):
+        self.path = path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.save_interval = save_interval
+        self._lock = threading.RLock()
+        self._listings: dict[str, Listing] = {}
+        self._exact: dict[str, str] = {}
+        self._trie = _Node()
+        self._trigrams: dict[str, set[str]] = {}
+        self._memo: dict[str, tuple[Listing | None, str]] = {}
+        self._learned: set[str] = set()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self.lookups: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> "SymbolIndex":
+        index = cls(
+            path=os.getenv("SYMBOL_INDEX_PATH", "data/symbols.json") or None,
+            fuzzy_cutoff=float(os.getenv("SYMBOL_FUZZY_CUTOFF", "0.82")),
+        )
+        for listing in SEED:
+            index.add(Listing(listing.name, listing.stock_id, set(listing.aliases)))
+        listing_file = os.getenv("SYMBOL_LISTING_FILE")
+        if listing_file:
+            try:
+                print(f"Imported {index.import_listing(listing_file)} listings from {listing_file}")
+            except (OSError, csv.Error) as e:
+                print(f"Symbol listing file not loaded: {e}")
+        index.load()
+        atexit.register(index.save)
+        return index
+
+    # ---------------------------------------------------
+    # Building
+    # ---------------------------------------------------
+    def add(self, listing: Listing, learned: bool = False) -> bool:
+        """Insert a listing or merge it into the one sharing a key; True if anything changed."""
+        terms = {listing.name, listing.stock_id, *listing.aliases} - {""}
+        with self._lock:
+            existing = next(
+                (self._exact[k] for term in terms for k in _keys(term) if k in self._exact), None
+            )
+            if existing is None:
+                target = Listing(listing.name, listing.stock_id)
+                self._listings[target.name] = target
+                new_terms = terms
+            else:
+                target = self._listings[existing]
+                new_terms = terms - {target.name, target.stock_id, *target.aliases}
+                if not target.stock_id and listing.stock_id:
+                    target.stock_id = listing.stock_id
+
+            target.aliases |= new_terms - {target.name, target.stock_id}
+            for term in new_terms:
+                self._index(term, target.name)
+
+            changed = existing is None or bool(new_terms)
+            if changed:
+                self._memo.clear()
+                if learned:
+                    self._learned.add(target.name)
+                    self._dirty = True
+            return changed
+
+    def _index(self, term: str, name: str):
+        for key in _keys(term):
+            if self._exact.setdefault(key, name) != name:
+                continue  # another listing owns this key (seed and earlier entries win)
+            node = self._trie
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+                node.names.add(name)
+            for gram in _trigrams(key):
+                self._trigrams.setdefault(gram, set()).add(key)
+
+    def import_listing(self, path: str) -> int:
+        """Add the rows of a CSV listing file (symbol and company-name columns)."""
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            columns = {c.strip().lower(): c for c in reader.fieldnames or []}
+            symbol_col = next((columns[c] for c in SYMBOL_COLUMNS if c in columns), None)
+            name_col = next((columns[c] for c in NAME_COLUMNS if c in columns), None)
+            if not name_col:
+                raise csv.Error(f"no company name column in {path}")
+            count = 0
+            for row in reader:
+                name = (row.get(name_col) or "").strip()
+                if name:
+                    symbol = (row.get(symbol_col) or "").strip() if symbol_col else ""
+                    count += self.add(Listing(name, symbol.upper()))
+            return count
+
+    def learn(self, endpoint: str, params: dict | None, payload):
+        """Add the listings a fresh API response reveals."""
+        try:
+            if endpoint == "/stock" and isinstance(payload, dict) and payload.get("companyName"):
+                profile = payload.get("companyProfile") or {}
+                stock_id = _nse_code(profile) or str(payload.get("tickerId") or "").upper()
+                aliases = {payload["companyName"], str(profile.get("exchangeCodeBse") or "")}
+                name = (params or {}).get("name") or payload["companyName"]
+                self.add(Listing(name, stock_id, aliases - {""}), learned=True)
+            elif endpoint == "/industry_search" and isinstance(payload, list):
+                for row in payload:
+                    if isinstance(row, dict) and row.get("commonName"):
+                        stock_id = _nse_code(row)
+                        aliases = {str(row.get("exchangeCodeBse") or ""), str(row.get("id") or "")}
+                        self.add(Listing(row["commonName"], stock_id, aliases - {""}), learned=True)
+        except Exception as e:
+            print(f"Symbol index could not learn from {endpoint}: {e}")
+        self._maybe_save()
+
+    # ---------------------------------------------------
+    # Lookup
+    # ---------------------------------------------------
+    def exact(self, text: str) -> Listing | None:
+        """Exact normalized match only (for callers that must be certain, e.g. the fast path)."""
+        key = normalize(text)
+        with self._lock:
+            name = self._exact.get(key) or self._exact.get(key.replace(" ", ""))
+            return self._listings.get(name) if name else None
+
+    def resolve(self, text: str) -> tuple[Listing | None, str]:
+        """(listing, how) where how is "exact", "prefix", "fuzzy" or "miss"."""
+        key = normalize(text)
+        with self._lock:
+            if key in self._memo:
+                listing, how = self._memo[key]
+            else:
+                listing, how = self._lookup(key)
+                if len(self._memo) >= 4096:
+                    self._memo.clear()
+                self._memo[key] = (listing, how)
+            self.lookups[how] += 1
+        return listing, how
+
+    def _lookup(self, key: str) -> tuple[Listing | None, str]:
+        if not key:
+            return None, "miss"
+        compact = key.replace(" ", "")
+        name = self._exact.get(key) or self._exact.get(compact)
+        if name:
+            return self._listings[name], "exact"
+
+        if len(key) >= 3:
+            node = self._trie
+            for char in key:
+                node = node.children.get(char)
+                if node is None:
+                    break
+            # whole words only: "tata mo" is not a prefix match for Tata Motors
+            if node is not None and " " in node.children and len(node.names) == 1:
+                return self._listings[next(iter(node.names))], "prefix"
+
+        if len(compact) >= 4:
+            listing = self._fuzzy(compact)
+            if listing:
+                return listing, "fuzzy"
+        return None, "miss"
+
+    def _fuzzy(self, compact: str) -> Listing | None:
+        shared: Counter = Counter()
+        for gram in _trigrams(compact):
+            shared.update(self._trigrams.get(gram, ()))
+        scores: dict[str, float] = {}
+        for candidate, _ in shared.most_common(20):
+            name = self._exact[candidate]
+            ratio = SequenceMatcher(None, compact, candidate.replace(" ", "")).ratio()
+            scores[name] = max(scores.get(name, 0.0), ratio)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        if not ranked or ranked[0][1] < self.fuzzy_cutoff:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < 0.02:
+            return None  # two listings fit about equally well; don't guess
+        return self._listings[ranked[0][0]]
+
+    def name_for(self, text: str) -> str:
+        """Listing name for an exact match, otherwise text unchanged."""
+        listing, how = self.resolve(text)
+        return listing.name if how == "exact" else text
+
+    def stock_id_for(self, text: str) -> str:
+        """Stock id for an exact match, otherwise text unchanged."""
+        listing, how = self.resolve(text)
+        return listing.stock_id if how == "exact" and listing.stock_id else text
+
+    def resolve_params(self, params: dict | None) -> dict | None:
+        """Tool params with exactly matched name/stock_name/stock_id replaced by their listing values."""
+        if not params:
+            return params
+        resolved = dict(params)
+        for key, value in params.items():
+            if not isinstance(value, str) or key not in ("name", "stock_name", "stock_id"):
+                continue
+            listing, how = self.resolve(value)
+            if how != "exact":
+                if listing is not None:
+                    metrics.inc("symbol_suggestions", param=key, how=how)
+                    annotate(**{f"suggested_{key}": f"{value} -> {listing.name} ({how})"})
+                continue
+            if key == "stock_id":
+                resolved[key] = listing.stock_id or value
+            else:
+                resolved[key] = listing.name
+            if resolved[key] != value:
+                metrics.inc("symbol_rewrites", param=key)
+                annotate(**{f"resolved_{key}": f"{value} -> {resolved[key]}"})
+        return resolved
+
+    # ---------------------------------------------------
+    # Persistence of learned listings
+    # ---------------------------------------------------
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                rows = json.load(f).get("listings", [])
+        except (OSError, ValueError) as e:
+            print(f"Symbol index not loaded from {self.path}: {e}")
+            return
+        for row in rows:
+            self.add(Listing(row["name"], row.get("stock_id", ""), set(row.get("aliases", []))), learned=True)
+        self._dirty = False
+
+    def _maybe_save(self):
+        if self._dirty and time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            rows = [self._listings[name].to_dict() for name in sorted(self._learned)]
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"listings": rows}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Symbol index not saved to {self.path}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self.lookups.values())
+            return {
+                "listings": len(self._listings),
+                "keys": len(self._exact),
+                "learned": len(self._learned),
+                "lookups": total,
+                "exact": self.lookups["exact"],
+                "prefix": self.lookups["prefix"],
+                "fuzzy": self.lookups["fuzzy"],
+                "misses": self.lookups["miss"],
+                "resolved_ratio": round(self.lookups["exact"] / total, 3) if total else 0.0,
+            }
+
+
+symbol_index = SymbolIndex.from_env()
@@ -0,0 +1,360 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from langchain.agents.middleware import AgentMiddleware
+
+PREFIX = "stock_agent"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536)
+
+
+# -------------------------------------------------------
+# Metrics registry
+# -------------------------------------------------------
+class _Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _flatten(prefix: str, stats: dict, out: dict):
+    for key, value in stats.items():
+        name = f"{prefix}_{_NAME_CHARS.sub('_', str(key))}"
+        if isinstance(value, dict):
+            _flatten(name, value, out)
+        elif isinstance(value, bool):
+            out[name] = int(value)
+        elif isinstance(value, (int, float)):
+            out[name] = value
+
+
+class Metrics:
+    """
+    Counters and histograms recorded by spans and hooks, plus gauges read on
+    export from the stats() of registered components (caches, router, memo,
+    writer, ...). Rendered as Prometheus text or as a JSON snapshot.
+    """
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self._counters: dict[str, dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self._histograms: dict[str, dict[tuple, _Histogram]] = defaultdict(dict)
+        self._buckets: dict[str, tuple] = {}
+        self._sources: dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[name][_labels(labels)] += value
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms[name]
+            if key not in series:
+                series[key] = _Histogram(self._buckets.setdefault(name, buckets))
+            series[key].observe(value)
+
+    def register(self, component: str, stats: Callable[[], dict]):
+        """Export the numeric fields of `stats()` as gauges named <prefix>_<component>_<field>."""
+        self._sources[component] = stats
+
+    def gauges(self) -> dict[str, float]:
+        out: dict[str, float] = {}
+        for component, stats in list(self._sources.items()):
+            try:
+                _flatten(f"{self.prefix}_{component}", stats(), out)
+            except Exception as e:
+                print(f"Metrics source {component} failed: {e}")
+        return out
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{self.prefix}_{name}_total"
+                lines.append(f"# TYPE {full} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} histogram")
+                for labels, hist in sorted(series.items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        lines.append(f"{full}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{full}_bucket{_format_labels(labels, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {hist.sum:g}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {hist.count}")
+        for name, value in sorted(self.gauges().items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(labels),
+                        "count": hist.count,
+                        "sum": round(hist.sum, 6),
+                        "avg": round(hist.sum / hist.count, 6) if hist.count else 0.0,
+                    }
+                    for labels, hist in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms, "gauges": self.gauges()}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# -------------------------------------------------------
+# Spans
+# -------------------------------------------------------
+@dataclass
+class Span:
+    name: str
+    target: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    started_at: float
+    attrs: dict = field(default_factory=dict)
+    duration_ms: float = 0.0
+    status: str = "ok"
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "target": self.target,
+            "started_at": round(self.started_at, 6),
+            "duration_ms": round(self.duration_ms, 2),
+            "status": self.status,
+            **self.attrs,
+        }
+
+
+# The innermost open span; tool threads and tasks inherit it through contextvars.
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Nested timing spans (run -> tool -> sub-agent model call -> API call).
+    Every finished span feeds span_duration_seconds{span, target}; the most
+    recent ones are kept for inspection, and with log_format="json" each is
+    printed as one JSON line.
+    """
+
+    def __init__(self, metrics: Metrics, log_format: str = "", max_spans: int = 2000, enabled: bool = True):
+        self.metrics = metrics
+        self.log_format = log_format
+        self.enabled = enabled
+        self._recent: deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, metrics: Metrics) -> "Tracer":
+        return cls(
+            metrics,
+            log_format=os.getenv("TELEMETRY_LOG", ""),
+            max_spans=int(os.getenv("TELEMETRY_MAX_SPANS", "2000")),
+            enabled=os.getenv("TELEMETRY_ENABLED", "1") == "1",
+        )
+
+    @contextmanager
+    def span(self, name: str, target: str = "", **attrs):
+        if not self.enabled:
+            yield Span(name, target, "", "", None, time.time(), attrs)
+            return
+
+        parent = current_span.get()
+        span = Span(
+            name=name,
+            target=target,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            started_at=time.time(),
+            attrs=attrs,
+        )
+        token = current_span.set(span)
+        try:
+            yield span
+        except (GeneratorExit, asyncio.CancelledError):
+            # the consumer stopped reading a stream (e.g. the user navigated away)
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status = "error"
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        span.duration_ms = (time.perf_counter() - span._t0) * 1000
+        self.metrics.observe("span_duration_seconds", span.duration_ms / 1000, span=span.name, target=span.target)
+        if span.status != "ok":
+            self.metrics.inc("span_errors", span=span.name, target=span.target)
+        with self._lock:
+            self._recent.append(span)
+        if self.log_format == "json":
+            print(json.dumps(span.to_dict(), default=str))
+
+    def trace(self, trace_id: str) -> list[Span]:
+        """Finished spans of one trace, in start order."""
+        with self._lock:
+            spans = [s for s in self._recent if s.trace_id == trace_id]
+        return sorted(spans, key=lambda s: s.started_at)
+
+
+def annotate(**attrs):
+    """Attach attributes to the innermost open span (no-op outside a span)."""
+    span = current_span.get()
+    if span is not None:
+        span.attrs.update(attrs)
+
+
+metrics = Metrics()
+tracer = Tracer.from_env(metrics)
+
+
+# -------------------------------------------------------
+# Agent middleware: model and tool calls
+# -------------------------------------------------------
+def _usage(request, response) -> tuple[int, int, bool]:
+    """(tokens in, tokens out, estimated?) from usage_metadata or the context_budget counter."""
+    messages = [m for m in getattr(response, "result", [response]) if getattr(m, "type", "") == "ai"]
+    usage = messages[-1].usage_metadata if messages else None
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0), False
+
+    from context_budget import context_budget
+    count = context_budget.counter.count
+    tokens_in = sum(count(m) for m in request.messages)
+    if request.system_message is not None:
+        tokens_in += count(request.system_message)
+    return tokens_in, sum(count(m) for m in messages), True
+
+
+class AgentTelemetry(AgentMiddleware):
+    """Spans and token counts for every model and tool call of one agent."""
+
+    def __init__(self, agent: str):
+        super().__init__()
+        self.agent = agent
+
+    def _record_model(self, span: Span, request, response):
+        tokens_in, tokens_out, estimated = _usage(request, response)
+        span.attrs.update(tokens_in=tokens_in, tokens_out=tokens_out, tokens_estimated=estimated)
+        metrics.inc("model_tokens", tokens_in, agent=self.agent, direction="in")
+        metrics.inc("model_tokens", tokens_out, agent=self.agent, direction="out")
+        metrics.observe("model_input_tokens", tokens_in, TOKEN_BUCKETS, agent=self.agent)
+
+    def wrap_model_call(self, request, handler):
+        with tracer.span("model", self.agent, messages=len(request.messages)) as span:
+            response = handler(request)
+            self._record_model(span, request, response)
+            return response
+
+    async def awrap_model_call(self, request, handler):
+        with tracer.span("model", self.agent, messages=len(request.messages)) as span:
+            response = await handler(request)
+            self._record_model(span, request, response)
+            return response
+
+    def wrap_tool_call(self, request, handler):
+        with tracer.span("tool", request.tool_call["name"], agent=self.agent):
+            return handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        with tracer.span("tool", request.tool_call["name"], agent=self.agent):
+            return await handler(request)
+
+
+# -------------------------------------------------------
+# Export
+# -------------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body = json.dumps(metrics.snapshot(), default=str).encode("utf-8")
+            content_type = "application/json"
+        elif self.path.startswith("/metrics"):
+            body = metrics.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int | None = None, host: str = "0.0.0.0") -> ThreadingHTTPServer | None:
+    """Serve /metrics (Prometheus text) and /metrics.json on a daemon thread; METRICS_PORT=0 disables."""
+    port = int(os.getenv("METRICS_PORT", "0")) if port is None else port
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"Metrics served on http://{host}:{port}/metrics")
+    return server
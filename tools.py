@@ -1,41 +1,147 @@
+import asyncio
+import contextvars
 import os
-import matplotlib.pyplot as plt
-import pandas as pd
-import requests
-from utils import safe_execute
+from concurrent.futures import ThreadPoolExecutor
+from utils import safe_execute, async_variant
+import charts
+from cache import ResponseCache, make_key, ttl_for
+from api_client import IndianAPIClient, AsyncIndianAPIClient
+from singleflight import SingleFlight
+from projection import project, round_value
+from ratelimit import QuotaManager
+from historical_store import HistoricalStore, to_records
+from indicators import summarize as summarize_indicators
+from memo import record_source, record_failure
+from telemetry import metrics, tracer
+from symbols import symbol_index
 from langchain.tools import tool
 from dotenv import load_dotenv
 load_dotenv()
 
-BASE_URL = "https://stock.indianapi.in"
+BASE_URL = os.getenv("INDIAN_API_BASE_URL", "https://stock.indianapi.in")
 API_KEY = os.getenv("INDIAN_API_KEY")
 
+response_cache = ResponseCache.from_env()
+rate_limiter = QuotaManager.from_env()
+api_client = IndianAPIClient.from_env(BASE_URL, API_KEY, limiter=rate_limiter)
+async_api_client = AsyncIndianAPIClient.from_env(BASE_URL, API_KEY, limiter=rate_limiter)
+inflight = SingleFlight()
 
-@safe_execute
-def _get(endpoint: str, params: dict | None = None):
+
+def _load(endpoint: str, params: dict | None = None):
+    """
+    Cached, coalesced API call returning the raw payload. Raises on failure.
+    Company names and stock ids in params are resolved through symbol_index first.
+    """
     if not API_KEY:
         raise ValueError("INDIAN_API_KEY not found in environment variables")
+    params = symbol_index.resolve_params(params)
+
+    with tracer.span("api", endpoint) as span:
+        data = response_cache.get(endpoint, params)
+        span.attrs["cache"] = "hit" if data is not None else "miss"
+        metrics.inc("api_cache_lookups", endpoint=endpoint, result=span.attrs["cache"])
+        if data is None:
+            try:
+                data = inflight.do(make_key(endpoint, params), _fetch, endpoint, params)
+            except Exception:
+                record_failure()
+                raise
+    record_source(endpoint, params)
+    return data
+
+
+@safe_execute
+def _get(endpoint: str, params: dict | None = None, full: bool = False):
+    return {
+        "status": "success",
+        "data": project(endpoint, _load(endpoint, params), full=full)
+    }
+
+
+def _fetch(endpoint: str, params: dict | None = None, ttl: float | None = None):
+    """Call the API and populate the cache. Concurrent callers share one call."""
+    data = api_client.get_json(endpoint, params)
+    response_cache.set(endpoint, params, data, ttl=ttl)
+    symbol_index.learn(endpoint, params, data)
+    return data
+
+
+def refresh(endpoint: str, params: dict | None = None, ttl: float | None = None):
+    """
+    Fetch an endpoint bypassing the cache read and store the fresh payload.
+    Used by the prefetch scheduler; errors propagate to the caller.
+    """
+    return inflight.do(make_key(endpoint, params), _fetch, endpoint, params, ttl)
+
 
-    headers = {
-        "X-Api-Key": API_KEY,
-        "Accept": "application/json"
+def _fetch_history(stock_name: str, period: str):
+    return _load("/historical_data", {
+        "stock_name": stock_name,
+        "period": period,
+        "filter": "default",
+    })
+
+
+historical_store = HistoricalStore(
+    root=os.getenv("HISTORICAL_STORE_DIR", "data/historical"),
+    fetch=_fetch_history,
+    refresh_after=ttl_for("/historical_data"),
+)
+
+# filters whose payload is the price/volume series kept in historical_store
+STORED_HISTORY_FILTERS = {"default", "price"}
+
+
+def _stored_history(stock_name: str, period: str, full: bool = False) -> dict:
+    stock_name = symbol_index.name_for(stock_name)
+    columns = historical_store.get(stock_name, period)
+    record_source("/historical_data", {"stock_name": stock_name, "period": period, "filter": "default"})
+    payload = {
+        "stock_name": stock_name,
+        "period": period,
+        "records": to_records(columns),
+    }
+    return {
+        "status": "success",
+        "data": project("/historical_data", payload, full=full)
     }
 
-    resp = requests.get(f"{BASE_URL}{endpoint}", headers=headers, params=params, timeout=10)
 
-    if resp.status_code != 200:
-        raise ValueError(f"API returned {resp.status_code}: {resp.text}")
+async def _aload(endpoint: str, params: dict | None = None):
+    if not API_KEY:
+        raise ValueError("INDIAN_API_KEY not found in environment variables")
+    params = symbol_index.resolve_params(params)
+
+    with tracer.span("api", endpoint) as span:
+        data = response_cache.get(endpoint, params)
+        span.attrs["cache"] = "hit" if data is not None else "miss"
+        metrics.inc("api_cache_lookups", endpoint=endpoint, result=span.attrs["cache"])
+        if data is None:
+            try:
+                data = await inflight.ado(make_key(endpoint, params), _afetch, endpoint, params)
+            except Exception:
+                record_failure()
+                raise
+    record_source(endpoint, params)
+    return data
 
-    data = resp.json()
-    if not data:
-        raise ValueError("Empty response received from API")
 
+@safe_execute
+async def _aget(endpoint: str, params: dict | None = None, full: bool = False):
     return {
         "status": "success",
-        "data": data
+        "data": project(endpoint, await _aload(endpoint, params), full=full)
     }
 
 
+async def _afetch(endpoint: str, params: dict | None = None):
+    data = await async_api_client.get_json(endpoint, params)
+    response_cache.set(endpoint, params, data)
+    symbol_index.learn(endpoint, params, data)
+    return data
+
+
 @tool
 @safe_execute
 def get_market_news():
@@ -57,12 +163,13 @@ def get_ipo_data():
 
 @tool
 @safe_execute
-def get_stock_by_name(name: str):
+def get_stock_by_name(name: str, full: bool = False):
     """
     Get detailed stock data for a company by name.
     Example: name="Reliance"
+    Returns a compact summary; set full=True only when the complete payload is needed.
     """
-    return _get("/stock", {"name": name})
+    return _get("/stock", {"name": name}, full=full)
 
 
 @tool
@@ -121,11 +228,12 @@ def bse_most_active():
 
 @tool
 @safe_execute
-def get_mutual_funds():
+def get_mutual_funds(full: bool = False):
     """
     Fetch latest mutual fund data.
+    Returns the top funds per category; set full=True only when every fund is needed.
     """
-    return _get("/mutual_funds")
+    return _get("/mutual_funds", full=full)
 
 
 @tool
@@ -182,37 +290,344 @@ def stock_forecasts(
 def historical_data(
     stock_name: str,
     period: str = "5yr",
-    filter: str = "default"
+    filter: str = "default",
+    full: bool = False
 ):
     """
     Fetch historical stock price/financial data.
+    The default/price filter returns records with keys: date, close, volume,
+    dma50, dma200 (plus open, high, low when available), ready for the plot tools.
+    Returns the most recent rows; set full=True only when the whole period is needed.
     """
+    if filter in STORED_HISTORY_FILTERS:
+        return _stored_history(stock_name, period, full=full)
+
     params = {
         "stock_name": stock_name,
         "period": period,
         "filter": filter,
     }
-    return _get("/historical_data", params)
+    return _get("/historical_data", params, full=full)
 
 
 @tool
 @safe_execute
 def historical_stats(
     stock_name: str,
-    stats: str
+    stats: str,
+    full: bool = False
 ):
     """
     Fetch historical statistics like quarter_results, balancesheet, etc.
+    Returns the most recent periods; set full=True only when the complete history is needed.
     """
     params = {
         "stock_name": stock_name,
         "stats": stats,
     }
-    return _get("/historical_stats", params)
+    return _get("/historical_stats", params, full=full)
+
+
+# -------------------------------------------------------
+# Async variants (same arguments as the sync tools above)
+# -------------------------------------------------------
+@async_variant(get_market_news)
+async def aget_market_news():
+    return await _aget("/news")
+
+
+@async_variant(get_ipo_data)
+async def aget_ipo_data():
+    return await _aget("/ipo")
+
+
+@async_variant(get_stock_by_name)
+async def aget_stock_by_name(name: str, full: bool = False):
+    return await _aget("/stock", {"name": name}, full=full)
+
+
+@async_variant(industry_search)
+async def aindustry_search(query: str):
+    return await _aget("/industry_search", {"query": query})
+
+
+@async_variant(mutual_fund_search)
+async def amutual_fund_search(query: str):
+    return await _aget("/mutual_fund_search", {"query": query})
+
+
+@async_variant(get_trending_stocks)
+async def aget_trending_stocks():
+    return await _aget("/trending")
+
+
+@async_variant(fetch_52_week_high_low)
+async def afetch_52_week_high_low():
+    return await _aget("/fetch_52_week_high_low_data")
+
+
+@async_variant(nse_most_active)
+async def anse_most_active():
+    return await _aget("/NSE_most_active")
+
+
+@async_variant(bse_most_active)
+async def abse_most_active():
+    return await _aget("/BSE_most_active")
+
+
+@async_variant(get_mutual_funds)
+async def aget_mutual_funds(full: bool = False):
+    return await _aget("/mutual_funds", full=full)
+
+
+@async_variant(price_shockers)
+async def aprice_shockers():
+    return await _aget("/price_shockers")
+
+
+@async_variant(get_commodities)
+async def aget_commodities():
+    return await _aget("/commodities")
+
+
+@async_variant(stock_target_price)
+async def astock_target_price(stock_id: str):
+    return await _aget("/stock_target_price", {"stock_id": stock_id})
+
+
+@async_variant(stock_forecasts)
+async def astock_forecasts(
+    stock_id: str,
+    measure_code: str,
+    period_type: str,
+    data_type: str,
+    age: str
+):
+    params = {
+        "stock_id": stock_id,
+        "measure_code": measure_code,
+        "period_type": period_type,
+        "data_type": data_type,
+        "age": age,
+    }
+    return await _aget("/stock_forecasts", params)
+
+
+@async_variant(historical_data)
+async def ahistorical_data(
+    stock_name: str,
+    period: str = "5yr",
+    filter: str = "default",
+    full: bool = False
+):
+    if filter in STORED_HISTORY_FILTERS:
+        # local file IO plus at most one small tail fetch; keep it off the loop
+        return await asyncio.to_thread(_stored_history, stock_name, period, full)
+
+    params = {
+        "stock_name": stock_name,
+        "period": period,
+        "filter": filter,
+    }
+    return await _aget("/historical_data", params, full=full)
+
+
+@async_variant(historical_stats)
+async def ahistorical_stats(
+    stock_name: str,
+    stats: str,
+    full: bool = False
+):
+    params = {
+        "stock_name": stock_name,
+        "stats": stats,
+    }
+    return await _aget("/historical_stats", params, full=full)
+
+
+# -------------------------------------------------------
+# Bulk multi-symbol tools (one tool call, bounded concurrent fan-out)
+# -------------------------------------------------------
+BULK_MAX_WORKERS = int(os.getenv("BULK_MAX_WORKERS", "6"))
+BULK_MAX_SYMBOLS = int(os.getenv("BULK_MAX_SYMBOLS", "25"))
+
+# default columns of get_stock_by_name_bulk (dotted prefixes of the projected /stock payload)
+QUOTE_FIELDS = (
+    "companyName",
+    "industry",
+    "currentPrice",
+    "percentChange",
+    "yearHigh",
+    "yearLow",
+    "recosBar",
+    "riskMeter",
+)
+
+
+def _symbols(items: list[str]) -> list[str]:
+    """Distinct non-empty symbols in request order (case-insensitive)."""
+    seen, symbols = set(), []
+    for item in items:
+        item = str(item).strip()
+        if item and item.lower() not in seen:
+            seen.add(item.lower())
+            symbols.append(item)
+    if not symbols:
+        raise ValueError("No symbols given")
+    if len(symbols) > BULK_MAX_SYMBOLS:
+        raise ValueError(f"At most {BULK_MAX_SYMBOLS} symbols per call, got {len(symbols)}")
+    return symbols
+
+
+def _fan_out(fetch, symbols: list[str]) -> list[dict]:
+    """fetch(symbol) for every symbol on at most BULK_MAX_WORKERS threads, results in order."""
+    if len(symbols) == 1:
+        return [fetch(symbols[0])]
+    with ThreadPoolExecutor(max_workers=min(BULK_MAX_WORKERS, len(symbols)), thread_name_prefix="bulk") as pool:
+        # a context copy per task: API spans nest under the tool span and sources reach the memo
+        futures = [pool.submit(contextvars.copy_context().run, fetch, symbol) for symbol in symbols]
+        return [future.result() for future in futures]
+
+
+async def _afan_out(fetch, symbols: list[str]) -> list[dict]:
+    limit = asyncio.Semaphore(BULK_MAX_WORKERS)
+
+    async def one(symbol: str):
+        async with limit:
+            return await fetch(symbol)
+
+    return list(await asyncio.gather(*(one(symbol) for symbol in symbols)))
+
+
+def _flatten(value, prefix: str, out: dict):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(item, f"{prefix}.{key}" if prefix else str(key), out)
+    elif isinstance(value, list):
+        # key/value lists (keyMetrics groups) become columns; other lists don't fit a row
+        pairs = [v for v in value if isinstance(v, dict)]
+        if pairs and all("key" in v and "value" in v for v in pairs):
+            _flatten({v["key"]: v["value"] for v in pairs}, prefix, out)
+    else:
+        out[prefix] = round_value(value)
+
+
+def _table(symbols: list[str], results: list[dict], fields: tuple | list | None = None) -> dict:
+    """
+    Merge per-symbol tool results into one table:
+    {"columns": ["symbol", ...], "rows": [[symbol, ...], ...], "errors": {symbol: {...}}}
+    Results should be raw payloads (full=True): the table itself is the compact
+    form, and projected payloads carry capped lists with "omitted" notes.
+    """
+    rows, columns, errors = {}, {}, {}
+    for symbol, result in zip(symbols, results):
+        if result.get("status") != "success":
+            errors[symbol] = {"type": result.get("type", "INTERNAL_ERROR"), "message": result.get("message", "")}
+            continue
+        flat: dict = {}
+        _flatten(result["data"], "", flat)
+        if fields:
+            flat = {k: v for k, v in flat.items() if any(k == f or k.startswith(f"{f}.") for f in fields)}
+        rows[symbol] = flat
+        columns.update(dict.fromkeys(flat))
+
+    if not rows:
+        first = next(iter(errors.values()))
+        return {"status": "error", "type": first["type"], "message": "No symbol could be fetched", "errors": errors}
+
+    table = {
+        "columns": ["symbol", *columns],
+        "rows": [[symbol, *(row.get(c) for c in columns)] for symbol, row in rows.items()],
+    }
+    if errors:
+        table["errors"] = errors
+    return {"status": "success", "data": table}
+
+
+def _latest_periods(result: dict, periods: int) -> dict:
+    """Keep the last `periods` entries of each statement in a historical_stats result."""
+    if result.get("status") != "success" or not isinstance(result["data"], dict):
+        return result
+    return {
+        **result,
+        "data": {
+            metric: dict(list(values.items())[-periods:]) if isinstance(values, dict) else values
+            for metric, values in result["data"].items()
+        },
+    }
+
+
+@tool
+@safe_execute
+def get_stock_by_name_bulk(names: list[str], fields: list[str] | None = None):
+    """
+    Get stock data for several companies in one call, merged into one table
+    (one row per company; names that failed are listed under errors).
+    Example: names=["HDFC Bank", "ICICI Bank", "SBI"]
+    fields: dotted paths to include, e.g. ["currentPrice", "keyMetrics.valuation"]
+    (default: price, change, 52-week range, industry, analyst rating, risk)
+    """
+    names = _symbols(names)
+    results = _fan_out(lambda name: _get("/stock", {"name": name}, full=True), names)
+    return _table(names, results, fields or QUOTE_FIELDS)
+
+
+@tool
+@safe_execute
+def stock_target_price_bulk(stock_ids: list[str]):
+    """
+    Get analyst target prices and recommendations for several stocks in one call,
+    merged into one table (one row per stock; failures listed under errors).
+    """
+    stock_ids = _symbols(stock_ids)
+    results = _fan_out(lambda stock_id: _get("/stock_target_price", {"stock_id": stock_id}, full=True), stock_ids)
+    return _table(stock_ids, results)
+
+
+@tool
+@safe_execute
+def historical_stats_bulk(stock_names: list[str], stats: str, periods: int = 4):
+    """
+    Fetch the same historical statistics (quarter_results, balancesheet, etc.)
+    for several stocks in one call, merged into one table with a column per
+    statement line and period, for the most recent `periods` periods.
+    """
+    stock_names = _symbols(stock_names)
+    results = _fan_out(
+        lambda name: _latest_periods(_get("/historical_stats", {"stock_name": name, "stats": stats}, full=True), periods),
+        stock_names,
+    )
+    return _table(stock_names, results)
+
+
+@async_variant(get_stock_by_name_bulk)
+async def aget_stock_by_name_bulk(names: list[str], fields: list[str] | None = None):
+    names = _symbols(names)
+    results = await _afan_out(lambda name: _aget("/stock", {"name": name}, full=True), names)
+    return _table(names, results, fields or QUOTE_FIELDS)
+
+
+@async_variant(stock_target_price_bulk)
+async def astock_target_price_bulk(stock_ids: list[str]):
+    stock_ids = _symbols(stock_ids)
+    results = await _afan_out(lambda stock_id: _aget("/stock_target_price", {"stock_id": stock_id}, full=True), stock_ids)
+    return _table(stock_ids, results)
+
+
+@async_variant(historical_stats_bulk)
+async def ahistorical_stats_bulk(stock_names: list[str], stats: str, periods: int = 4):
+    stock_names = _symbols(stock_names)
+
+    async def fetch(name: str):
+        return _latest_periods(await _aget("/historical_stats", {"stock_name": name, "stats": stats}, full=True), periods)
+
+    return _table(stock_names, await _afan_out(fetch, stock_names))
 
 
 data_collector_agent_tools = [
         get_stock_by_name,
+        get_stock_by_name_bulk,
         get_trending_stocks,
         fetch_52_week_high_low,
         nse_most_active,
@@ -224,7 +639,9 @@ data_collector_agent_tools = [
         get_commodities,
         historical_data,
         historical_stats,
+        historical_stats_bulk,
         stock_target_price,
+        stock_target_price_bulk,
         stock_forecasts,
         get_ipo_data,
         get_market_news
@@ -233,100 +650,101 @@ data_collector_agent_tools = [
 
 @tool
 @safe_execute
-def plot_stock_price_trend(data: list):
+def plot_stock_price_trend(data: list, fmt: str = "png"):
     """
     Visualize stock price trend over time.
     Input: data -> list of dicts with keys: date, close
     Example: [{"date": "2026-01-01", "close": 3500}, ...]
+    Returns a chart handle (chart_id) that the UI displays; fmt is png or svg.
     """
-    df = pd.DataFrame(data)
-    df["date"] = pd.to_datetime(df["date"])
-
-    plt.figure(figsize=(10, 5))
-    plt.plot(df["date"], df["close"])
-    plt.title("Stock Price Trend")
-    plt.xlabel("Date")
-    plt.ylabel("Closing Price")
-    plt.show()
+    chart = charts.render("Stock Price Trend", charts.render_price_trend, data, fmt=fmt)
+    return {"status": "success", "data": chart.handle()}
 
 
 @tool
 @safe_execute
-def plot_volume_chart(data: list):
+def plot_volume_chart(data: list, fmt: str = "png"):
     """
     Visualize trading volume over time.
     Input: data -> list of dicts with keys: date, volume
+    Returns a chart handle (chart_id) that the UI displays; fmt is png or svg.
     """
-    df = pd.DataFrame(data)
-    df["date"] = pd.to_datetime(df["date"])
-
-    plt.figure(figsize=(10, 5))
-    plt.bar(df["date"], df["volume"])
-    plt.title("Trading Volume")
-    plt.xlabel("Date")
-    plt.ylabel("Volume")
-    plt.show()
+    chart = charts.render("Trading Volume", charts.render_volume, data, fmt=fmt)
+    return {"status": "success", "data": chart.handle()}
 
 
 @tool
 @safe_execute
-def plot_moving_averages(data: list, short_window: int = 20, long_window: int = 50):
+def plot_moving_averages(data: list, short_window: int = 20, long_window: int = 50, fmt: str = "png"):
     """
     Visualize stock price with moving averages.
     Input: data -> list of dicts with keys: date, close
+    Returns a chart handle (chart_id) that the UI displays; fmt is png or svg.
     """
-    df = pd.DataFrame(data)
-    df["date"] = pd.to_datetime(df["date"])
-    df["SMA_short"] = df["close"].rolling(window=short_window).mean()
-    df["SMA_long"] = df["close"].rolling(window=long_window).mean()
-
-    plt.figure(figsize=(10, 5))
-    plt.plot(df["date"], df["close"], label="Close Price")
-    plt.plot(df["date"], df["SMA_short"], label=f"SMA {short_window}")
-    plt.plot(df["date"], df["SMA_long"], label=f"SMA {long_window}")
-    plt.title("Moving Averages")
-    plt.xlabel("Date")
-    plt.ylabel("Price")
-    plt.legend()
-    plt.show()
+    chart = charts.render(
+        "Moving Averages",
+        charts.render_moving_averages,
+        data,
+        short_window,
+        long_window,
+        fmt=fmt,
+    )
+    return {"status": "success", "data": chart.handle()}
 
 
 @tool
 @safe_execute
-def plot_candlestick_like(data: list):
+def plot_candlestick_like(data: list, fmt: str = "png"):
     """
     Visualize OHLC data in a simple candlestick-style chart.
     Input: data -> list of dicts with keys: date, open, high, low, close
     (Lightweight version without mplfinance)
+    Returns a chart handle (chart_id) that the UI displays; fmt is png or svg.
     """
-    df = pd.DataFrame(data)
-    df["date"] = pd.to_datetime(df["date"])
-
-    plt.figure(figsize=(10, 5))
-    for _, row in df.iterrows():
-        plt.plot([row["date"], row["date"]], [row["low"], row["high"]])
-        plt.plot([row["date"], row["date"]], [row["open"], row["close"]], linewidth=4)
-
-    plt.title("OHLC (Candlestick Style)")
-    plt.xlabel("Date")
-    plt.ylabel("Price")
-    plt.show()
+    chart = charts.render("OHLC (Candlestick Style)", charts.render_candlestick, data, fmt=fmt)
+    return {"status": "success", "data": chart.handle()}
 
 
 @tool
 @safe_execute
-def plot_sector_allocation(data: dict):
+def plot_sector_allocation(data: dict, fmt: str = "png"):
     """
     Visualize portfolio or market sector allocation as a pie chart.
     Input: data -> dict like {"IT": 35, "Banking": 25, "Pharma": 15, "FMCG": 25}
+    Returns a chart handle (chart_id) that the UI displays; fmt is png or svg.
     """
-    sectors = list(data.keys())
-    values = list(data.values())
+    chart = charts.render("Sector Allocation", charts.render_sector_allocation, data, fmt=fmt)
+    return {"status": "success", "data": chart.handle()}
+
 
-    plt.figure(figsize=(6, 6))
-    plt.pie(values, labels=sectors, autopct="%1.1f%%")
-    plt.title("Sector Allocation")
-    plt.show()
+@tool
+@safe_execute
+def compute_indicators(
+    data: dict,
+    indicators: list[str] | None = None,
+    short_window: int = 20,
+    long_window: int = 50,
+    period: int = 14,
+    lookback: int = 1
+):
+    """
+    Compute technical indicators for many symbols at once and return the latest values.
+    Input: data -> dict of symbol -> list of dicts with keys: date, close
+           (open, high, low, volume enable ATR and VWAP), e.g. the records from historical_data
+    indicators: any of sma, ema, rsi, macd, bollinger, atr, vwap (default: all)
+    lookback: number of most recent values to return per indicator
+    """
+    return {
+        "status": "success",
+        "data": summarize_indicators(
+            data,
+            indicators,
+            lookback=lookback,
+            short_window=short_window,
+            long_window=long_window,
+            period=period,
+        )
+    }
 
 
 data_analyst_tools = [
@@ -334,5 +752,6 @@ data_analyst_tools = [
     plot_volume_chart,
     plot_moving_averages,
     plot_candlestick_like,
-    plot_sector_allocation
+    plot_sector_allocation,
+    compute_indicators
 ]
\ No newline at end of file
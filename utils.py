@@ -1,33 +1,62 @@
 from functools import wraps
+import inspect
 import traceback
+from httpx import HTTPError
 from requests.exceptions import RequestException
 
 
+def _error_result(e: Exception) -> dict:
+    if isinstance(e, (RequestException, HTTPError)):
+        return {
+            "status": "error",
+            "type": "API_ERROR",
+            "message": str(e)
+        }
+    if isinstance(e, ValueError):
+        return {
+            "status": "error",
+            "type": "VALUE_ERROR",
+            "message": str(e)
+        }
+    return {
+        "status": "error",
+        "type": "INTERNAL_ERROR",
+        "message": str(e),
+        "trace": traceback.format_exc()
+    }
+
+
 def safe_execute(fn):
     """
     Decorator to safely execute tools and return structured errors.
+    Works for both plain functions and coroutines.
     """
+    if inspect.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                return _error_result(e)
+        return async_wrapper
+
     @wraps(fn)   # 🔥 THIS IS THE FIX
     def wrapper(*args, **kwargs):
         try:
             return fn(*args, **kwargs)
-        except RequestException as e:
-            return {
-                "status": "error",
-                "type": "API_ERROR",
-                "message": str(e)
-            }
-        except ValueError as e:
-            return {
-                "status": "error",
-                "type": "VALUE_ERROR",
-                "message": str(e)
-            }
         except Exception as e:
-            return {
-                "status": "error",
-                "type": "INTERNAL_ERROR",
-                "message": str(e),
-                "trace": traceback.format_exc()
-            }
+            return _error_result(e)
     return wrapper
+
+
+def async_variant(sync_tool, safe: bool = True):
+    """
+    Attach a native coroutine to an existing @tool so that ainvoke/astream
+    (and LangChain's parallel tool execution) await it instead of pushing the
+    sync implementation onto a thread. The sync path is left untouched.
+    With safe=True the coroutine is wrapped in safe_execute like the sync tools.
+    """
+    def register(coro):
+        sync_tool.coroutine = safe_execute(coro) if safe else coro
+        return coro
+    return register
@@ -0,0 +1,299 @@
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from chat_store import ChatStore
+
+DUPLICATE_KEY = 11000
+
+
+class HistoryWriter:
+    """
+    Write-behind queue for chat history.
+
+    submit() only enqueues the exchange; a daemon thread drains the queue in
+    batches of up to `batch_size` (or whatever arrived within `flush_interval`)
+    and writes each collection with one unordered bulk_write. Failed writes are
+    retried with jittered backoff, and only the failed operations are resent.
+    When the buffer is full, submit() writes synchronously instead of dropping.
+    Exchanges that are queued but not yet written are visible through
+    pending_messages()/pending_sessions(), so readers don't lose them, and
+    version() changes whenever exchanges reach the store, so readers can cache
+    store pages until then.
+    """
+
+    def __init__(
+        self,
+        store: ChatStore,
+        max_queue: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        enabled: bool = True,
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.enabled = enabled
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._pending: dict[str, list[dict]] = defaultdict(list)
+        self._versions: dict[str, int] = defaultdict(int)
+        self._version = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+        self.sync_writes = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_ms_total = 0.0
+
+    @classmethod
+    def from_env(cls, store: ChatStore) -> "HistoryWriter":
+        return cls(
+            store,
+            max_queue=int(os.getenv("HISTORY_QUEUE_SIZE", "1000")),
+            batch_size=int(os.getenv("HISTORY_BATCH_SIZE", "100")),
+            flush_interval=float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.5")),
+            max_retries=int(os.getenv("HISTORY_MAX_RETRIES", "5")),
+            enabled=os.getenv("HISTORY_WRITE_BEHIND", "1") == "1",
+        )
+
+    # ---------------------------------------------------
+    # Producer side
+    # ---------------------------------------------------
+    def submit(
+        self,
+        session_id: str,
+        user_name: str,
+        prompt: str,
+        answer: str,
+        prompt_time: datetime,
+        answer_time: datetime,
+    ):
+        item = {
+            "session_id": session_id,
+            "ops": ChatStore.exchange_ops(session_id, user_name, prompt, answer, prompt_time, answer_time),
+            "doc": {"prompt": prompt, "answer": answer, "timestamp": prompt_time},
+        }
+        if not self.enabled:
+            try:
+                self.store.write(item["ops"])
+            finally:
+                self._written([session_id])
+            return
+
+        self.start()
+        with self._lock:
+            self._pending[session_id].append(item["doc"])
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # back-pressure: pay the write latency here rather than lose the exchange
+            with self._lock:
+                self.sync_writes += 1
+            try:
+                self.store.write(item["ops"])
+            finally:
+                self._written([session_id])
+                self._forget([item])
+            return
+
+        with self._lock:
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def pending_messages(self, session_id: str) -> list[dict]:
+        """Queued, not yet written exchanges of a session as chat messages."""
+        with self._lock:
+            docs = list(self._pending.get(session_id, ()))
+        messages = []
+        for doc in docs:
+            messages.append({"role": "user", "content": doc["prompt"]})
+            messages.append({"role": "assistant", "content": doc["answer"]})
+        return messages
+
+    def pending_sessions(self) -> list[dict]:
+        """Sessions with queued writes, shaped like ChatStore.list_sessions rows."""
+        with self._lock:
+            return [
+                {"session_id": sid, "created_at": docs[0]["timestamp"]}
+                for sid, docs in self._pending.items() if docs
+            ]
+
+    def version(self, session_id: str | None = None) -> int:
+        """
+        Write version of a session (or of all history when None). Read it after
+        pending_*(): an exchange then shows up in one of the two.
+        """
+        with self._lock:
+            return self._versions.get(session_id, 0) if session_id else self._version
+
+    # ---------------------------------------------------
+    # Worker
+    # ---------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def _next_batch(self) -> list[dict]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: list[dict]):
+        started = time.perf_counter()
+        ops: dict[str, list] = {"messages": [], "sessions": []}
+        for item in batch:
+            for collection, collection_ops in item["ops"].items():
+                ops[collection].extend(collection_ops)
+
+        ok = self._write_with_retry(ops)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        # bump before forgetting, so a reader never sees neither the queued nor the stored copy
+        self._written(item["session_id"] for item in batch)
+        self._forget(batch)
+        with self._lock:
+            self.batches += 1
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self._flush_ms_total += elapsed
+            if ok:
+                self.written += len(batch)
+            else:
+                self.dropped += len(batch)
+        for _ in batch:
+            self._queue.task_done()
+
+        if not ok:
+            sessions = sorted({item["session_id"] for item in batch})
+            print(f"Error saving chat history: dropped {len(batch)} exchanges for sessions {sessions}")
+
+    def _write_with_retry(self, ops: dict[str, list]) -> bool:
+        remaining = {name: list(collection_ops) for name, collection_ops in ops.items() if collection_ops}
+        for attempt in range(self.max_retries + 1):
+            for name in list(remaining):
+                try:
+                    self.store.bulk_write(name, remaining[name])
+                    del remaining[name]
+                except BulkWriteError as e:
+                    # unordered: everything not listed in writeErrors was applied.
+                    # A duplicate message insert is a retry of one that already
+                    # landed; a duplicate session upsert lost a race and must be resent.
+                    failed = [
+                        err["index"] for err in e.details.get("writeErrors", [])
+                        if not (name == "messages" and err.get("code") == DUPLICATE_KEY)
+                    ]
+                    if failed:
+                        remaining[name] = [remaining[name][i] for i in failed]
+                    else:
+                        del remaining[name]
+                except PyMongoError as e:
+                    print(f"Chat history batch write failed (attempt {attempt + 1}): {e}")
+
+            if not remaining:
+                return True
+            if attempt < self.max_retries:
+                with self._lock:
+                    self.retries += 1
+                # returns early on shutdown so backoff doesn't hold up the final drain
+                self._stop.wait(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+        return False
+
+    def _written(self, session_ids):
+        with self._lock:
+            self._version += 1
+            for session_id in set(session_ids):
+                self._versions[session_id] += 1
+
+    def _forget(self, batch: list[dict]):
+        with self._lock:
+            for item in batch:
+                docs = self._pending.get(item["session_id"])
+                if docs and item["doc"] in docs:
+                    docs.remove(item["doc"])
+                if not docs:
+                    self._pending.pop(item["session_id"], None)
+
+    # ---------------------------------------------------
+    # Flush / shutdown
+    # ---------------------------------------------------
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until everything submitted so far is written (or dropped)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Drain the queue and stop the worker (registered with atexit)."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "queue_depth": self._queue.qsize(),
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "retries": self.retries,
+                "dropped": self.dropped,
+                "sync_writes": self.sync_writes,
+                "last_flush_ms": round(self.last_flush_ms, 1),
+                "max_flush_ms": round(self.max_flush_ms, 1),
+                "avg_flush_ms": round(self._flush_ms_total / self.batches, 1) if self.batches else 0.0,
+            }